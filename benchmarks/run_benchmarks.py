@@ -0,0 +1,192 @@
+"""
+Pipeline benchmarks that run entirely offline against synthetic EPUBs and a FakeLLMClient.
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes small medium --output bench_results.json
+    python -m benchmarks.run_benchmarks --compare bench_results.json
+
+Each benchmark reports the best wall time over --repeat runs and the peak Python heap allocation
+measured by tracemalloc. Results are written as JSON together with the git commit they were measured on,
+and --compare prints the change against a previous results file, flagging anything slower than --threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from benchmarks.synthetic_epub import SIZES, write_synthetic_epub
+from book_summarizer.epub_extractor import EpubExtractor
+from book_summarizer.fake_llm import FakeLLMClient
+from book_summarizer.summarizer import BookSummarizer
+from book_summarizer.text_processing import TextProcessor
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure(func: Callable[[], object], repeat: int = 3) -> dict:
+    """
+    Runs `func` `repeat` times and records the best wall time and the largest tracemalloc peak.
+
+    Returns:
+        dict: {"seconds": float, "peak_mb": float}
+    """
+    best_seconds = float("inf")
+    peak_bytes = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        best_seconds = min(best_seconds, elapsed)
+        peak_bytes = max(peak_bytes, peak)
+    return {"seconds": round(best_seconds, 6), "peak_mb": round(peak_bytes / 2**20, 3)}
+
+
+def fake_models(latency: float, rate_limit_probability: float, model_name: str) -> dict[str, FakeLLMClient]:
+    """One fake per pipeline role, so usage can be reported separately for each."""
+    return {
+        role: FakeLLMClient(
+            model_name=role_model_name,
+            latency=latency,
+            latency_jitter=latency / 2,
+            rate_limit_probability=rate_limit_probability,
+            response_tokens=response_tokens,
+            seed=seed,
+        )
+        for seed, (role, role_model_name, response_tokens) in enumerate(
+            [
+                ("summarizer", model_name, 500),
+                ("combiner", "gpt-4o", 800),
+                ("title", "gpt-4o", 10),
+                ("worthiness", "gpt-4o-mini", 2),
+            ]
+        )
+    }
+
+
+def bench_book(epub_path: str, args: argparse.Namespace) -> dict:
+    results = {}
+    results["extraction"] = measure(lambda: EpubExtractor(epub_path).chapters, args.repeat)
+
+    chapters = EpubExtractor(epub_path).chapters
+    processor = TextProcessor(FakeLLMClient(model_name=args.model_name))
+    processor.tokenize_text("warm up the encoding cache")
+    results["tokenization"] = measure(lambda: [processor.tokenize_text(chapter) for chapter in chapters], args.repeat)
+    results["chunking"] = measure(
+        lambda: [
+            processor.chunk_text(chapter, args.chunk_size, overlap=BookSummarizer.CHUNK_OVERLAP) for chapter in chapters
+        ],
+        args.repeat,
+    )
+
+    models = fake_models(args.latency, args.rate_limit_probability, args.model_name)
+    for model in models.values():
+        model.max_tokens = args.chunk_size + BookSummarizer.SUMMARY_SIZE
+    summarizer = BookSummarizer(epub_path)
+    output_path = os.path.splitext(epub_path)[0] + "_summary.md"
+
+    def summarize() -> None:
+        summarizer.summarize_book(
+            output_path,
+            summarizer_model=models["summarizer"],
+            combiner_model=models["combiner"],
+            title_model=models["title"],
+            worthiness_model=models["worthiness"],
+        )
+
+    for model in models.values():
+        model.reset_usage()
+    results["summarize_book"] = measure(summarize, repeat=1)
+    results["summarize_book"]["usage"] = {role: model.usage() for role, model in models.items()}
+    results["chapters"] = len(chapters)
+    results["characters"] = sum(len(chapter) for chapter in chapters)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compares wall times benchmark by benchmark and returns a list of regressions.
+
+    Args:
+        current (dict): Results produced by this run.
+        baseline (dict): Results loaded from a previous run.
+        threshold (float): Relative slowdown (0.1 = 10%) above which a benchmark counts as a regression.
+
+    Returns:
+        list of str: Human-readable descriptions of each regression.
+    """
+    regressions = []
+    print(f"\nComparing {current['commit']} against {baseline['commit']}")
+    for size, benchmarks in current["results"].items():
+        for name, result in benchmarks.items():
+            old = baseline["results"].get(size, {}).get(name)
+            if not isinstance(result, dict) or not isinstance(old, dict) or not old.get("seconds"):
+                continue
+            change = result["seconds"] / old["seconds"] - 1
+            memory_change = result["peak_mb"] - old["peak_mb"]
+            flag = "REGRESSION" if change > threshold else ""
+            print(f"{size:>8} {name:<16} {change:+8.1%} time {memory_change:+9.2f} MB {flag}")
+            if flag:
+                regressions.append(f"{size}/{name} is {change:.1%} slower")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=sorted(SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per LLM call.")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--chunk-size", type=int, default=4000, help="Chunk size in tokens for the summarizer.")
+    parser.add_argument("--model-name", default="gpt-4o-mini", help="Model whose tokenizer is used for chunking.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="A previous results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            epub_path = write_synthetic_epub(os.path.join(tmp_dir, f"{size}.epub"), **SIZES[size])
+            report["results"][size] = bench_book(epub_path, args)
+            print(f"{size}: {json.dumps(report['results'][size], indent=2)}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Benchmark results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline.get("parameters") != report["parameters"]:
+            print("Warning: benchmark parameters differ from the baseline run.")
+        regressions = compare(report, baseline, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import os
+import random
+
+from ebooklib import epub
+
+# Rough stand-in for English word lengths so token counts per word resemble real prose
+VOCABULARY = (
+    "the of and to in a is that for it as was with be by on not he this are or his from at which but have "
+    "an they you were her she there been one all we their has would when what if more no out so said "
+    "who up will can about into them could time only other new some these two may first then do any like "
+    "my now over such our man me even most made after also did many before must through years where much "
+    "your way well down should because each just those people how too little state good very make world "
+    "still own see men work long get here between both life being under never day same another know while "
+    "last might us great old year off come since against go came right used take three coal miners wages "
+    "housing unemployment socialism industrial argument evidence history economic working class government"
+).split()
+
+# Ready-made book shapes, from a pamphlet to a long illustrated history
+SIZES = {
+    "small": {"chapters": 5, "words_per_chapter": 1500, "images": 0},
+    "medium": {"chapters": 20, "words_per_chapter": 4000, "images": 5},
+    "large": {"chapters": 40, "words_per_chapter": 9000, "images": 20},
+}
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(VOCABULARY, k=rng.randint(8, 24))
+    sentence = " ".join(words).capitalize()
+    if rng.random() < 0.1:
+        return f"“{sentence},” he said."
+    return sentence + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(3, 8)))
+
+
+def synthetic_chapter_text(words: int, seed: int = 0) -> str:
+    """
+    Generates deterministic pseudo-prose of roughly the requested number of words.
+
+    Args:
+        words (int): The approximate number of words to generate.
+        seed (int): Seed for the random generator so repeated runs produce identical text.
+
+    Returns:
+        str: Paragraphs separated by blank lines.
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    count = 0
+    while count < words:
+        paragraph = _paragraph(rng)
+        paragraphs.append(paragraph)
+        count += len(paragraph.split())
+    return "\n\n".join(paragraphs)
+
+
+def write_synthetic_epub(
+    path: str,
+    chapters: int = 20,
+    words_per_chapter: int = 4000,
+    images: int = 0,
+    image_kb: int = 200,
+    seed: int = 0,
+) -> str:
+    """
+    Writes a deterministic EPUB with a title page, a table of contents and `chapters` prose chapters.
+
+    Args:
+        path (str): Where to write the EPUB file.
+        chapters (int): Number of prose chapters.
+        words_per_chapter (int): Approximate words in each chapter.
+        images (int): Number of incompressible image items to add, to imitate illustrated books.
+        image_kb (int): Size of each image in kilobytes.
+        seed (int): Seed for the text and image content.
+
+    Returns:
+        str: The path to the written EPUB file.
+    """
+    rng = random.Random(seed)
+    book = epub.EpubBook()
+    book.set_identifier(f"synthetic-{chapters}-{words_per_chapter}-{seed}")
+    book.set_title("Synthetic Book")
+    book.add_author("Benchmark")
+
+    title_page = epub.EpubHtml(title="Title", file_name="title.xhtml", lang="en")
+    title_page.content = "<html><body><h1>Synthetic Book</h1><p>Benchmark</p></body></html>"
+    book.add_item(title_page)
+
+    toc_page = epub.EpubHtml(title="Contents", file_name="contents.xhtml", lang="en")
+    toc_entries = "".join(f"<p>Chapter {i + 1}</p>" for i in range(chapters))
+    toc_page.content = f"<html><body><h1>Contents</h1>{toc_entries}</body></html>"
+    book.add_item(toc_page)
+
+    chapter_items = []
+    for i in range(chapters):
+        text = synthetic_chapter_text(words_per_chapter, seed=seed * 100003 + i)
+        paragraphs = "".join(f"<p>{paragraph}</p>" for paragraph in text.split("\n\n"))
+        item = epub.EpubHtml(title=f"Chapter {i + 1}", file_name=f"chap_{i + 1:03d}.xhtml", lang="en")
+        item.content = f"<html><body><h1>Chapter {i + 1}</h1>{paragraphs}</body></html>"
+        book.add_item(item)
+        chapter_items.append(item)
+
+    for i in range(images):
+        image = epub.EpubItem(
+            uid=f"image_{i}",
+            file_name=f"images/plate_{i:03d}.jpg",
+            media_type="image/jpeg",
+            content=rng.randbytes(image_kb * 1024),
+        )
+        book.add_item(image)
+
+    book.toc = tuple(epub.Link(item.file_name, item.title, item.file_name) for item in chapter_items)
+    book.spine = ["nav", title_page, toc_page, *chapter_items]
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    epub.write_epub(path, book, {})
+    return path
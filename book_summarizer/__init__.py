@@ -1,8 +1,10 @@
 # book_summarizer/__init__.py
 
 from .book_analyzer import BookAnalyzer
+from .chat import BookChat
 from .cost_calculator import CostCalculator
 from .epub_extractor import EpubExtractor
 from .summarizer import BookSummarizer
+from .text_extractor import TextExtractor
 
-__all__ = ["BookAnalyzer", "CostCalculator", "EpubExtractor", "BookSummarizer"]
+__all__ = ["BookAnalyzer", "BookChat", "CostCalculator", "EpubExtractor", "BookSummarizer", "TextExtractor"]
@@ -0,0 +1,215 @@
+import os
+import re
+
+from book_summarizer.default_prompts import DEFAULT_PROMPTS
+from book_summarizer.llm_core import GPT4oMini, LLMClient, is_error_response
+from book_summarizer.retrieval import EmbeddingBackend, VectorIndex
+from book_summarizer.summarizer import BookSummarizer
+from book_summarizer.text_processing import TextProcessor
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when answering a question would take a chat session over its spending limit."""
+
+
+# The line write_chapter puts before each chapter's heading, which a model's own "## " headings never match
+CHAPTER_HEADER = re.compile(r"^<!-- chapter (\d+) -->\n## (.*)$", re.MULTILINE)
+
+
+def load_summaries(summary_path: str) -> list[dict]:
+    """
+    Parses a summary file written by BookSummarizer.summarize_book back into per-chapter entries.
+
+    Args:
+        summary_path (str): The path to the markdown summary.
+
+    Returns:
+        list[dict]: {"title": str, "summary": str} for each chapter, in chapter order. Chapters missing from the
+            file have an empty summary.
+    """
+    with open(summary_path) as file:
+        content = file.read()
+    headers = list(CHAPTER_HEADER.finditer(content))
+    if not headers:
+        # Files written before chapter markers were added only have the headings to go by
+        sections = re.split(r"^## ", content, flags=re.MULTILINE)[1:]
+        return [
+            {"title": title.strip(), "summary": summary.strip()}
+            for title, _, summary in (section.partition("\n") for section in sections)
+        ]
+    summaries = {}
+    for header, following in zip(headers, headers[1:] + [None]):
+        summary = content[header.end() : following.start() if following else len(content)]
+        summaries[int(header.group(1))] = {"title": header.group(2).strip(), "summary": summary.strip()}
+    return [summaries.get(i, {"title": f"Section {i + 1}", "summary": ""}) for i in range(max(summaries) + 1)]
+
+
+class BookChat:
+    """
+    A question-and-answer session about one book that keeps each question to a few thousand tokens.
+
+    Each question is answered from three sources, each capped in tokens:
+    the summaries of the chapters the question touches, the passages most similar to the question
+    from the book's vector index, and as much recent conversation as fits in the history budget.
+    Retrievals are cached per question, and every call is charged against a dollar budget for the session.
+    """
+
+    def __init__(
+        self,
+        summarizer: BookSummarizer,
+        summaries: list[dict] | None = None,
+        model: LLMClient = GPT4oMini(),
+        vector_index: VectorIndex | None = None,
+        embedder: EmbeddingBackend | None = None,
+        passages: int = 6,
+        context_tokens: int = 2500,
+        history_tokens: int = 1500,
+        answer_tokens: int = 600,
+        budget: float = 1.0,
+        system_prompt: str = DEFAULT_PROMPTS["chat_prompt"],
+        instruction: str = DEFAULT_PROMPTS["chat_instruction"],
+    ):
+        """
+        Args:
+            summarizer (BookSummarizer): The summarizer for the book being discussed.
+            summaries (Optional[list[dict]]): Chapter summaries as returned by load_summaries. If None, the
+                summarizer's default summary file is loaded if it exists.
+            model (LLMClient): The model that answers questions.
+            vector_index (Optional[VectorIndex]): The passage index. Defaults to summarizer.vector_index(embedder).
+            embedder (Optional[EmbeddingBackend]): The embedding backend used when building the default index.
+            passages (int): The number of passages retrieved per question.
+            context_tokens (int): The most tokens of summaries and passages sent with a question.
+            history_tokens (int): The most tokens of earlier questions and answers sent with a question.
+            answer_tokens (int): The expected answer length, used when checking the budget before a call.
+            budget (float): The most this session may spend, in dollars.
+            system_prompt (str): The system prompt for the answering model.
+            instruction (str): The instruction placed before the reader's question.
+        """
+        self.summarizer = summarizer
+        if summaries is None:
+            summary_path = summarizer._default_save_path()
+            summaries = load_summaries(summary_path) if os.path.exists(summary_path) else []
+        self.summaries = summaries
+        self.model = model
+        self.vector_index = vector_index or summarizer.vector_index(embedder)
+        self.passages = passages
+        self.context_tokens = context_tokens
+        self.history_tokens = history_tokens
+        self.answer_tokens = answer_tokens
+        self.budget = budget
+        self.system_prompt = system_prompt
+        self.instruction = instruction
+        self.processor = TextProcessor(model)
+        self.history: list[tuple[str, str]] = []
+        self.spent = 0.0
+        self._retrieval_cache: dict[str, list[dict]] = {}
+
+    def _count_tokens(self, text: str) -> int:
+        return len(self.processor.tokenize_text(text))
+
+    def _retrieve(self, question: str) -> list[dict]:
+        key = " ".join(question.lower().split())
+        if key not in self._retrieval_cache:
+            self._retrieval_cache[key] = self.vector_index.search(question, k=self.passages)
+            embedder = self.vector_index.embedder
+            self.spent += self._count_tokens(question) * embedder.cost_per_token
+        return self._retrieval_cache[key]
+
+    def _summary_for(self, chapter: int) -> dict | None:
+        if chapter >= len(self.summaries):
+            return None
+        entry = self.summaries[chapter]
+        if not entry["summary"] or entry["summary"] == BookSummarizer.NOT_WORTHY_SUMMARY:
+            return None
+        return entry
+
+    def _chapter_label(self, chapter: int) -> str:
+        if chapter < len(self.summaries):
+            return self.summaries[chapter]["title"]
+        return f"Section {chapter + 1}"
+
+    def build_context(self, question: str) -> str:
+        """
+        Assembles the summaries and passages sent with a question, staying within context_tokens.
+        Chapters are added in order of their best passage's similarity: first the chapter summary, then the passage.
+        """
+        remaining = self.context_tokens
+        summary_parts = []
+        passage_parts = []
+        included_chapters = set()
+        for result in self._retrieve(question):
+            chapter = result["chapter"]
+            if chapter not in included_chapters:
+                included_chapters.add(chapter)
+                entry = self._summary_for(chapter)
+                if entry is not None:
+                    part = f"### {entry['title']}\n{entry['summary']}"
+                    tokens = self._count_tokens(part)
+                    if tokens <= remaining:
+                        summary_parts.append(part)
+                        remaining -= tokens
+            part = f"[{self._chapter_label(chapter)}]\n{result['text'].strip()}"
+            tokens = self._count_tokens(part)
+            if tokens <= remaining:
+                passage_parts.append(part)
+                remaining -= tokens
+
+        sections = []
+        if summary_parts:
+            sections.append("## Chapter summaries\n" + "\n\n".join(summary_parts))
+        if passage_parts:
+            sections.append("## Passages from the book\n" + "\n\n".join(passage_parts))
+        return "\n\n".join(sections)
+
+    def _history_text(self) -> str:
+        """The most recent exchanges that fit in history_tokens, oldest first."""
+        kept = []
+        remaining = self.history_tokens
+        for question, answer in reversed(self.history):
+            exchange = f"Reader: {question}\nYou: {answer}"
+            tokens = self._count_tokens(exchange)
+            if tokens > remaining:
+                break
+            kept.append(exchange)
+            remaining -= tokens
+        return "\n\n".join(reversed(kept))
+
+    def ask(self, question: str) -> str:
+        """
+        Answers a question about the book, taking earlier questions in the session into account.
+
+        Args:
+            question (str): The reader's question.
+
+        Returns:
+            str: The model's answer, or an "Error: ..." string if the call failed. Failed calls are neither
+                charged to the budget nor kept in the conversation.
+
+        Raises:
+            BudgetExceededError: If the call would take the session's spending over its budget.
+        """
+        parts = [self.build_context(question)]
+        history = self._history_text()
+        if history:
+            parts.append(f"## Conversation so far\n{history}")
+        parts.append(f"{self.instruction}\nReader: {question}")
+        instruction = "\n\n".join(part for part in parts if part)
+
+        # An answer from the summarizer's cache costs nothing
+        cache = self.summarizer.cache
+        cached = cache is not None and self.summarizer._call_key(self.model, self.system_prompt, instruction) in cache
+        prompt_tokens = self._count_tokens(self.system_prompt) + self._count_tokens(instruction)
+        estimated_cost = (prompt_tokens + self.answer_tokens) * self.model.cost_per_token
+        if not cached and self.spent + estimated_cost > self.budget:
+            raise BudgetExceededError(
+                f"Answering would cost about ${estimated_cost:.4f}, but only "
+                f"${self.budget - self.spent:.4f} of the ${self.budget:.2f} budget is left."
+            )
+
+        answer = self.summarizer._call_model(self.model, self.system_prompt, instruction)
+        if is_error_response(answer):
+            return answer
+        if not cached:
+            self.spent += (prompt_tokens + self._count_tokens(answer)) * self.model.cost_per_token
+        self.history.append((question, answer))
+        return answer
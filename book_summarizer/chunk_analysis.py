@@ -0,0 +1,71 @@
+import json
+import re
+
+from book_summarizer.section_packing import CODE_FENCE
+
+ANALYSIS_OUTPUTS = ("summary", "quotes", "facts")
+
+
+def _strings(value) -> list[str]:
+    if not isinstance(value, list):
+        return []
+    return [item.strip() for item in value if isinstance(item, str) and item.strip()]
+
+
+def parse_analysis_response(response: str) -> dict | None:
+    """
+    Splits an analysis response into its outputs.
+
+    Args:
+        response (str): The model's response, expected to be a JSON object of the form
+            {"summary": [str], "quotes": [str], "facts": [str]}.
+
+    Returns:
+        Optional[dict]: {"summary": list[str], "quotes": list[str], "facts": list[str]}, where outputs that are
+            missing or malformed are empty lists. None if the response is not a JSON object at all.
+    """
+    try:
+        analysis = json.loads(CODE_FENCE.sub("", response))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(analysis, dict):
+        return None
+    # Models often wrap each quote in its own quote marks
+    quotes = [quote.strip("\"“”' ") for quote in _strings(analysis.get("quotes"))]
+    return {
+        "summary": _strings(analysis.get("summary")),
+        "quotes": [quote for quote in quotes if quote],
+        "facts": _strings(analysis.get("facts")),
+    }
+
+
+def _dedupe_key(text: str) -> str:
+    return re.sub(r"\W+", " ", text.lower()).strip()
+
+
+def merge_analyses(analyses: list[dict]) -> dict:
+    """
+    Merges the analyses of a chapter's chunks, in chunk order. Quotes and facts that appear in more than
+    one chunk, as they can where chunks overlap, are kept once.
+
+    Args:
+        analyses (list[dict]): The parse_analysis_response output for each chunk.
+
+    Returns:
+        dict: {"summary": list[str], "quotes": list[str], "facts": list[str]}
+    """
+    merged: dict[str, list[str]] = {output: [] for output in ANALYSIS_OUTPUTS}
+    seen: dict[str, set[str]] = {output: set() for output in ANALYSIS_OUTPUTS}
+    for analysis in analyses:
+        for output in ANALYSIS_OUTPUTS:
+            for item in analysis[output]:
+                key = _dedupe_key(item)
+                if output == "summary" or key not in seen[output]:
+                    seen[output].add(key)
+                    merged[output].append(item)
+    return merged
+
+
+def format_points(points: list[str]) -> str:
+    """Writes summary points as the bulleted list the plain summarizer produces."""
+    return "".join(f"- {point}\n" for point in points)
@@ -0,0 +1,191 @@
+import math
+
+from book_summarizer.llm_core import LLMClient
+
+
+class ChunkPlanner:
+    """
+    Decides how many chunks to split a chapter into, and how large to make them.
+
+    The largest possible chunk is whatever the model's context window leaves after the prompt and the room kept
+    for the summary, which is limited by the model's output cap. Within that, the planner picks the number of
+    chunks that best meets its objective:
+
+    - "latency": the shortest estimated wall time. Chunks are summarized `concurrency` at a time, so a long
+      chapter split into several chunks can finish sooner than one huge call, even with the extra combine call.
+    - "cost": the fewest tokens billed, which means as few chunks as will fit.
+    - "quality": the fewest chunks no larger than `quality_chunk_tokens`, since models lose detail in very
+      long inputs.
+
+    Wall time is estimated from a simple model of a call: a fixed latency, plus the prompt at
+    `input_tokens_per_second`, plus the response at `output_tokens_per_second`.
+
+    Attributes
+    ----------
+    objective : str
+        One of OBJECTIVES.
+    concurrency : int
+        How many chunks of one chapter are summarized at the same time.
+    """
+
+    OBJECTIVES = ("latency", "cost", "quality")
+    MESSAGE_OVERHEAD = 9  # tokens the chat format adds to a request: 3 per message plus 3 to prime the reply
+
+    def __init__(
+        self,
+        objective: str = "latency",
+        concurrency: int = 4,
+        max_chunk_tokens: int | None = None,
+        quality_chunk_tokens: int = 16000,
+        min_chunk_tokens: int = 1000,
+        summary_tokens: int = 500,
+        summary_reserve: int = 1500,
+        base_latency: float = 1.0,
+        input_tokens_per_second: float = 5000.0,
+        output_tokens_per_second: float = 50.0,
+    ):
+        """
+        Parameters
+        ----------
+        objective : str
+            "latency", "cost" or "quality", see the class description.
+        concurrency : int
+            How many chunks of one chapter are summarized at the same time.
+        max_chunk_tokens : int, optional
+            Never make chunks larger than this, whatever the model allows.
+        quality_chunk_tokens : int
+            The largest chunk the "quality" objective accepts.
+        min_chunk_tokens : int
+            Never split a chapter into chunks smaller than this.
+        summary_tokens : int
+            The expected length of one summary. gpt-3.5-turbo summaries of 12k-token chapters were about 500.
+        summary_reserve : int
+            Room kept in the context window for the summary, capped at the model's max_output_tokens.
+        base_latency : float
+            Seconds a call takes before any tokens are processed.
+        input_tokens_per_second : float
+            How fast the model reads the prompt.
+        output_tokens_per_second : float
+            How fast the model writes the response.
+        """
+        if objective not in self.OBJECTIVES:
+            raise ValueError(f"Unknown objective {objective!r}, expected one of {', '.join(self.OBJECTIVES)}.")
+        self.objective = objective
+        self.concurrency = concurrency
+        self.max_chunk_tokens = max_chunk_tokens
+        self.quality_chunk_tokens = quality_chunk_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.summary_tokens = summary_tokens
+        self.summary_reserve = summary_reserve
+        self.base_latency = base_latency
+        self.input_tokens_per_second = input_tokens_per_second
+        self.output_tokens_per_second = output_tokens_per_second
+
+    def reserve(self, model: LLMClient) -> int:
+        """Tokens of the context window kept free for the response."""
+        return min(self.summary_reserve, model.max_output_tokens)
+
+    def max_chunk_size(self, model: LLMClient, prompt_tokens: int) -> int:
+        """
+        The largest chunk that fits in one call alongside the prompt and the response.
+
+        Raises
+        ------
+        ValueError
+            If the prompt leaves no room for any text.
+        """
+        size = model.max_tokens - prompt_tokens - self.MESSAGE_OVERHEAD - self.reserve(model)
+        if self.max_chunk_tokens is not None:
+            size = min(size, self.max_chunk_tokens)
+        if size <= 0:
+            raise ValueError(f"The prompt leaves no room for text in {model.model_name}'s context window.")
+        return size
+
+    def _call_seconds(self, input_tokens: int) -> float:
+        reading = input_tokens / self.input_tokens_per_second
+        writing = self.summary_tokens / self.output_tokens_per_second
+        return self.base_latency + reading + writing
+
+    def estimate(
+        self, chunks: int, text_tokens: int, prompt_tokens: int, combine_prompt_tokens: int, model: LLMClient
+    ) -> dict:
+        """
+        The estimated wall time and cost of summarizing a text in a given number of chunks.
+
+        Returns
+        -------
+        dict
+            {"seconds": float, "cost": float}
+        """
+        overhead = prompt_tokens + self.MESSAGE_OVERHEAD
+        seconds = math.ceil(chunks / self.concurrency) * self._call_seconds(math.ceil(text_tokens / chunks) + overhead)
+        tokens = text_tokens + chunks * (overhead + self.summary_tokens)
+        if chunks > 1:
+            combine_input = chunks * self.summary_tokens + combine_prompt_tokens + self.MESSAGE_OVERHEAD
+            seconds += self._call_seconds(combine_input)
+            tokens += combine_input + self.summary_tokens
+        return {"seconds": seconds, "cost": tokens * model.cost_per_token}
+
+    def plan(
+        self,
+        text_tokens: int,
+        model: LLMClient,
+        prompt_tokens: int,
+        combine_prompt_tokens: int | None = None,
+        combiner_model: LLMClient | None = None,
+        overlap: int = 0,
+    ) -> dict:
+        """
+        Picks the number and size of chunks for a text.
+
+        Parameters
+        ----------
+        text_tokens : int
+            The length of the text.
+        model : LLMClient
+            The model that summarizes the chunks.
+        prompt_tokens : int
+            The length of the system prompt and instruction sent with each chunk.
+        combine_prompt_tokens : int, optional
+            The length of the prompts sent with the combine call. Defaults to `prompt_tokens`.
+        combiner_model : LLMClient, optional
+            The model that combines the chunk summaries, which limits how many chunks there can be.
+            Defaults to `model`.
+        overlap : int
+            Tokens repeated at the start of each chunk from the end of the previous one.
+
+        Returns
+        -------
+        dict
+            {"chunks": int, "chunk_size": int, "seconds": float, "cost": float}, where chunk_size is the
+            value to chunk the text with.
+        """
+        combine_prompt_tokens = prompt_tokens if combine_prompt_tokens is None else combine_prompt_tokens
+        combiner_model = combiner_model or model
+        max_size = self.max_chunk_size(model, prompt_tokens)
+        if max_size <= overlap:
+            raise ValueError(f"Chunks of at most {max_size} tokens cannot overlap by {overlap} tokens.")
+
+        def chunk_size(chunks: int) -> int:
+            if chunks == 1:
+                return max_size
+            return min(max_size, math.ceil(max(text_tokens - overlap, 0) / chunks) + overlap)
+
+        fewest = 1 if text_tokens <= max_size else math.ceil((text_tokens - overlap) / (max_size - overlap))
+        combine_room = combiner_model.max_tokens - combine_prompt_tokens - self.MESSAGE_OVERHEAD
+        most = min(
+            text_tokens // self.min_chunk_tokens,
+            (combine_room - self.reserve(combiner_model)) // self.summary_tokens,
+        )
+        candidates = range(fewest, max(fewest, most) + 1)
+
+        def estimate(chunks: int) -> dict:
+            return self.estimate(chunks, text_tokens, prompt_tokens, combine_prompt_tokens, model)
+
+        if self.objective == "latency":
+            chunks = min(candidates, key=lambda n: (estimate(n)["seconds"], estimate(n)["cost"]))
+        elif self.objective == "cost":
+            chunks = min(candidates, key=lambda n: (estimate(n)["cost"], estimate(n)["seconds"]))
+        else:
+            chunks = next((n for n in candidates if chunk_size(n) <= self.quality_chunk_tokens), candidates[-1])
+        return {"chunks": chunks, "chunk_size": chunk_size(chunks), **estimate(chunks)}
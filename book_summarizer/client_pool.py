@@ -0,0 +1,336 @@
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+from book_summarizer.llm_core import LLMClient, is_error_response, is_retryable_error
+
+
+class CircuitBreaker:
+    """
+    Stops sending calls to a backend that keeps failing, and lets a single trial call through after a pause.
+
+    The breaker is "closed" while the backend works. After `failure_threshold` failures in a row it "opens"
+    and the backend is skipped. Once `reset_timeout` seconds have passed it is "half_open": one trial call
+    is allowed, which closes the breaker if it succeeds and opens it again if it fails.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self, failure_threshold: int = 3, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+
+    def available(self) -> bool:
+        """Whether a call may be sent now, without taking the half-open trial."""
+        if self.state == self.CLOSED:
+            return True
+        return self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout
+
+    def allow(self) -> bool:
+        """Takes permission to send a call, moving an open breaker whose timeout has passed to half-open."""
+        if not self.available():
+            return False
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = self._clock()
+
+
+class PoolMember:
+    """
+    One backend of a ClientPool with what the pool has observed about it.
+
+    Attributes
+    ----------
+    client : LLMClient
+        The backend.
+    name : str
+        Shown in ClientPool.status.
+    breaker : CircuitBreaker
+        Tracks whether the backend is currently failing.
+    latency : float, optional
+        A moving average of successful call durations in seconds, None until the first success.
+    in_flight : int
+        Calls currently waiting on this backend.
+    """
+
+    RATE_LIMIT_WINDOW = 60  # seconds; OpenAI limits are per minute
+
+    def __init__(self, client: LLMClient, name: str, breaker: CircuitBreaker):
+        self.client = client
+        self.name = name
+        self.breaker = breaker
+        self.latency: float | None = None
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+
+    def headroom(self) -> float:
+        """
+        The fraction of the backend's rate limit still available, from the limits it last reported.
+        1.0 when the backend does not report limits, or last reported them longer ago than a limit window.
+        """
+        limits = getattr(self.client, "rate_limits", None) or {}
+        if time.time() - getattr(self.client, "rate_limits_updated", 0.0) > self.RATE_LIMIT_WINDOW:
+            return 1.0
+        fractions = [
+            limits[f"remaining_{kind}"] / limits[f"limit_{kind}"]
+            for kind in ("requests", "tokens")
+            if limits.get(f"limit_{kind}") and f"remaining_{kind}" in limits
+        ]
+        return min(fractions, default=1.0)
+
+    def expected_wait(self) -> float:
+        """
+        How long a new call is expected to take: the average latency times the queue in front of it,
+        stretched as the rate limit runs out. Untried backends score 0 so that each gets measured, and backends
+        with no headroom left score infinity.
+        """
+        headroom = self.headroom()
+        if headroom <= 0:
+            return float("inf")  # the backend would only answer with a rate-limit error
+        if self.latency is None:
+            return 0.0
+        return self.latency * (self.in_flight + 1) / headroom
+
+
+class ClientPool(LLMClient):
+    """
+    An LLMClient that spreads calls over several backends: other API keys, other providers, or local
+    OpenAI-compatible servers serving an equivalent model.
+
+    Each call goes to the available backend with the lowest expected wait, based on observed latency,
+    calls in flight and the rate-limit headroom the backend reports. A failed call is retried on the next
+    best backend, and a backend that keeps failing is skipped by its circuit breaker until it recovers,
+    so one degraded endpoint does not stall a whole book. Only rate limits, timeouts, connection and server
+    errors count as failures. Errors caused by the request itself, such as an oversized context, are returned
+    straight away, since every backend would refuse the request the same way.
+
+    Backends should be created with few retries, e.g. `GPT4oMini(api_key=..., max_retries=1)`, so that a
+    rate-limited backend fails over quickly instead of sleeping through its own backoff.
+
+    Attributes
+    ----------
+    members : list of PoolMember
+        The backends, in the order given.
+    """
+
+    LATENCY_SMOOTHING = 0.2
+    # How a call on a backend ended. "rejected": the backend answered, but not with a usable response, e.g. an
+    # invalid request or a stream the caller stopped reading. That says the backend is up, but not how fast it is.
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    REJECTED = "rejected"
+
+    def __init__(
+        self,
+        clients: list[LLMClient],
+        names: list[str] | None = None,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        health_check_interval: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Parameters
+        ----------
+        clients : list of LLMClient
+            The backends. They should serve the same or equivalent models.
+        names : list of str, optional
+            A name for each backend. Defaults to "<model name>#<position>".
+        failure_threshold : int
+            Failures in a row before a backend's circuit opens.
+        reset_timeout : float
+            Seconds before an open circuit lets a trial call through.
+        health_check_interval : float, optional
+            If given, a background thread probes backends with open circuits this often, see check_health.
+            close stops it.
+        clock : Callable[[], float]
+            The time source for circuit breakers and latency.
+        """
+        if not clients:
+            raise ValueError("A ClientPool needs at least one client.")
+        names = names or [f"{client.model_name}#{position}" for position, client in enumerate(clients)]
+        self.members = [
+            PoolMember(client, name, CircuitBreaker(failure_threshold, reset_timeout, clock))
+            for client, name in zip(clients, names)
+        ]
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._health_checker: threading.Thread | None = None
+        if health_check_interval:
+            self._health_checker = threading.Thread(
+                target=self._health_check_loop, args=(health_check_interval,), daemon=True
+            )
+            self._health_checker.start()
+
+    @property
+    def model_name(self) -> str:
+        return self.members[0].client.model_name
+
+    @property
+    def max_tokens(self) -> int:
+        return min(member.client.max_tokens for member in self.members)
+
+    @property
+    def max_output_tokens(self) -> int:
+        return min(member.client.max_output_tokens for member in self.members)
+
+    @property
+    def cost_per_token(self) -> float:
+        # The most expensive backend, so that budgets stay conservative whichever backend is used
+        return max(member.client.cost_per_token for member in self.members)
+
+    def _acquire(self, tried: set[str]) -> PoolMember | None:
+        with self._lock:
+            candidates = [member for member in self.members if member.name not in tried and member.breaker.available()]
+            if not candidates:
+                return None
+            member = min(candidates, key=lambda member: (member.expected_wait(), member.in_flight, member.calls))
+            member.breaker.allow()
+            member.in_flight += 1
+            member.calls += 1
+            return member
+
+    def _release(self, member: PoolMember, elapsed: float, outcome: str) -> None:
+        with self._lock:
+            member.in_flight -= 1
+            if outcome == self.FAILED:
+                member.failures += 1
+                member.breaker.record_failure()
+                return
+            member.breaker.record_success()
+            if outcome == self.SUCCEEDED:
+                if member.latency is None:
+                    member.latency = elapsed
+                else:
+                    member.latency += self.LATENCY_SMOOTHING * (elapsed - member.latency)
+
+    def _outcome(self, response: str) -> str:
+        if not is_error_response(response):
+            return self.SUCCEEDED
+        return self.FAILED if is_retryable_error(response) else self.REJECTED
+
+    def call(self, system_prompt: str, instruction: str) -> str:
+        tried: set[str] = set()
+        response = "Error: No backend in the pool is available."
+        while (member := self._acquire(tried)) is not None:
+            tried.add(member.name)
+            start = self._clock()
+            try:
+                response = member.client.call(system_prompt, instruction)
+            except Exception as e:
+                response = f"Error: {e}"
+            outcome = self._outcome(response)
+            self._release(member, self._clock() - start, outcome)
+            if outcome != self.FAILED:
+                return response
+        return response
+
+    def stream(self, system_prompt: str, instruction: str) -> Iterator[str]:
+        tried: set[str] = set()
+        response = "Error: No backend in the pool is available."
+        while (member := self._acquire(tried)) is not None:
+            tried.add(member.name)
+            start = self._clock()
+            pieces = member.client.stream(system_prompt, instruction)
+            try:
+                first = next(pieces, "")
+            except Exception as e:
+                first = f"Error: {e}"
+            # Streaming clients report failure as a lone error string before any content
+            if is_retryable_error(first):
+                response = first
+                self._release(member, self._clock() - start, self.FAILED)
+                continue
+            # Content already sent to the caller cannot be taken back, so a stream that breaks off is not retried
+            outcome = self.FAILED
+            try:
+                # A stream that broke off ends with an error piece, which decides the outcome
+                last = first
+                yield first
+                for piece in pieces:
+                    if is_error_response(piece):
+                        last = piece
+                    yield piece
+                outcome = self._outcome(last)
+            except GeneratorExit:
+                outcome = self.REJECTED
+                raise
+            finally:
+                self._release(member, self._clock() - start, outcome)
+            return
+        yield response
+
+    def check_health(self, include_healthy: bool = False) -> list[dict]:
+        """
+        Sends a tiny probe call to each backend whose circuit is open and due a trial, so that a recovered
+        backend rejoins the pool without a real call having to fail on it first.
+
+        Parameters
+        ----------
+        include_healthy : bool
+            Probe every backend, not just the failing ones.
+
+        Returns
+        -------
+        list of dict
+            The status of every backend afterwards.
+        """
+        for member in self.members:
+            with self._lock:
+                due = member.breaker.state != CircuitBreaker.CLOSED and member.breaker.available()
+                if not (due or include_healthy) or not member.breaker.allow():
+                    continue
+                member.in_flight += 1
+            start = self._clock()
+            try:
+                response = member.client.call("Reply with the single word OK.", "OK?")
+            except Exception as e:
+                response = f"Error: {e}"
+            self._release(member, self._clock() - start, self._outcome(response))
+        return self.status()
+
+    def _health_check_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self.check_health()
+
+    def close(self) -> None:
+        """Stops the health-check thread, if there is one."""
+        self._closed.set()
+        if self._health_checker is not None:
+            self._health_checker.join()
+
+    def status(self) -> list[dict]:
+        """{"name", "state", "latency", "in_flight", "calls", "failures", "headroom"} for each backend."""
+        with self._lock:
+            return [
+                {
+                    "name": member.name,
+                    "state": member.breaker.state,
+                    "latency": member.latency,
+                    "in_flight": member.in_flight,
+                    "calls": member.calls,
+                    "failures": member.failures,
+                    "headroom": member.headroom(),
+                }
+                for member in self.members
+            ]
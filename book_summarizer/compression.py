@@ -0,0 +1,199 @@
+import math
+import re
+
+import numpy as np
+
+from book_summarizer.text_processing import split_sentences
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+QUOTE_MARKS = re.compile(r"[\"“”]")
+
+
+def quoted_sentences(sentences: list[str]) -> list[bool]:
+    """
+    Marks the sentences that contain a quote or lie inside one, so that compression never cuts a quote apart.
+
+    Args:
+        sentences (list[str]): The sentences of a text, in order.
+
+    Returns:
+        list[bool]: True for each sentence that is part of a quote.
+    """
+    flags = []
+    inside = False
+    for sentence in sentences:
+        marks = QUOTE_MARKS.findall(sentence)
+        flags.append(inside or bool(marks))
+        for mark in marks:
+            inside = mark == "“" or (mark == '"' and not inside)
+    return flags
+
+
+class ExtractiveCompressor:
+    """
+    Shortens a chapter before it is sent to the model by dropping its least informative sentences.
+
+    Sentences are scored locally, without any model calls, and the best are kept until `ratio` of the
+    chapter's characters remain. Kept sentences stay in their original order. Sentences that contain or sit
+    inside a quote, and the opening sentence, which usually holds the chapter title, are always kept.
+
+    Two scorings are available, both over TF-IDF vectors of the sentences:
+
+    - "textrank": PageRank over the graph of cosine similarities between sentences, which favours
+      sentences that share vocabulary with many others. Each sentence is linked only to the sentences within
+      `window` places of it, so the graph grows linearly with the chapter rather than quadratically.
+    - "tfidf": cosine similarity of each sentence to the chapter as a whole, which is cheaper.
+
+    Attributes
+    ----------
+    ratio : float
+        The fraction of the text to keep, between 0 and 1.
+    method : str
+        "textrank" or "tfidf".
+    window : int
+        How many sentences either side of a sentence TextRank compares it with.
+    """
+
+    METHODS = ("textrank", "tfidf")
+
+    def __init__(
+        self,
+        ratio: float = 0.6,
+        method: str = "textrank",
+        min_sentences: int = 10,
+        damping: float = 0.85,
+        iterations: int = 50,
+        window: int = 200,
+    ):
+        """
+        Parameters
+        ----------
+        ratio : float
+            The fraction of the text to keep, between 0 and 1.
+        method : str
+            "textrank" or "tfidf".
+        min_sentences : int
+            Texts with fewer sentences than this are left alone.
+        damping : float
+            The TextRank damping factor.
+        iterations : int
+            The most TextRank power iterations.
+        window : int
+            How many sentences either side of a sentence TextRank compares it with.
+        """
+        if not 0 < ratio <= 1:
+            raise ValueError(f"The compression ratio must be in (0, 1], got {ratio}.")
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown method {method!r}, expected one of {', '.join(self.METHODS)}.")
+        self.ratio = ratio
+        self.method = method
+        self.min_sentences = min_sentences
+        self.damping = damping
+        self.iterations = iterations
+        self.window = window
+
+    @staticmethod
+    def tfidf_vectors(sentences: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        L2-normalised TF-IDF vectors of the sentences, one row per sentence.
+
+        A chapter has thousands of sentences and a vocabulary of thousands of words, but each sentence uses only
+        a few of them, so the matrix is returned sparse: the row, column and value of each nonzero entry,
+        ordered by row.
+        """
+        vocabulary: dict[str, int] = {}
+        rows, columns = [], []
+        for row, sentence in enumerate(sentences):
+            for word in WORD_PATTERN.findall(sentence.lower()):
+                rows.append(row)
+                columns.append(vocabulary.setdefault(word, len(vocabulary)))
+        width = max(len(vocabulary), 1)
+        entries, counts = np.unique(
+            np.array(rows, dtype=np.int64) * width + np.array(columns, dtype=np.int64), return_counts=True
+        )
+        rows, columns = np.divmod(entries, width)
+        document_frequency = np.bincount(columns, minlength=len(vocabulary))
+        idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+        values = counts * idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=values**2, minlength=len(sentences)))
+        return rows, columns, values / norms[rows]
+
+    def similarity_graph(self, sentences: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The cosine similarities between each sentence and the sentences within `window` places of it, as the
+        source, target and weight of each edge. Both directions of an edge are listed.
+        """
+        rows, columns, values = self.tfidf_vectors(sentences)
+        window = self.window
+        sources, targets, weights = [], [], []
+        # Each block holds the sentences of one window and the window after it, so every pair of sentences
+        # within `window` places of each other meets in exactly one block
+        for start in range(0, len(sentences), window):
+            end = min(len(sentences), start + 2 * window)
+            first, last = np.searchsorted(rows, [start, end])
+            block_columns, local_columns = np.unique(columns[first:last], return_inverse=True)
+            vectors = np.zeros((end - start, len(block_columns)))
+            vectors[rows[first:last] - start, local_columns] = values[first:last]
+            similarity = vectors[: min(window, end - start)] @ vectors.T
+            source, target = np.nonzero(similarity)
+            near = (target > source) & (target - source <= window)
+            source, target = source[near], target[near]
+            sources += [source + start, target + start]
+            targets += [target + start, source + start]
+            weights += [similarity[source, target]] * 2
+        if not sources:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+
+    def score_sentences(self, sentences: list[str]) -> np.ndarray:
+        """Scores each sentence by how much of the text's content it carries; higher is kept first."""
+        count = len(sentences)
+        if self.method == "tfidf":
+            rows, columns, values = self.tfidf_vectors(sentences)
+            centroid = np.bincount(columns, weights=values, minlength=columns.max(initial=-1) + 1)
+            return np.bincount(rows, weights=values * centroid[columns], minlength=count) / (
+                np.linalg.norm(centroid) or 1
+            )
+
+        sources, targets, weights = self.similarity_graph(sentences)
+        row_sums = np.bincount(sources, weights=weights, minlength=count)
+        share = weights / row_sums[sources]
+        # Sentences with no similar sentence link to every sentence evenly
+        dangling = row_sums == 0
+        scores = np.full(count, 1 / count)
+        for _ in range(self.iterations):
+            received = np.bincount(targets, weights=share * scores[sources], minlength=count)
+            updated = (1 - self.damping) / count + self.damping * (received + scores[dangling].sum() / count)
+            if np.abs(updated - scores).sum() < 1e-6:
+                return updated
+            scores = updated
+        return scores
+
+    def compress(self, text: str) -> str:
+        """
+        Returns the text with its lowest-scoring sentences removed.
+
+        Parameters
+        ----------
+        text : str
+            The chapter text.
+
+        Returns
+        -------
+        str
+            The kept sentences, in their original order and with their original whitespace.
+        """
+        sentences = split_sentences(text)
+        if self.ratio == 1 or len(sentences) < self.min_sentences:
+            return text
+
+        keep = quoted_sentences(sentences)
+        keep[0] = True
+        budget = math.ceil(len(text) * self.ratio) - sum(len(s) for s, kept in zip(sentences, keep) if kept)
+        for index in np.argsort(-self.score_sentences(sentences), kind="stable"):
+            if budget <= 0:
+                break
+            if not keep[index]:
+                keep[index] = True
+                budget -= len(sentences[index])
+        return "".join(sentence for sentence, kept in zip(sentences, keep) if kept)
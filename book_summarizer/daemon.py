@@ -0,0 +1,506 @@
+import argparse
+import hmac
+import http.client
+import itertools
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from book_summarizer.llm_core import GPT4O, GPT4oMini, LLMClient
+from book_summarizer.rate_limit import RateLimitedClient, RateLimiter
+from book_summarizer.result_cache import ResultCache
+from book_summarizer.summarizer import BookSummarizer
+from book_summarizer.text_processing import TextProcessor
+
+# Options a job may set. Jobs arrive as JSON, so models are chosen by the daemon rather than the job.
+DAEMON_OPTIONS = {
+    "summarizer_prompt",
+    "summarizer_instruction",
+    "combiner_prompt",
+    "verify_quotes",
+    "speculate",
+    "pack_sections",
+    "analyze",
+    "time_budget",
+}
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+# Read by the daemon and DaemonClient when no token is given
+TOKEN_VARIABLE = "BOOK_SUMMARIZER_DAEMON_TOKEN"
+
+
+def _split_address(address: str) -> tuple[str, int] | str:
+    """("host", port) for "host:port", or the socket path for "unix:/path/to/socket"."""
+    if address.startswith("unix:"):
+        return address[len("unix:") :]
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class SummarizationDaemon:
+    """
+    A long-lived summarization service that keeps everything a job needs warm between jobs.
+
+    Starting a book from the command line pays for imports, tiktoken encodings, a fresh HTTP connection to the
+    API and parsing the EPUB before the first call is made. The daemon pays for those once:
+
+    - the tiktoken encoding of every model is loaded at startup;
+    - the models, and the OpenAI client's connection pool behind them, are shared by every job;
+    - the last `max_books` books are kept parsed, along with their quote verifiers, keyed by path, size and
+      modification time so that an edited book is parsed again;
+    - with a cache_path, one ResultCache is shared by every job.
+
+    Jobs are submitted over a small JSON HTTP API, on a TCP port or a Unix socket, see serve and DaemonClient:
+
+    - POST /jobs with {"epub_path": str, "output_path": str or null, "options": {...}} returns {"id": int}.
+      The body must be sent as application/json.
+    - GET /jobs/<id> returns the job.
+    - GET /health returns the number of books and jobs held and the cache statistics.
+
+    Every request must carry the daemon's token as "Authorization: Bearer <token>", so that other users and
+    web pages that can reach the port cannot submit jobs. A job may only write its summary to a .md file next
+    to its book or under one of `output_dirs`, and never over the book or over a file the daemon did not write
+    itself, so that a request cannot overwrite arbitrary files.
+
+    Job statuses are "queued", "running", "done" and "failed", as in JobQueue. Only the last
+    `max_finished_jobs` finished jobs are kept; older ones are no longer found.
+
+    Attributes
+    ----------
+    token : str
+        The shared secret clients must send.
+    output_dirs : list of str
+        Directories summaries may be written under, besides the book's own directory.
+    """
+
+    MAX_BOOKS = 8
+    MAX_FINISHED_JOBS = 100
+
+    def __init__(
+        self,
+        summarizer_model: LLMClient = GPT4oMini(),
+        combiner_model: LLMClient = GPT4O(),
+        title_model: LLMClient = GPT4O(),
+        worthiness_model: LLMClient = GPT4oMini(),
+        rate_limiter: RateLimiter | None = None,
+        cache_path: str | None = None,
+        max_jobs: int = 2,
+        max_books: int | None = None,
+        max_finished_jobs: int | None = None,
+        token: str | None = None,
+        output_dirs: list[str] | None = None,
+    ):
+        """
+        Parameters
+        ----------
+        summarizer_model, combiner_model, title_model, worthiness_model : LLMClient
+            The models used for every job.
+        rate_limiter : RateLimiter, optional
+            Shared by every model call.
+        cache_path : str, optional
+            A ResultCache file shared by every job.
+        max_jobs : int
+            How many books are summarized at once. Each book runs its chapters in parallel as well.
+        max_books : int, optional
+            How many parsed books to keep. Defaults to MAX_BOOKS.
+        max_finished_jobs : int, optional
+            How many finished jobs to keep for clients to look up. Defaults to MAX_FINISHED_JOBS.
+        token : str, optional
+            The shared secret clients must send. Defaults to the BOOK_SUMMARIZER_DAEMON_TOKEN environment
+            variable, or a random token if that is not set.
+        output_dirs : list of str, optional
+            Directories summaries may also be written under. By default only the book's own directory.
+        """
+        models = (summarizer_model, combiner_model, title_model, worthiness_model)
+        if rate_limiter is not None:
+            models = tuple(RateLimitedClient(model, rate_limiter) for model in models)
+        self.summarizer_model, self.combiner_model, self.title_model, self.worthiness_model = models
+        # tiktoken keeps loaded encodings, so loading them here means no job waits for one
+        for model in models:
+            TextProcessor(model).encoding
+        self.cache = ResultCache(cache_path) if cache_path else None
+        self.max_books = max_books or self.MAX_BOOKS
+        self.max_finished_jobs = max_finished_jobs or self.MAX_FINISHED_JOBS
+        self.token = token or os.environ.get(TOKEN_VARIABLE) or secrets.token_urlsafe(32)
+        self.output_dirs = [os.path.realpath(directory) for directory in output_dirs or []]
+        self._books: OrderedDict[tuple, BookSummarizer] = OrderedDict()
+        self._jobs: dict[int, dict] = {}
+        self._finished: deque[int] = deque()
+        self._outputs: set[str] = set()
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="daemon-job")
+        self.server: socketserver.BaseServer | None = None
+
+    def summarizer(self, epub_path: str) -> BookSummarizer:
+        """Returns the BookSummarizer for a book, reusing the parsed book if it has not changed on disk."""
+        path = os.path.abspath(epub_path)
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if key in self._books:
+                self._books.move_to_end(key)
+                return self._books[key]
+        summarizer = BookSummarizer(path)
+        summarizer.cache = self.cache
+        with self._lock:
+            summarizer = self._books.setdefault(key, summarizer)
+            self._books.move_to_end(key)
+            while len(self._books) > self.max_books:
+                self._books.popitem(last=False)
+        return summarizer
+
+    def submit(self, epub_path: str, output_path: str | None = None, options: dict | None = None) -> int:
+        """
+        Queues a book.
+
+        Parameters
+        ----------
+        epub_path : str
+            The book, as a path the daemon can read.
+        output_path : str, optional
+            Where the summary is written, a .md file next to the book or under one of `output_dirs`. Defaults
+            to the EPUB path with a _summary.md suffix.
+        options : dict, optional
+            Any of DAEMON_OPTIONS, passed to BookSummarizer.summarize_book.
+
+        Returns
+        -------
+        int
+            The job id.
+
+        Raises
+        ------
+        ValueError
+            If an option is not one of DAEMON_OPTIONS, or the daemon may not write to the output path.
+        FileNotFoundError
+            If the book does not exist.
+        """
+        options = options or {}
+        unknown = set(options) - DAEMON_OPTIONS
+        if unknown:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}.")
+        if not os.path.isfile(epub_path):
+            raise FileNotFoundError(f"No such book: {epub_path}")
+        if output_path is not None:
+            output_path = self._check_output_path(epub_path, output_path, analyze=bool(options.get("analyze")))
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = {
+                "id": job_id,
+                "epub_path": epub_path,
+                "output_path": output_path,
+                "options": options,
+                "status": "queued",
+                "chapters": None,
+                "chapters_done": 0,
+                "error": None,
+                "created": time.time(),
+                "started": None,
+                "finished": None,
+            }
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def _check_output_path(self, epub_path: str, output_path: str, analyze: bool = False) -> str:
+        """
+        The output path with links resolved, if the daemon may write the summary there.
+
+        The path must be a Markdown file next to the book or under the output directories, must not be the book
+        itself, and must not be an existing file unless this daemon wrote it for an earlier job. With `analyze`
+        the quotes and facts files written beside the summary are checked as well.
+        """
+        path = os.path.realpath(output_path)
+        if not path.endswith(".md"):
+            raise ValueError(f"Summaries are written as Markdown, so the output path must end in .md: {output_path}")
+        allowed = [os.path.dirname(os.path.realpath(epub_path)), *self.output_dirs]
+        if not any(os.path.commonpath([path, directory]) == directory for directory in allowed):
+            raise ValueError(
+                f"Summaries may only be written next to the book or under the output directories: {output_path}"
+            )
+        paths = [path]
+        if analyze:
+            base = os.path.splitext(path)[0]
+            paths += [f"{base}_quotes.md", f"{base}_facts.md"]
+        with self._lock:
+            for candidate in paths:
+                if candidate == os.path.realpath(epub_path):
+                    raise ValueError(f"The summary would overwrite the book itself: {output_path}")
+                if os.path.exists(candidate) and candidate not in self._outputs:
+                    raise ValueError(f"Will not overwrite a file the daemon did not write: {candidate}")
+            self._outputs.update(paths)
+        return path
+
+    def job(self, job_id: int) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id: int, **fields) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _chapter_done(self, job_id: int) -> None:
+        with self._lock:
+            self._jobs[job_id]["chapters_done"] += 1
+
+    def _run(self, job_id: int) -> None:
+        job = self.job(job_id)
+        self._update(job_id, status="running", started=time.time())
+        try:
+            summarizer = self.summarizer(job["epub_path"])
+            output_path = job["output_path"] or summarizer._default_save_path()
+            self._update(job_id, chapters=len(summarizer.chapters), output_path=output_path)
+            summarizer.summarize_book(
+                output_path,
+                summarizer_model=self.summarizer_model,
+                combiner_model=self.combiner_model,
+                title_model=self.title_model,
+                worthiness_model=self.worthiness_model,
+                on_chapter=lambda result: self._chapter_done(job_id),
+                **job["options"],
+            )
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished=time.time())
+        else:
+            self._update(job_id, status="done", finished=time.time())
+        with self._lock:
+            self._finished.append(job_id)
+            while len(self._finished) > self.max_finished_jobs:
+                del self._jobs[self._finished.popleft()]
+
+    def health(self) -> dict:
+        with self._lock:
+            books, jobs = len(self._books), len(self._jobs)
+        return {"status": "ok", "books": books, "jobs": jobs, "cache": self.cache.stats() if self.cache else None}
+
+    def serve(self, address: str = DEFAULT_ADDRESS) -> socketserver.BaseServer:
+        """
+        Starts answering requests on a background thread and returns the server.
+
+        Parameters
+        ----------
+        address : str
+            "host:port", or "unix:/path/to/socket". Port 0 picks a free port, see server.server_address.
+        """
+        target = _split_address(address)
+        handler = type("Handler", (_DaemonRequestHandler,), {"daemon": self})
+        if isinstance(target, str):
+            if os.path.exists(target):
+                os.unlink(target)
+            self.server = _UnixHTTPServer(target, handler)
+            os.chmod(target, 0o600)
+        else:
+            self.server = ThreadingHTTPServer(target, handler)
+        threading.Thread(target=self.server.serve_forever, name="daemon-server", daemon=True).start()
+        return self.server
+
+    def close(self) -> None:
+        """Stops the server and waits for running jobs to finish."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            if isinstance(self.server, _UnixHTTPServer):
+                os.unlink(self.server.server_address)
+        self._executor.shutdown(wait=True)
+        if self.cache is not None:
+            self.cache.close()
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ("local", 0)
+
+
+class _DaemonRequestHandler(BaseHTTPRequestHandler):
+    daemon: SummarizationDaemon
+
+    def _send(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _authorized(self) -> bool:
+        expected = f"Bearer {self.daemon.token}".encode("utf-8")
+        if hmac.compare_digest(self.headers.get("Authorization", "").encode("utf-8"), expected):
+            return True
+        self._send(401, {"error": "Missing or wrong daemon token."})
+        return False
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        if self.path == "/health":
+            self._send(200, self.daemon.health())
+            return
+        prefix, _, job_id = self.path.rpartition("/")
+        job = self.daemon.job(int(job_id)) if prefix == "/jobs" and job_id.isdigit() else None
+        if job is None:
+            self._send(404, {"error": f"Not found: {self.path}"})
+        else:
+            self._send(200, job)
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        if self.path != "/jobs":
+            self._send(404, {"error": f"Not found: {self.path}"})
+            return
+        # Browsers send cross-site form posts without a preflight check, but never as application/json
+        if self.headers.get_content_type() != "application/json":
+            self._send(415, {"error": "Jobs must be sent as application/json."})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            job_id = self.daemon.submit(request["epub_path"], request.get("output_path"), request.get("options"))
+        except (ValueError, KeyError, TypeError, FileNotFoundError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        self._send(201, {"id": job_id})
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DaemonClient:
+    """
+    Talks to a SummarizationDaemon. BookSummarizer.summarize_book_with_daemon uses one to hand a book over.
+
+    Attributes
+    ----------
+    address : str
+        "host:port", or "unix:/path/to/socket".
+    token : str
+        The daemon's token. Defaults to the BOOK_SUMMARIZER_DAEMON_TOKEN environment variable.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: float = 30, token: str | None = None):
+        self.address = address
+        self.timeout = timeout
+        self.token = token or os.environ.get(TOKEN_VARIABLE, "")
+
+    def _request(self, method: str, path: str, body: dict | None = None) -> dict:
+        target = _split_address(self.address)
+        if isinstance(target, str):
+            connection = _UnixHTTPConnection(target, self.timeout)
+        else:
+            connection = http.client.HTTPConnection(*target, timeout=self.timeout)
+        try:
+            payload = None if body is None else json.dumps(body)
+            headers = {"Content-Type": "application/json", "Authorization": f"Bearer {self.token}"}
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            result = json.loads(response.read())
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise RuntimeError(f"The daemon refused {method} {path}: {result['error']}")
+        return result
+
+    def submit(self, epub_path: str, output_path: str | None = None, **options) -> int:
+        """
+        Queues a book on the daemon.
+
+        Parameters
+        ----------
+        epub_path : str
+            The book, as a path the daemon can read.
+        output_path : str, optional
+            Where the daemon writes the summary.
+        **options
+            Any of DAEMON_OPTIONS.
+
+        Returns
+        -------
+        int
+            The job id.
+        """
+        body = {"epub_path": os.path.abspath(epub_path), "output_path": output_path, "options": options}
+        if output_path is not None:
+            body["output_path"] = os.path.abspath(output_path)
+        return self._request("POST", "/jobs", body)["id"]
+
+    def job(self, job_id: int) -> dict:
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+    def wait(self, job_id: int, poll_interval: float = 0.5, timeout: float | None = None) -> dict:
+        """
+        Waits for a job to finish.
+
+        Returns
+        -------
+        dict
+            The finished job.
+
+        Raises
+        ------
+        TimeoutError
+            If the job did not finish within the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.job(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout} seconds.")
+            time.sleep(poll_interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a summarization daemon that keeps models and books warm.")
+    parser.add_argument("--listen", default=DEFAULT_ADDRESS, help='"host:port" or "unix:/path/to/socket"')
+    parser.add_argument("--jobs", type=int, default=2, help="Books summarized at once")
+    parser.add_argument("--requests-per-minute", type=float, default=None)
+    parser.add_argument("--tokens-per-minute", type=float, default=None)
+    parser.add_argument("--cache", default=None, help="Path to a ResultCache file")
+    parser.add_argument(
+        "--output-dir",
+        action="append",
+        default=[],
+        help="A directory summaries may be written under, besides each book's own. May be repeated.",
+    )
+    args = parser.parse_args()
+
+    limiter = None
+    if args.requests_per_minute or args.tokens_per_minute:
+        limiter = RateLimiter(args.requests_per_minute, args.tokens_per_minute)
+    daemon = SummarizationDaemon(
+        rate_limiter=limiter, cache_path=args.cache, max_jobs=args.jobs, output_dirs=args.output_dir
+    )
+    daemon.serve(args.listen)
+    print(f"Listening on {args.listen}")
+    if TOKEN_VARIABLE not in os.environ:
+        print(f"Clients must set {TOKEN_VARIABLE}={daemon.token}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        daemon.close()
@@ -0,0 +1,70 @@
+import contextvars
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+_current_deadline: contextvars.ContextVar["Deadline | None"] = contextvars.ContextVar("deadline", default=None)
+
+
+class Deadline:
+    """
+    A point in time by which a piece of work must finish, such as a whole book.
+
+    A deadline is made current for a block of code with `scope`. Every model call made inside it
+    uses the time left as its timeout, and calls are not started at all once it has passed, so one slow
+    request cannot hold up a book past its budget. Nested scopes keep whichever deadline is earlier.
+
+    Attributes
+    ----------
+    expires_at : float
+        The deadline, on the clock's timeline.
+    """
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self._clock() >= self.expires_at
+
+    @contextmanager
+    def scope(self) -> Iterator["Deadline"]:
+        outer = _current_deadline.get()
+        deadline = self if outer is None or self.remaining() <= outer.remaining() else outer
+        token = _current_deadline.set(deadline)
+        try:
+            yield deadline
+        finally:
+            _current_deadline.reset(token)
+
+    @staticmethod
+    def current() -> "Deadline | None":
+        """The deadline of the innermost scope, or None outside any scope."""
+        return _current_deadline.get()
+
+
+def call_timeout(timeout: float | None = None) -> float | None:
+    """
+    The timeout to use for a request: the client's own timeout, shortened to the time left before the
+    current deadline if there is one.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        The client's per-call timeout in seconds, or None for no limit.
+
+    Returns
+    -------
+    float or None
+        The timeout in seconds, or None if neither limit applies.
+    """
+    deadline = Deadline.current()
+    if deadline is None:
+        return timeout
+    if timeout is None:
+        return deadline.remaining()
+    return min(timeout, deadline.remaining())
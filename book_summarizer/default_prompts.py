@@ -32,4 +32,32 @@ DEFAULT_PROMPTS = {
         "Respond True if the section is a chapter, preface, or other section worth summarizing. "
         "Respond False if the section is a title page, table of contents, or otherwise not worth summarizing."
     ),
+    "packed_prompt": (
+        "You are a skilled textual analyst. You will be given several short sections of a book, each marked "
+        "with its id. For each section, deduce its title, decide whether it is worth summarizing, and if it is, "
+        "summarize it. Respond only with a JSON array holding one object per section, in the form "
+        '{"id": <section id>, "title": "<title>", "worthy": <true or false>, "summary": "<summary, or empty>"}.'
+    ),
+    "packed_instruction": (
+        "If a section has a number, put it before its title, as in Chapter 2: A New Dawn. "
+        "Chapters, prefaces and other sections of content are worth summarizing. "
+        "Title pages, tables of contents, copyright pages and indexes are not."
+    ),
+    "analysis_prompt": (
+        "You are a skilled textual analyst that can synthesize the key concepts in long text and identify "
+        "crucial details to retain. Respond only with a JSON object of the form "
+        '{"summary": ["<point>", ...], "quotes": ["<quote>", ...], "facts": ["<fact>", ...]}.'
+    ),
+    "analysis_instruction": (
+        "Read the following part of a chapter once and give three things. "
+        "summary: the key points made by the author, each followed by the reasons or evidence given. "
+        "quotes: the most memorable or important sentences, copied exactly as they appear in the text. "
+        "facts: the concrete facts, figures, names and dates the author relies on, one per entry."
+    ),
+    "chat_prompt": (
+        "You are a thoughtful reading companion helping someone review a nonfiction book they have read. "
+        "Answer using the chapter summaries and passages provided. Quote the passages verbatim when useful "
+        "and say which chapter they come from. If the provided material does not answer the question, say so."
+    ),
+    "chat_instruction": "Answer the reader's latest question about the book.",
 }
@@ -1,12 +1,70 @@
+import math
 import os
+import posixpath
 import re
 import sys
+import zipfile
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from functools import cached_property
+from urllib.parse import unquote
+from xml.etree import ElementTree
 
 import ebooklib
 from bs4 import BeautifulSoup
 from ebooklib import epub
 
 
+class BoilerplateFilter:
+    """
+    Finds lines that repeat across many chapters, such as running headers, footers, copyright notices and
+    table-of-contents link blocks, and strips them.
+
+    Each line is normalised for case and whitespace and hashed. Digits are kept, so that numbered headings
+    such as "Chapter 1" and "Chapter 2" are not mistaken for one repeated line.
+    A line is boilerplate when it occurs in at least `min_chapters` chapters and in at least `min_fraction`
+    of all chapters. Counting and stripping are both a single pass over the text.
+
+    Attributes
+    ----------
+    chapters_seen : int
+        The number of chapters counted so far.
+    """
+
+    def __init__(self, min_chapters: int = 3, min_fraction: float = 0.5):
+        self.min_chapters = min_chapters
+        self.min_fraction = min_fraction
+        self.chapters_seen = 0
+        self._counts: Counter[int] = Counter()
+        self._examples: dict[int, str] = {}
+
+    @staticmethod
+    def line_key(line: str) -> int:
+        return hash(" ".join(line.lower().split()))
+
+    def add(self, chapter: str) -> None:
+        """Counts the distinct lines of one chapter."""
+        self.chapters_seen += 1
+        lines = {self.line_key(line): line.strip() for line in chapter.split("\n")}
+        for key, line in lines.items():
+            self._examples.setdefault(key, line)
+        self._counts.update(lines.keys())
+
+    @property
+    def threshold(self) -> int:
+        return max(self.min_chapters, math.ceil(self.min_fraction * self.chapters_seen))
+
+    def boilerplate(self) -> list[str]:
+        """An example of each repeated line, most frequent first."""
+        return [self._examples[key] for key, count in self._counts.most_common() if count >= self.threshold]
+
+    def strip(self, chapter: str) -> str:
+        """Removes the boilerplate lines from a chapter that was counted."""
+        threshold = self.threshold
+        lines = [line for line in chapter.split("\n") if self._counts[self.line_key(line)] < threshold]
+        return "\n".join(lines).strip()
+
+
 class EpubExtractor:
     """
     Extracts chapterized text from EPUB files.
@@ -18,20 +76,31 @@ class EpubExtractor:
         The file path to the EPUB file.
     chapters : list of str
         The chapters extracted from the EPUB file.
+    boilerplate_report : dict, optional
+        What boilerplate removal took out, see `remove_boilerplate`. None until chapters are extracted.
     """
 
-    def __init__(self, epub_file_path: str):
+    def __init__(self, epub_file_path: str, remove_boilerplate: bool = False):
         """
-        Validates the incoming file path and extracts the chapters from the EPUB file.
+        Validates the incoming file path. Chapters are extracted the first time `chapters` is accessed.
 
         Parameters
         ----------
         epub_file_path : str
             The file path to the EPUB file.
+        remove_boilerplate : bool
+            Strip lines repeated across most chapters, such as running headers and copyright notices,
+            see BoilerplateFilter. Chapters left empty are dropped. Off by default, since a line that
+            legitimately repeats, such as an epigraph or a refrain, would be removed too.
         """
         self.epub_file_path = epub_file_path
+        self.remove_boilerplate = remove_boilerplate
+        self.boilerplate_report: dict | None = None
         self._validate_file_path()
-        self.chapters = self._get_chapters()
+
+    @cached_property
+    def chapters(self) -> list[str]:
+        return self._get_chapters()
 
     def _validate_file_path(self) -> None:
         """
@@ -72,18 +141,129 @@ class EpubExtractor:
         list of str
             A list of strings, each representing a chapter.
         """
-        chapters = []
+        chapters = list(self._iter_documents())
+        if not self.remove_boilerplate:
+            return chapters
+        boilerplate = BoilerplateFilter()
+        for chapter in chapters:
+            boilerplate.add(chapter)
+        return list(self._strip_boilerplate(chapters, boilerplate))
+
+    def iter_chapters(self) -> Iterator[str]:
+        """
+        Extracts and cleans the chapters one at a time, for callers that make a single pass over the book.
+        Boilerplate removal has to see every chapter before it can strip the first, so with it the chapters are
+        read once into `chapters` and yielded from there.
+
+        Yields
+        ------
+        str
+            The text of each non-empty chapter, in the same order as `chapters`.
+        """
+        if self.remove_boilerplate or "chapters" in self.__dict__:
+            yield from self.chapters
+            return
+        yield from self._iter_documents()
+
+    def _iter_documents(self) -> Iterator[str]:
+        """
+        Reads the book's XHTML documents straight from the EPUB's ZIP archive, in reading order, decompressing
+        one document at a time. Images, fonts and other media are never read. Falls back to ebooklib for
+        archives without a usable OPF package file, but only before the first chapter has been yielded, so that
+        an archive that breaks partway through raises rather than repeating its opening chapters.
+        """
+        yielded = False
+        try:
+            with zipfile.ZipFile(self.epub_file_path) as archive:
+                paths = self.document_paths(archive)
+                for path in paths:
+                    with archive.open(path) as file:
+                        text = self._extract_text(file.read().decode("utf-8"))
+                    if text:
+                        yielded = True
+                        yield text
+                return
+        except (KeyError, ElementTree.ParseError, zipfile.BadZipFile):
+            if yielded:
+                raise
+        yield from self._iter_documents_with_ebooklib()
+
+    @staticmethod
+    def document_paths(archive: zipfile.ZipFile) -> list[str]:
+        """
+        Finds the XHTML documents of an EPUB from its OPF package file: those in the spine, in reading order,
+        then any others in the manifest, so that no text is lost. The navigation document is skipped.
+
+        Parameters
+        ----------
+        archive : zipfile.ZipFile
+            The open EPUB.
+
+        Returns
+        -------
+        list of str
+            Paths of the documents within the archive.
+
+        Raises
+        ------
+        KeyError
+            If the container or package file is missing.
+        """
+        container = ElementTree.fromstring(archive.read("META-INF/container.xml"))
+        rootfile = container.find(".//{*}rootfile")
+        if rootfile is None:
+            raise KeyError("META-INF/container.xml names no package file")
+        opf_path = rootfile.attrib["full-path"]
+        package = ElementTree.fromstring(archive.read(opf_path))
+        opf_dir = posixpath.dirname(opf_path)
+
+        documents = {}
+        for item in package.iterfind("{*}manifest/{*}item"):
+            if item.get("media-type") != "application/xhtml+xml" or "nav" in item.get("properties", "").split():
+                continue
+            documents[item.get("id")] = posixpath.normpath(posixpath.join(opf_dir, unquote(item.get("href"))))
+        spine = [itemref.get("idref") for itemref in package.iterfind("{*}spine/{*}itemref")]
+        ordered = [documents[idref] for idref in spine if idref in documents]
+        ordered += [path for path in documents.values() if path not in ordered]
+        names = set(archive.namelist())
+        return [path for path in dict.fromkeys(ordered) if path in names]
+
+    def _iter_documents_with_ebooklib(self) -> Iterator[str]:
         book = epub.read_epub(self.epub_file_path)
 
         for item in book.get_items():
             if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                content = item.get_content().decode("utf-8")
-                soup = BeautifulSoup(content, "html.parser")
-                text = soup.get_text()
-                text = self._clean_text(text)
+                text = self._extract_text(item.get_content().decode("utf-8"))
                 if text:
-                    chapters.append(text)
-        return chapters
+                    yield text
+
+    def _extract_text(self, content: str) -> str:
+        soup = BeautifulSoup(content, "html.parser")
+        # Only the body, as ebooklib does; the <title> in the head usually repeats a heading or the book title
+        return self._clean_text((soup.body or soup).get_text())
+
+    def _strip_boilerplate(self, chapters: Iterable[str], boilerplate: BoilerplateFilter) -> Iterator[str]:
+        """
+        Strips boilerplate from each chapter and records what was removed in `boilerplate_report`:
+        {"lines": examples of the repeated lines, "bytes_removed": total, "bytes_removed_per_chapter": one count
+        for each chapter kept, "chapters_dropped": chapters that were nothing but boilerplate}.
+        """
+        report = {
+            "lines": boilerplate.boilerplate(),
+            "bytes_removed": 0,
+            "bytes_removed_per_chapter": [],
+            "chapters_dropped": 0,
+        }
+        self.boilerplate_report = report
+        for chapter in chapters:
+            stripped = boilerplate.strip(chapter)
+            removed = len(chapter.encode()) - len(stripped.encode())
+            report["bytes_removed"] += removed
+            if not stripped:
+                report["chapters_dropped"] += 1
+                continue
+            report["bytes_removed_per_chapter"].append(removed)
+            yield stripped
 
     def _write_to_txt(self, chapters: list[str], filename: str) -> None:
         """
@@ -0,0 +1,204 @@
+import itertools
+import random
+import time
+
+from joblib import Parallel, delayed
+
+from book_summarizer.compression import ExtractiveCompressor
+from book_summarizer.default_prompts import DEFAULT_PROMPTS
+from book_summarizer.llm_core import LLMClient, is_error_response
+from book_summarizer.rate_limit import RateLimitedClient, RateLimiter
+from book_summarizer.summarizer import BookSummarizer
+from book_summarizer.text_processing import TextProcessor
+
+
+def variant_grid(
+    models: dict[str, LLMClient],
+    system_prompts: dict[str, str] | None = None,
+    instructions: dict[str, str] | None = None,
+    compressors: dict[str, ExtractiveCompressor | None] | None = None,
+) -> list[dict]:
+    """
+    Builds every combination of models, system prompts, instructions and compressors as named variants.
+
+    Args:
+        models (dict[str, LLMClient]): Models by short name.
+        system_prompts (Optional[dict[str, str]]): System prompts by short name. Defaults to the summarizer prompt.
+        instructions (Optional[dict[str, str]]): Instructions by short name. Defaults to the summarizer instruction.
+        compressors (Optional[dict[str, Optional[ExtractiveCompressor]]]): Compressors by short name, None for
+            the full text. If given, the compressor name is added to the variant names.
+
+    Returns:
+        list[dict]: {"name", "model", "system_prompt", "instruction", "compressor"} for each combination,
+            named like "gpt-4o-mini/default/bullets", or "gpt-4o-mini/default/bullets/60%" with compressors.
+    """
+    system_prompts = system_prompts or {"default": DEFAULT_PROMPTS["summarizer_prompt"]}
+    instructions = instructions or {"default": DEFAULT_PROMPTS["summarizer_instruction"]}
+    variants = []
+    for (model_name, model), (prompt_name, system_prompt), (instruction_name, instruction) in itertools.product(
+        models.items(), system_prompts.items(), instructions.items()
+    ):
+        name = f"{model_name}/{prompt_name}/{instruction_name}"
+        for compressor_name, compressor in (compressors or {None: None}).items():
+            variants.append(
+                {
+                    "name": f"{name}/{compressor_name}" if compressors else name,
+                    "model": model,
+                    "system_prompt": system_prompt,
+                    "instruction": instruction,
+                    "compressor": compressor,
+                }
+            )
+    return variants
+
+
+class PromptExperiment:
+    """
+    Runs several prompt and model variants over a sample of chapters at once and compares the results.
+
+    Every (variant, chapter) pair is summarized concurrently through the summarizer, so its result cache
+    applies: re-running after adding a variant only pays for the new one. An optional RateLimiter paces
+    all variants together to stay under the account's limits.
+    """
+
+    MAX_WORKERS = BookSummarizer.MAX_WORKERS
+
+    def __init__(
+        self,
+        summarizer: BookSummarizer,
+        variants: list[dict],
+        chapters: list[int] | None = None,
+        sample_size: int = 3,
+        seed: int = 0,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        """
+        Args:
+            summarizer (BookSummarizer): The summarizer for the book, with a cache if results should be reused.
+            variants (list[dict]): Variants as built by variant_grid. "system_prompt" and "instruction" fall
+                back to the default summarizer prompts.
+            chapters (Optional[list[int]]): The chapter indexes to summarize. If None, a random sample is taken.
+            sample_size (int): The number of chapters to sample when chapters is None.
+            seed (int): Seeds the chapter sample so that repeated runs compare the same chapters.
+            rate_limiter (Optional[RateLimiter]): Shared by every call made by the experiment.
+        """
+        names = [variant["name"] for variant in variants]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Variant names must be unique: {names}")
+        self.summarizer = summarizer
+        self.variants = variants
+        if chapters is None:
+            population = range(len(summarizer.chapters))
+            chapters = sorted(random.Random(seed).sample(population, min(sample_size, len(population))))
+        self.chapters = chapters
+        self.rate_limiter = rate_limiter
+        self.results: list[dict] = []
+
+    def _run_one(self, variant: dict, chapter: int) -> dict:
+        model = variant["model"]
+        system_prompt = variant.get("system_prompt", DEFAULT_PROMPTS["summarizer_prompt"])
+        instruction = variant.get("instruction", DEFAULT_PROMPTS["summarizer_instruction"])
+        original = self.summarizer.chapters[chapter]
+        compressor = variant.get("compressor")
+        text = compressor.compress(original) if compressor else original
+        cache = self.summarizer.cache
+        cached = (
+            cache is not None and self.summarizer._call_key(model, system_prompt, f"{instruction}\n{text}") in cache
+        )
+        client = RateLimitedClient(model, self.rate_limiter) if self.rate_limiter else model
+
+        start = time.perf_counter()
+        summary = self.summarizer.summarize_text(
+            text, model=client, system_prompt=system_prompt, instruction=instruction
+        )
+        latency = time.perf_counter() - start
+
+        processor = TextProcessor(model)
+        compression = self.summarizer.compression_stats(original, text, model)
+        prompt_tokens = len(processor.tokenize_text(system_prompt)) + len(processor.tokenize_text(instruction))
+        prompt_tokens += compression["compressed_tokens"]
+        completion_tokens = len(processor.tokenize_text(summary))
+        return {
+            "variant": variant["name"],
+            "model": model.model_name,
+            "chapter": chapter,
+            "summary": summary,
+            "error": is_error_response(summary),
+            "cached": cached,
+            "latency": latency,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_saved": compression["original_tokens"] - compression["compressed_tokens"],
+            "words": len(summary.split()),
+            "cost": 0.0 if cached else (prompt_tokens + completion_tokens) * model.cost_per_token,
+        }
+
+    def run(self) -> list[dict]:
+        """
+        Summarizes every sampled chapter with every variant, all at once.
+
+        Returns:
+            list[dict]: One result per (variant, chapter) with "summary", "latency" (seconds), "prompt_tokens",
+                "completion_tokens", "tokens_saved" (by the variant's compressor), "words", "cost" (dollars,
+                0 when served from the cache), "cached" and "error", ordered by variant and then chapter.
+        """
+        pairs = [(variant, chapter) for variant in self.variants for chapter in self.chapters]
+        self.results = Parallel(n_jobs=self.MAX_WORKERS, prefer="threads")(
+            delayed(self._run_one)(variant, chapter) for variant, chapter in pairs
+        )
+        return self.results
+
+    def summary_table(self) -> list[dict]:
+        """
+        Totals and averages per variant: chapters, errors, cached, total cost, tokens saved by compression,
+        mean latency and mean words.
+        """
+        rows = []
+        for variant in self.variants:
+            results = [result for result in self.results if result["variant"] == variant["name"]]
+            if not results:
+                continue
+            rows.append(
+                {
+                    "variant": variant["name"],
+                    "model": results[0]["model"],
+                    "chapters": len(results),
+                    "errors": sum(result["error"] for result in results),
+                    "cached": sum(result["cached"] for result in results),
+                    "cost": sum(result["cost"] for result in results),
+                    "tokens_saved": sum(result["tokens_saved"] for result in results),
+                    "mean_latency": sum(result["latency"] for result in results) / len(results),
+                    "mean_words": sum(result["words"] for result in results) / len(results),
+                }
+            )
+        return rows
+
+    def report(self) -> str:
+        """
+        Renders the results as markdown: a comparison table of the variants, then each sampled chapter
+        with every variant's summary one after the other.
+        """
+        lines = [
+            "# Prompt Experiment",
+            "",
+            f"Chapters: {', '.join(str(chapter + 1) for chapter in self.chapters)}",
+            "",
+            "| Variant | Model | Chapters | Errors | Cached | Cost ($) | Tokens saved | Mean latency (s) | Mean words |",
+            "|---|---|---|---|---|---|---|---|---|",
+        ]
+        for row in self.summary_table():
+            lines.append(
+                f"| {row['variant']} | {row['model']} | {row['chapters']} | {row['errors']} | {row['cached']} "
+                f"| {row['cost']:.4f} | {row['tokens_saved']} | {row['mean_latency']:.2f} | {row['mean_words']:.0f} |"
+            )
+        for chapter in self.chapters:
+            lines += ["", f"## Chapter {chapter + 1}"]
+            for result in self.results:
+                if result["chapter"] == chapter:
+                    lines += ["", f"### {result['variant']}", result["summary"].strip()]
+        return "\n".join(lines) + "\n"
+
+    def save_report(self, path: str) -> str:
+        with open(path, "w") as file:
+            file.write(self.report())
+        return path
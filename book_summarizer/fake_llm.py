@@ -0,0 +1,154 @@
+import random
+import re
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+from book_summarizer.deadlines import call_timeout
+from book_summarizer.llm_core import LLMClient, is_error_response, retry_handler
+
+
+class FakeRateLimitError(Exception):
+    """Raised by FakeLLMClient to imitate an OpenAI 429 response."""
+
+
+class FakeTimeoutError(Exception):
+    """Raised by FakeLLMClient to imitate a request timing out."""
+
+
+class FakeLLMClient(LLMClient):
+    """
+    An offline LLMClient that imitates a GPT model without touching the network.
+    Used for benchmarks and tests: it sleeps to simulate latency, randomly raises rate-limit errors
+    that go through the normal retry_handler, and keeps a running tally of calls and token usage.
+
+    Token counts are estimated at CHARS_PER_TOKEN characters per token so that the fake itself
+    does not spend time in tiktoken and distort the benchmarks.
+
+    Attributes
+    ----------
+    latency : float
+        Seconds each request takes.
+    latency_jitter : float
+        Up to this many extra seconds are added to each request at random.
+    rate_limit_probability : float
+        Probability that a single request fails with a rate-limit error.
+    response_tokens : int
+        Approximate length of each generated response.
+    responder : Callable[[str, str], str], optional
+        Produces the response from (system_prompt, instruction). Defaults to a bullet list built from the input.
+    timeout : float, optional
+        Requests that would take longer than this, or run past the current Deadline, give up with a timeout
+        error after waiting that long, like a real client would.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    model_name = "gpt-4o-mini"
+    max_tokens = 128000
+    cost_per_token = 0.15 / 1000000
+
+    def __init__(
+        self,
+        model_name: str = "gpt-4o-mini",
+        max_tokens: int = 128000,
+        cost_per_token: float = 0.15 / 1000000,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        rate_limit_probability: float = 0.0,
+        response_tokens: int = 300,
+        retry_wait: float = 0.0,
+        responder: Callable[[str, str], str] | None = None,
+        seed: int = 0,
+        timeout: float | None = None,
+        max_output_tokens: int = 16384,
+    ):
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.max_output_tokens = max_output_tokens
+        self.cost_per_token = cost_per_token
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.rate_limit_probability = rate_limit_probability
+        self.response_tokens = response_tokens
+        self.retry_wait = retry_wait
+        self.responder = responder or self._default_response
+        self.timeout = timeout
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_usage()
+
+    def __getstate__(self) -> dict:
+        # joblib's process backend pickles the client; locks cannot be pickled
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reset_usage(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.rate_limit_errors = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+
+    def usage(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "rate_limit_errors": self.rate_limit_errors,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost": (self.prompt_tokens + self.completion_tokens) * self.cost_per_token,
+            }
+
+    def estimate_tokens(self, text: str) -> int:
+        return len(text) // self.CHARS_PER_TOKEN
+
+    def call(self, system_prompt: str, instruction: str, max_retries: int = 5) -> str:
+        return retry_handler(
+            self._make_request, system_prompt, instruction, max_retries=max_retries, initial_wait=self.retry_wait
+        )
+
+    def stream(self, system_prompt: str, instruction: str, max_retries: int = 5) -> Iterator[str]:
+        """Yields the response a word at a time, like a streamed chat completion. Errors are yielded whole."""
+        response = self.call(system_prompt, instruction, max_retries=max_retries)
+        if is_error_response(response):
+            yield response
+            return
+        yield from re.findall(r"\s*\S+\s*", response)
+
+    def _make_request(self, system_prompt: str, instruction: str) -> str:
+        with self._lock:
+            rate_limited = self._random.random() < self.rate_limit_probability
+            delay = self.latency + self._random.random() * self.latency_jitter
+            if rate_limited:
+                self.rate_limit_errors += 1
+        timeout = call_timeout(self.timeout)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise FakeTimeoutError("Request timed out.")
+        time.sleep(delay)
+        if rate_limited:
+            raise FakeRateLimitError("Rate limit reached for fake model (simulated).")
+
+        response = self.responder(system_prompt, instruction)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += self.estimate_tokens(system_prompt) + self.estimate_tokens(instruction)
+            self.completion_tokens += self.estimate_tokens(response)
+        return response
+
+    def _default_response(self, system_prompt: str, instruction: str) -> str:
+        words = instruction.split()
+        if not words:
+            return ""
+        target_words = self.response_tokens * 3 // 4
+        points = []
+        for start in range(0, target_words, 12):
+            offset = start % len(words)
+            points.append("- " + " ".join(words[offset : offset + 12]))
+        return "\n".join(points)
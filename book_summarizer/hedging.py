@@ -0,0 +1,149 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from book_summarizer.llm_core import LLMClient, is_error_response
+
+
+class HedgedClient(LLMClient):
+    """
+    An LLMClient that sends a duplicate of a slow call and takes whichever response arrives first.
+
+    A call that has not answered within the hedge delay, the `percentile` of recent call latencies, is sent
+    a second time, optionally to another backend. The first successful response wins and the other request
+    is cancelled if it has not started yet. A request already in flight cannot be withdrawn, so its
+    response is simply discarded; hedging at the 95th percentile keeps that extra load to around one call in
+    twenty.
+
+    Meant for short calls such as chapter titles and worthiness, where a duplicate is cheap and one stuck
+    request would otherwise hold up the whole chapter.
+
+    Attributes
+    ----------
+    calls : int
+        Calls made through the client.
+    hedges : int
+        Calls for which a duplicate was sent.
+    hedge_wins : int
+        Calls answered by the duplicate rather than the original request.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        hedge_client: LLMClient | None = None,
+        percentile: float = 0.95,
+        initial_delay: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+        max_workers: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Parameters
+        ----------
+        client : LLMClient
+            Receives every call.
+        hedge_client : LLMClient, optional
+            Receives the duplicates. Defaults to `client`.
+        percentile : float
+            The latency percentile after which a call is hedged.
+        initial_delay : float
+            The hedge delay in seconds until `min_samples` latencies have been observed.
+        min_samples : int
+            Latencies needed before the percentile is trusted.
+        window : int
+            How many recent latencies the percentile is taken over.
+        max_workers : int
+            Threads for original requests, shared by all callers. Set it to at least the number of threads
+            calling the client. Duplicates run on a separate pool of the same size, so a hedge never waits
+            behind the original requests it is meant to overtake.
+        clock : Callable[[], float]
+            The time source for latencies.
+        """
+        self.client = client
+        self.hedge_client = hedge_client or client
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged-call")
+        self._hedge_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def model_name(self) -> str:
+        return self.client.model_name
+
+    @property
+    def max_tokens(self) -> int:
+        return min(self.client.max_tokens, self.hedge_client.max_tokens)
+
+    @property
+    def max_output_tokens(self) -> int:
+        return min(self.client.max_output_tokens, self.hedge_client.max_output_tokens)
+
+    @property
+    def cost_per_token(self) -> float:
+        return max(self.client.cost_per_token, self.hedge_client.cost_per_token)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for a response before sending the duplicate."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return self.initial_delay
+        return latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))]
+
+    def _timed_call(self, client: LLMClient, system_prompt: str, instruction: str) -> str:
+        start = self._clock()
+        try:
+            response = client.call(system_prompt, instruction)
+        except Exception as e:
+            response = f"Error: {e}"
+        if not is_error_response(response):
+            with self._lock:
+                self._latencies.append(self._clock() - start)
+        return response
+
+    def _submit(self, executor: ThreadPoolExecutor, client: LLMClient, system_prompt: str, instruction: str) -> Future:
+        # Copy the caller's context so that a Deadline scope also limits the requests in the worker threads
+        context = contextvars.copy_context()
+        return executor.submit(context.run, self._timed_call, client, system_prompt, instruction)
+
+    def call(self, system_prompt: str, instruction: str) -> str:
+        with self._lock:
+            self.calls += 1
+        primary = self._submit(self._executor, self.client, system_prompt, instruction)
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        pending = {primary}
+        if not done:
+            pending.add(self._submit(self._hedge_executor, self.hedge_client, system_prompt, instruction))
+            with self._lock:
+                self.hedges += 1
+
+        response = "Error: No response."
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                response = future.result()
+                if not is_error_response(response):
+                    for other in pending:
+                        other.cancel()
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return response
+        return response
+
+    def close(self) -> None:
+        """Stops the worker threads once the requests in flight have finished."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._hedge_executor.shutdown(wait=False, cancel_futures=True)
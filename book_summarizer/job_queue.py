@@ -0,0 +1,725 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+
+from joblib import Parallel, delayed
+
+from book_summarizer.compression import ExtractiveCompressor
+from book_summarizer.default_prompts import DEFAULT_PROMPTS
+from book_summarizer.llm_core import GPT4O, GPT4oMini, LLMClient, is_error_response
+from book_summarizer.rate_limit import RateLimitedClient, RateLimiter
+from book_summarizer.summarizer import BookSummarizer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    epub_path TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    error TEXT,
+    created REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS units (
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    chapter INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    part INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, chapter, kind, part)
+);
+CREATE INDEX IF NOT EXISTS units_by_status ON units (status, job_id);
+"""
+
+# Options a job may set. They are stored as JSON, so models are chosen by the workers rather than the job.
+JOB_OPTIONS = {"summarizer_prompt", "summarizer_instruction", "combiner_prompt", "verify_quotes", "compression_ratio"}
+
+UNIT_KEY = "job_id = ? AND chapter = ? AND kind = ? AND part = ?"
+
+
+def unit_key(unit: dict) -> tuple:
+    return unit["job_id"], unit["chapter"], unit["kind"], unit["part"]
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class JobQueue:
+    """
+    A persistent queue of books to summarize, broken into small leased units of work and stored in SQLite.
+
+    Each book is a graph of units, created as the units before them finish:
+
+    - "book": open the EPUB and count its chapters, which creates a "metadata" unit per chapter.
+    - "metadata": deduce a chapter's title and worthiness and plan its chunks, creating a "chunk" unit per chunk.
+    - "chunk": summarize one chunk. When a chapter's last chunk finishes, a "combine" unit is created if
+      the chapter had more than one.
+    - "combine": combine a chapter's chunk summaries.
+    - "write": write the summary file, created once every other unit is done.
+
+    Workers claim a unit with a lease and renew it while they work. If a worker dies, its lease expires and
+    another worker takes the unit.
+    Storing a result is idempotent: only the first result for a unit is kept and only it creates follow-up
+    units, so a slow worker finishing after its lease was taken over does no harm.
+
+    Any number of processes on one host can share the queue file. Workers on other hosts can share it over a
+    network filesystem, but only if every one of them opens it with `network_filesystem=True`. SQLite's
+    write-ahead log keeps its index in shared memory, which cannot be shared between hosts, so in that mode the
+    queue uses a rollback journal instead. Each write then takes POSIX advisory (fcntl) locks on the file, so the
+    filesystem must implement them across clients, as NFSv4, or NFSv3 with a running lock manager, and SMB with
+    byte-range locking do. Filesystems that ignore locks, or only lock locally, will corrupt the queue.
+
+    Job statuses are "queued", "running", "writing", "done" and "failed". A job is "writing" from when its last
+    summarizing unit is done until its "write" unit is, so it is only "done" once the file is written.
+    Unit statuses are "queued", "running", "done" and "failed".
+
+    Attributes
+    ----------
+    path : str
+        The SQLite database file.
+    max_attempts : int
+        A unit whose lease has expired this many times is marked failed instead of handed out again.
+    network_filesystem : bool
+        Use a rollback journal in place of the write-ahead log, for a queue file shared between hosts.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, network_filesystem: bool = False):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.network_filesystem = network_filesystem
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute(f"PRAGMA journal_mode={'DELETE' if network_filesystem else 'WAL'}")
+            self._connection.executescript(SCHEMA)
+
+    def submit(
+        self, epub_path: str, output_path: str | None = None, priority: int = 0, options: dict | None = None
+    ) -> int:
+        """
+        Adds a book to the queue.
+
+        Parameters
+        ----------
+        epub_path : str
+            The path to the EPUB file, as seen by the workers.
+        output_path : str, optional
+            Where to write the summary. Defaults to the EPUB path with a _summary.md suffix.
+        priority : int
+            Jobs with a higher priority are served first. Jobs with the same priority share the workers evenly.
+        options : dict, optional
+            Prompts for this book: any of summarizer_prompt, summarizer_instruction, combiner_prompt and verify_quotes,
+            and compression_ratio to compress chapters with an ExtractiveCompressor before summarizing them.
+
+        Returns
+        -------
+        int
+            The job id.
+        """
+        options = options or {}
+        unknown = set(options) - JOB_OPTIONS
+        if unknown:
+            raise ValueError(f"Unknown job options: {sorted(unknown)}")
+        output_path = output_path or os.path.splitext(epub_path)[0] + "_summary.md"
+        with self._lock, self._connection:
+            job_id = self._connection.execute(
+                "INSERT INTO jobs (epub_path, output_path, priority, options, created) VALUES (?, ?, ?, ?, ?)",
+                (epub_path, output_path, priority, json.dumps(options), time.time()),
+            ).lastrowid
+            self._insert_units(job_id, -1, "book", 1)
+            return job_id
+
+    def _insert_units(self, job_id: int, chapter: int, kind: str, count: int) -> None:
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO units (job_id, chapter, kind, part) VALUES (?, ?, ?, ?)",
+            [(job_id, chapter, kind, part) for part in range(count)],
+        )
+
+    def job(self, job_id: int) -> dict:
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No job with id {job_id}")
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def claim(self, worker_id: str | None = None, lease_seconds: float = 600) -> dict | None:
+        """
+        Leases the next unit of work.
+
+        Units of higher-priority jobs come first. Among jobs of equal priority, the one with the fewest
+        units in flight is served, so every book makes progress instead of the oldest one taking every worker.
+        Units whose lease has expired are handed out again.
+
+        Parameters
+        ----------
+        worker_id : str, optional
+            Identifies the worker holding the lease. Defaults to host, process and thread.
+        lease_seconds : float
+            How long the worker has to finish the unit before it may be given to another worker.
+
+        Returns
+        -------
+        dict or None
+            {"job_id", "chapter", "kind", "part", "attempts"}, or None if nothing is available.
+        """
+        worker_id = worker_id or default_worker_id()
+        while True:
+            now = time.time()
+            with self._lock, self._connection:
+                abandoned = self._connection.execute(
+                    "UPDATE units SET status = 'failed', error = 'Error: lease expired too many times' "
+                    "WHERE status = 'running' AND lease_expires < ? AND attempts >= ? RETURNING job_id",
+                    (now, self.max_attempts),
+                ).fetchall()
+                row = self._connection.execute(
+                    """
+                    SELECT u.job_id, u.chapter, u.kind, u.part, u.attempts FROM units u JOIN jobs j ON j.id = u.job_id
+                    WHERE (u.status = 'queued' OR (u.status = 'running' AND u.lease_expires < ?))
+                        AND j.status IN ('queued', 'running', 'writing')
+                    ORDER BY j.priority DESC,
+                        (SELECT COUNT(*) FROM units r WHERE r.job_id = u.job_id AND r.status = 'running'),
+                        u.job_id, u.chapter, u.part
+                    LIMIT 1
+                    """,
+                    (now,),
+                ).fetchone()
+                unit = None if row is None else dict(row)
+                claimed = 0
+                if unit is not None:
+                    # Another process may have claimed the same unit since the select, so only take it if unchanged
+                    claimed = self._connection.execute(
+                        "UPDATE units SET status = 'running', lease_owner = ?, lease_expires = ?, "
+                        f"attempts = attempts + 1 WHERE {UNIT_KEY} AND attempts = ? "
+                        "AND (status = 'queued' OR (status = 'running' AND lease_expires < ?))",
+                        (worker_id, now + lease_seconds, *unit_key(unit), unit["attempts"], now),
+                    ).rowcount
+                if claimed:
+                    self._connection.execute(
+                        "UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (unit["job_id"],)
+                    )
+                    unit["attempts"] += 1
+            for job_id in {row["job_id"] for row in abandoned}:
+                self._finish_if_complete(job_id)
+            if unit is None or claimed:
+                return unit
+
+    def renew(self, unit: dict, worker_id: str | None = None, lease_seconds: float = 600) -> bool:
+        """Extends a lease the worker still holds. Returns False if the unit has been taken over or finished."""
+        with self._lock, self._connection:
+            return bool(
+                self._connection.execute(
+                    f"UPDATE units SET lease_expires = ? WHERE {UNIT_KEY} AND status = 'running' AND lease_owner = ?",
+                    (time.time() + lease_seconds, *unit_key(unit), worker_id or default_worker_id()),
+                ).rowcount
+            )
+
+    def complete(self, unit: dict, result: dict) -> str | None:
+        """
+        Stores a unit's result and creates the units that depend on it.
+        Only the first result stored for a unit counts; later ones are ignored.
+
+        Returns
+        -------
+        str or None
+            The job's new status if this unit changed it: "writing" once the summarizing units are done,
+            "done" once the write unit is, or "failed". Otherwise None.
+        """
+        job_id, chapter, kind, _ = unit_key(unit)
+        with self._lock, self._connection:
+            stored = self._connection.execute(
+                f"UPDATE units SET status = 'done', result = ?, error = NULL WHERE {UNIT_KEY} AND status != 'done'",
+                (json.dumps(result), *unit_key(unit)),
+            ).rowcount
+            if not stored:
+                return None
+            if kind == "book":
+                for chapter_index in range(result["chapters"]):
+                    self._insert_units(job_id, chapter_index, "metadata", 1)
+            elif kind == "metadata":
+                self._insert_units(job_id, chapter, "chunk", len(result["chunks"]))
+            elif kind == "chunk":
+                counts = dict(
+                    self._connection.execute(
+                        "SELECT status = 'done', COUNT(*) FROM units WHERE job_id = ? AND chapter = ? AND kind = 'chunk' "
+                        "GROUP BY status = 'done'",
+                        (job_id, chapter),
+                    ).fetchall()
+                )
+                if not counts.get(0) and counts.get(1, 0) > 1:
+                    self._insert_units(job_id, chapter, "combine", 1)
+        return self._finish_if_complete(job_id)
+
+    def fail(self, unit: dict, error: str) -> str | None:
+        """Records that a unit could not be done. Returns "failed" if that finished the job, otherwise None."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"UPDATE units SET status = 'failed', error = ? WHERE {UNIT_KEY} AND status != 'done'",
+                (error, *unit_key(unit)),
+            )
+        return self._finish_if_complete(unit["job_id"])
+
+    def _finish_if_complete(self, job_id: int) -> str | None:
+        with self._lock, self._connection:
+            counts = dict(
+                self._connection.execute(
+                    "SELECT status, COUNT(*) FROM units WHERE job_id = ? GROUP BY status", (job_id,)
+                ).fetchall()
+            )
+            if counts.get("queued") or counts.get("running"):
+                return None
+            failed = self._connection.execute(
+                "SELECT kind, error FROM units WHERE job_id = ? AND status = 'failed'", (job_id,)
+            ).fetchall()
+            written = self._connection.execute(
+                "SELECT 1 FROM units WHERE job_id = ? AND kind = 'write'", (job_id,)
+            ).fetchone()
+            error = None
+            if failed:
+                status = "failed"
+                only_write = len(failed) == 1 and failed[0]["kind"] == "write"
+                error = failed[0]["error"] if only_write else f"{len(failed)} units failed"
+            elif written:
+                # Nothing is queued, running or failed, so the write unit is done
+                status = "done"
+            else:
+                status = "writing"
+                self._insert_units(job_id, -1, "write", 1)
+            # Only the call that changes the job's status reports it
+            updated = self._connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? "
+                "WHERE id = ? AND status IN ('queued', 'running', 'writing') AND status != ?",
+                (status, error, None if status == "writing" else time.time(), job_id, status),
+            ).rowcount
+            return status if updated else None
+
+    def release_leases(self) -> int:
+        """
+        Puts every running unit back in the queue without waiting for its lease to expire.
+        Only safe when no worker is running, e.g. when restarting a single scheduler. Returns how many there were.
+        """
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "UPDATE units SET status = 'queued', lease_owner = NULL, lease_expires = NULL WHERE status = 'running'"
+            ).rowcount
+
+    def retry_failed(self, job_id: int) -> int:
+        """Queues a job's failed units again, including a failed write of its summary. Returns how many."""
+        with self._lock, self._connection:
+            count = self._connection.execute(
+                "UPDATE units SET status = 'queued', error = NULL, attempts = 0 WHERE job_id = ? AND status = 'failed'",
+                (job_id,),
+            ).rowcount
+            if count:
+                self._connection.execute(
+                    "UPDATE jobs SET status = 'running', error = NULL, finished = NULL WHERE id = ?", (job_id,)
+                )
+            return count
+
+    def unit_result(self, job_id: int, chapter: int, kind: str, part: int = 0) -> dict | None:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT result FROM units WHERE {UNIT_KEY} AND status = 'done'", (job_id, chapter, kind, part)
+            ).fetchone()
+        return None if row is None else json.loads(row["result"])
+
+    def chunk_summaries(self, job_id: int, chapter: int) -> list[str]:
+        """The summaries of a chapter's chunks, in chunk order."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT result FROM units WHERE job_id = ? AND chapter = ? AND kind = 'chunk' AND status = 'done' "
+                "ORDER BY part",
+                (job_id, chapter),
+            ).fetchall()
+        return [json.loads(row["result"])["summary"] for row in rows]
+
+    def results(self, job_id: int) -> list[dict]:
+        """
+        Assembles the finished chapters of a job, in chapter order.
+
+        Returns
+        -------
+        list of dict
+            {"index", "title", "worthiness", "summary"} for each chapter, as yielded by
+            BookSummarizer.iter_book_summaries.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT chapter FROM units WHERE job_id = ? AND kind = 'metadata' AND status = 'done' ORDER BY chapter",
+                (job_id,),
+            ).fetchall()
+        results = []
+        for row in rows:
+            chapter = row["chapter"]
+            metadata = self.unit_result(job_id, chapter, "metadata")
+            if not metadata["worthiness"]:
+                summary = BookSummarizer.NOT_WORTHY_SUMMARY
+            elif len(metadata["chunks"]) > 1:
+                combined = self.unit_result(job_id, chapter, "combine")
+                summary = combined["summary"] if combined else ""
+            else:
+                summary = "".join(f"{chunk_summary}\n" for chunk_summary in self.chunk_summaries(job_id, chapter))
+            results.append(
+                {"index": chapter, "title": metadata["title"], "worthiness": metadata["worthiness"], "summary": summary}
+            )
+        return results
+
+    def outstanding(self) -> int:
+        """The number of units queued or running across all jobs."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM units u JOIN jobs j ON j.id = u.job_id "
+                "WHERE u.status IN ('queued', 'running') AND j.status IN ('queued', 'running', 'writing')"
+            ).fetchone()[0]
+
+    def wait(self, job_id: int, poll_interval: float = 2.0, timeout: float | None = None) -> dict:
+        """
+        Blocks until a job is done or failed.
+
+        Raises
+        ------
+        TimeoutError
+            If the job is still unfinished after `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.job(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout} seconds.")
+            time.sleep(poll_interval)
+
+    def progress(self) -> list[dict]:
+        """
+        Reports every job's progress.
+
+        Returns
+        -------
+        list of dict
+            {"id", "epub_path", "status", "priority", "chapters", "chapters_done", "units", "units_done",
+            "running", "failed"} for each job, by id. Units are created as a book is worked through, so
+            "units" grows until every chapter has been planned.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                """
+                SELECT j.id, j.epub_path, j.status, j.priority,
+                    COALESCE(SUM(u.kind = 'metadata'), 0) AS chapters,
+                    (SELECT COUNT(*) FROM units m WHERE m.job_id = j.id AND m.kind = 'metadata' AND m.status = 'done'
+                        AND (json_array_length(m.result, '$.chunks') = 0
+                            OR EXISTS (SELECT 1 FROM units f WHERE f.job_id = m.job_id AND f.chapter = m.chapter
+                                AND f.status = 'done' AND (f.kind = 'combine'
+                                    OR (f.kind = 'chunk' AND json_array_length(m.result, '$.chunks') = 1))))
+                    ) AS chapters_done,
+                    COUNT(u.job_id) AS units,
+                    COALESCE(SUM(u.status = 'done'), 0) AS units_done,
+                    COALESCE(SUM(u.status = 'running'), 0) AS running,
+                    COALESCE(SUM(u.status = 'failed'), 0) AS failed
+                FROM jobs j LEFT JOIN units u ON u.job_id = j.id
+                GROUP BY j.id ORDER BY j.id
+                """
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class BookScheduler:
+    """
+    A worker that takes units from a JobQueue and runs them on a pool of threads, behind one shared rate limit.
+
+    Instead of each book running its own pool, units from every running book are handed to the same threads
+    in the queue's fair order, and every model call waits on the shared RateLimiter. Books therefore neither
+    starve each other nor trip the account's limits together. Several schedulers, in other processes or on
+    other hosts, can work through the same queue at once; see run_worker_processes.
+
+    Attributes
+    ----------
+    queue : JobQueue
+        The queue to work through.
+    max_workers : int
+        The number of units run at once by this scheduler.
+    lease_seconds : float
+        How long each unit is leased for. The lease is renewed every third of that while the unit runs, so it
+        only needs to cover the time for a dead worker to be noticed.
+    worker_id : str
+        Identifies this scheduler's leases.
+    """
+
+    MAX_WORKERS = BookSummarizer.MAX_WORKERS
+    MAX_BOOKS = 4  # parsed books kept between units
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        summarizer_model: LLMClient = GPT4oMini(),
+        combiner_model: LLMClient = GPT4O(),
+        title_model: LLMClient = GPT4O(),
+        worthiness_model: LLMClient = GPT4oMini(),
+        rate_limiter: RateLimiter | None = None,
+        max_workers: int | None = None,
+        cache_path: str | None = None,
+        lease_seconds: float = 600,
+        poll_interval: float = 1.0,
+        on_progress: Callable[[dict], None] | None = None,
+    ):
+        """
+        Parameters
+        ----------
+        queue : JobQueue
+            The queue to work through.
+        summarizer_model, combiner_model, title_model, worthiness_model : LLMClient
+            The models used for every book.
+        rate_limiter : RateLimiter, optional
+            Shared by every model call. Without one, only the retry backoff paces the calls.
+        max_workers : int, optional
+            Defaults to MAX_WORKERS.
+        cache_path : str, optional
+            A ResultCache file shared by every book, so resubmitting a book only pays for what changed.
+        lease_seconds : float
+            How long each unit is leased for.
+        poll_interval : float
+            How long to wait before looking again when other workers hold every remaining unit.
+        on_progress : Callable[[dict], None], optional
+            Called with the job's entry from JobQueue.progress after each of its units finishes.
+        """
+        self.queue = queue
+        if rate_limiter is not None:
+            summarizer_model, combiner_model, title_model, worthiness_model = (
+                RateLimitedClient(model, rate_limiter)
+                for model in (summarizer_model, combiner_model, title_model, worthiness_model)
+            )
+        self.summarizer_model = summarizer_model
+        self.combiner_model = combiner_model
+        self.title_model = title_model
+        self.worthiness_model = worthiness_model
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.cache_path = cache_path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.on_progress = on_progress
+        # Units are claimed on joblib's dispatch thread and run on others, so the id must not depend on the thread
+        self.worker_id = f"{default_worker_id()}:{id(self):x}"
+        # A book's last unit may finish on another worker, so parsed books are also dropped least recently used
+        self._summarizers: OrderedDict[int, BookSummarizer] = OrderedDict()
+        self._summarizers_lock = threading.Lock()
+
+    def _summarizer(self, job_id: int) -> BookSummarizer:
+        with self._summarizers_lock:
+            if job_id not in self._summarizers:
+                job = self.queue.job(job_id)
+                summarizer = BookSummarizer(job["epub_path"], cache_path=self.cache_path)
+                if job["options"].get("compression_ratio"):
+                    summarizer.compressor = ExtractiveCompressor(job["options"]["compression_ratio"])
+                self._summarizers[job_id] = summarizer
+                while len(self._summarizers) > self.MAX_BOOKS:
+                    self._summarizers.popitem(last=False)
+            self._summarizers.move_to_end(job_id)
+            return self._summarizers[job_id]
+
+    def _claimed_units(self) -> Iterator[dict]:
+        # joblib pulls from this generator only as threads free up, so each claim sees the current load
+        while (unit := self.queue.claim(self.worker_id, lease_seconds=self.lease_seconds)) is not None:
+            yield unit
+
+    def _renew_lease(self, unit: dict, finished: threading.Event) -> None:
+        while not finished.wait(self.lease_seconds / 3):
+            if not self.queue.renew(unit, self.worker_id, self.lease_seconds):
+                return
+
+    def execute(self, unit: dict) -> dict:
+        """Does the work of one unit and returns its result, without touching the unit's status."""
+        job = self.queue.job(unit["job_id"])
+        options = job["options"]
+        summarizer = self._summarizer(job["id"])
+        summarizer_prompt = options.get("summarizer_prompt", DEFAULT_PROMPTS["summarizer_prompt"])
+        chapter = unit["chapter"]
+
+        if unit["kind"] == "book":
+            return {"chapters": len(summarizer.chapters)}
+        if unit["kind"] == "write":
+            self._write_output(job["id"])
+            return {"output_path": job["output_path"]}
+        if unit["kind"] == "metadata":
+            text = summarizer.chapters[chapter]
+            metadata = summarizer.deduce_chapter_metadata(text, 500, self.title_model, self.worthiness_model)
+            chunks = []
+            if metadata["worthiness"]:
+                if summarizer.compressor:
+                    text = summarizer.compressor.compress(text)
+                chunks = summarizer.plan_chunks(
+                    text,
+                    self.summarizer_model,
+                    summarizer_prompt,
+                    options.get("summarizer_instruction", DEFAULT_PROMPTS["summarizer_instruction"]),
+                    self.combiner_model,
+                    options.get("combiner_prompt", DEFAULT_PROMPTS["combiner_prompt"]),
+                )
+            return {"title": metadata["title"], "worthiness": metadata["worthiness"], "chunks": chunks}
+        if unit["kind"] == "chunk":
+            chunks = self.queue.unit_result(job["id"], chapter, "metadata")["chunks"]
+            summary = summarizer.summarize_text(
+                chunks[unit["part"]],
+                model=self.summarizer_model,
+                system_prompt=summarizer_prompt,
+                instruction=options.get("summarizer_instruction", DEFAULT_PROMPTS["summarizer_instruction"]),
+            )
+            return {"summary": summary}
+        if unit["kind"] == "combine":
+            appended_summaries = "".join(f"{summary}\n" for summary in self.queue.chunk_summaries(job["id"], chapter))
+            summary = summarizer.summarize_text(
+                appended_summaries,
+                model=self.combiner_model,
+                system_prompt=summarizer_prompt,
+                instruction=options.get("combiner_prompt", DEFAULT_PROMPTS["combiner_prompt"]),
+            )
+            return {"summary": summary}
+        raise ValueError(f"Unknown unit kind: {unit['kind']}")
+
+    def _run_unit(self, unit: dict) -> dict:
+        finished = threading.Event()
+        threading.Thread(target=self._renew_lease, args=(unit, finished), name="lease-renewal", daemon=True).start()
+        try:
+            result = self.execute(unit)
+        except Exception as e:
+            action = "could not write the summary: " if unit["kind"] == "write" else ""
+            status = self.queue.fail(unit, f"Error: {action}{e}")
+        else:
+            # retry_handler returns failed calls as error strings, which must not be stored as results
+            error = next(
+                (value for key, value in result.items() if key in ("title", "summary") and is_error_response(value)),
+                None,
+            )
+            status = self.queue.fail(unit, error) if error else self.queue.complete(unit, result)
+        finally:
+            finished.set()
+        if status in ("done", "failed"):
+            with self._summarizers_lock:
+                self._summarizers.pop(unit["job_id"], None)
+        return unit
+
+    def _write_output(self, job_id: int) -> None:
+        job = self.queue.job(job_id)
+        results = self.queue.results(job_id)
+        if job["options"].get("verify_quotes") and results:
+            verifier = self._summarizer(job_id).quote_verifier()
+            for result in results:
+                result["summary"] = verifier.annotate(result["summary"], chapter=result["index"])
+        with open(job["output_path"], "w") as file:
+            for result in results:
+                BookSummarizer.write_chapter(file, result)
+
+    def run(self, until_idle: bool = True) -> list[dict]:
+        """
+        Works through the queue, including books submitted while it runs.
+
+        Parameters
+        ----------
+        until_idle : bool
+            Return once no job has work left. If False, keep waiting for new jobs forever.
+
+        Returns
+        -------
+        list of dict
+            The final JobQueue.progress.
+        """
+        while True:
+            completed = Parallel(n_jobs=self.max_workers, prefer="threads", return_as="generator_unordered")(
+                delayed(self._run_unit)(unit) for unit in self._claimed_units()
+            )
+            for unit in completed:
+                if self.on_progress:
+                    self.on_progress(next(job for job in self.queue.progress() if job["id"] == unit["job_id"]))
+            # Nothing was claimable; other workers may still be finishing units that create more
+            if until_idle and not self.queue.outstanding():
+                return self.queue.progress()
+            time.sleep(self.poll_interval)
+
+
+def _run_worker_process(queue_path: str, requests_per_minute, tokens_per_minute, scheduler_options: dict) -> None:
+    rate_limiter = None
+    if requests_per_minute or tokens_per_minute:
+        rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    BookScheduler(JobQueue(queue_path), rate_limiter=rate_limiter, **scheduler_options).run()
+
+
+def run_worker_processes(
+    queue_path: str,
+    processes: int = 2,
+    requests_per_minute: float | None = None,
+    tokens_per_minute: float | None = None,
+    **scheduler_options,
+) -> list[dict]:
+    """
+    Works through a queue with several local worker processes until it is empty.
+    Useful for testing the distributed mode on one machine, or for spreading tokenization and
+    quote verification over cores.
+
+    Parameters
+    ----------
+    queue_path : str
+        The JobQueue file.
+    processes : int
+        The number of worker processes.
+    requests_per_minute, tokens_per_minute : float, optional
+        The limits for all processes together. Each process gets an equal share.
+    **scheduler_options
+        Passed to each process's BookScheduler, e.g. models, max_workers and cache_path. Must be picklable.
+
+    Returns
+    -------
+    list of dict
+        The final JobQueue.progress.
+    """
+    share = [limit / processes if limit else None for limit in (requests_per_minute, tokens_per_minute)]
+    Parallel(n_jobs=processes)(
+        delayed(_run_worker_process)(queue_path, *share, scheduler_options) for _ in range(processes)
+    )
+    return JobQueue(queue_path).progress()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a summarization worker against a shared job queue.")
+    parser.add_argument("queue", help="Path to the JobQueue SQLite file")
+    parser.add_argument("--threads", type=int, default=BookScheduler.MAX_WORKERS)
+    parser.add_argument("--requests-per-minute", type=float, default=None)
+    parser.add_argument("--tokens-per-minute", type=float, default=None)
+    parser.add_argument("--cache", default=None, help="Path to a ResultCache file")
+    parser.add_argument("--forever", action="store_true", help="Keep waiting for new jobs when the queue is empty")
+    parser.add_argument(
+        "--network-filesystem",
+        action="store_true",
+        help="The queue file is shared with other hosts; every worker must pass this",
+    )
+    args = parser.parse_args()
+
+    limiter = None
+    if args.requests_per_minute or args.tokens_per_minute:
+        limiter = RateLimiter(args.requests_per_minute, args.tokens_per_minute)
+    scheduler = BookScheduler(
+        JobQueue(args.queue, network_filesystem=args.network_filesystem),
+        rate_limiter=limiter,
+        max_workers=args.threads,
+        cache_path=args.cache,
+        on_progress=lambda job: print(f"[{job['id']}] {job['epub_path']}: {job['chapters_done']}/{job['chapters']}"),
+    )
+    scheduler.run(until_idle=not args.forever)
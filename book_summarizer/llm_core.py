@@ -1,10 +1,13 @@
+import re
 import time
 from abc import ABC, abstractmethod
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from typing import Any
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import NOT_GIVEN, OpenAI
+
+from book_summarizer.deadlines import call_timeout
 
 # Load the API key which OpenAI will read from the environment
 load_dotenv()
@@ -12,6 +15,8 @@ CLIENT = OpenAI()
 
 
 class LLMClient(ABC):
+    max_output_tokens = 4096  # the longest response the model will write, separate from its context window
+
     @property
     @abstractmethod
     def model_name(self) -> str:
@@ -31,8 +36,12 @@ class LLMClient(ABC):
     def call(self, system_prompt: str, instruction: str) -> str:
         pass
 
+    def stream(self, system_prompt: str, instruction: str) -> Iterator[str]:
+        """Yields the response in pieces as the model produces it. Clients without streaming yield it whole."""
+        yield self.call(system_prompt, instruction)
+
 
-def retry_handler(func: Callable, *args, max_retries: int = 5, **kwargs) -> Any:
+def retry_handler(func: Callable, *args, max_retries: int = 5, initial_wait: float = 3, **kwargs) -> Any:
     retry_count = 0
     while retry_count < max_retries:
         try:
@@ -41,7 +50,7 @@ def retry_handler(func: Callable, *args, max_retries: int = 5, **kwargs) -> Any:
             error_message = str(e)
             if "rate limit" in error_message.lower():
                 retry_count += 1
-                wait_time = 3**retry_count  # Exponential backoff
+                wait_time = initial_wait * 3 ** (retry_count - 1)  # Exponential backoff
                 print(f"Rate limit exceeded. Retrying in {wait_time} seconds...")
                 time.sleep(wait_time)
             else:
@@ -49,25 +58,115 @@ def retry_handler(func: Callable, *args, max_retries: int = 5, **kwargs) -> Any:
     return f"Error: Rate limit exceeded after {max_retries} retries."
 
 
+def is_error_response(response: str) -> bool:
+    """True if a response is one of the error strings retry_handler returns in place of raising."""
+    return response.startswith("Error: ")
+
+
+# Rate limits, timeouts, dropped connections and server errors, as the OpenAI client words them
+RETRYABLE_ERROR = re.compile(r"rate limit|timed out|timeout|connection|error code: (?:429|5\d\d)|overloaded", re.I)
+
+
+def is_retryable_error(response: str) -> bool:
+    """
+    True if an error response means the backend is struggling, so the call may succeed elsewhere or later.
+    Errors caused by the request itself, such as invalid parameters or an oversized context, are not retryable.
+    """
+    return is_error_response(response) and RETRYABLE_ERROR.search(response) is not None
+
+
 class GPTClient(LLMClient):
     client = CLIENT
-
-    def call(self, system_prompt: str, instruction: str, max_retries: int = 5) -> str:
+    max_retries = 5
+    timeout: float | None = None
+    RATE_LIMIT_HEADERS = {
+        "limit_requests": "x-ratelimit-limit-requests",
+        "remaining_requests": "x-ratelimit-remaining-requests",
+        "limit_tokens": "x-ratelimit-limit-tokens",
+        "remaining_tokens": "x-ratelimit-remaining-tokens",
+    }
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        max_retries: int | None = None,
+        timeout: float | None = None,
+    ):
+        """
+        Args:
+            api_key (Optional[str]): Use this key instead of the one in the environment.
+            base_url (Optional[str]): Send requests to this OpenAI-compatible endpoint instead of OpenAI.
+            max_retries (Optional[int]): How many times a rate-limited call is retried before giving up.
+            timeout (Optional[float]): Seconds before a single request is abandoned. Requests made inside
+                a Deadline scope are also cut short when the deadline arrives.
+        """
+        if api_key or base_url:
+            self.client = OpenAI(api_key=api_key, base_url=base_url)
+        if max_retries is not None:
+            self.max_retries = max_retries
+        self.timeout = timeout
+        self.rate_limits: dict[str, int] = {}
+        self.rate_limits_updated = 0.0
+
+    def call(self, system_prompt: str, instruction: str, max_retries: int | None = None) -> str:
+        max_retries = self.max_retries if max_retries is None else max_retries
         return retry_handler(self._make_request, system_prompt, instruction, max_retries=max_retries)
 
     def _make_request(self, system_prompt: str, instruction: str):
-        response = self.client.chat.completions.create(
+        raw_response = self.client.chat.completions.with_raw_response.create(
             model=self.model_name,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": instruction},
             ],
+            timeout=self._request_timeout(),
         )
-        return self._parse_response(response)
+        self._record_rate_limits(raw_response.headers)
+        return self._parse_response(raw_response.parse())
+
+    def _request_timeout(self):
+        timeout = call_timeout(self.timeout)
+        # None would switch off the OpenAI client's own default timeout
+        return NOT_GIVEN if timeout is None else timeout
+
+    def _record_rate_limits(self, headers) -> None:
+        """Keeps the remaining request and token allowance the endpoint reported, if it reports one."""
+        for name, header in self.RATE_LIMIT_HEADERS.items():
+            value = headers.get(header)
+            if value is not None and value.isdigit():
+                self.rate_limits[name] = int(value)
+                self.rate_limits_updated = time.time()
 
     def _parse_response(self, response):
         return response.choices[0].message.content
 
+    def stream(self, system_prompt: str, instruction: str, max_retries: int | None = None) -> Iterator[str]:
+        max_retries = self.max_retries if max_retries is None else max_retries
+        response = retry_handler(self._open_stream, system_prompt, instruction, max_retries=max_retries)
+        if isinstance(response, str):
+            # retry_handler reports failures as an error string rather than raising
+            yield response
+            return
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            # A stream can break off after it opened; report it as call does rather than abort the caller
+            yield f"Error: {e}"
+
+    def _open_stream(self, system_prompt: str, instruction: str):
+        return self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": instruction},
+            ],
+            stream=True,
+            timeout=self._request_timeout(),
+        )
+
 
 class GPT35Turbo(GPTClient):
     model_name = "gpt-3.5-turbo"
@@ -78,10 +177,37 @@ class GPT35Turbo(GPTClient):
 class GPT4O(GPTClient):
     model_name = "gpt-4o"
     max_tokens = 128000
+    max_output_tokens = 16384
     cost_per_token = 5 / 1000000
 
 
 class GPT4oMini(GPTClient):
     model_name = "gpt-4o-mini"
     max_tokens = 128000
+    max_output_tokens = 16384
     cost_per_token = 0.15 / 1000000
+
+
+class OpenAICompatibleClient(GPTClient):
+    """A model served by any OpenAI-compatible endpoint, such as a local vLLM or llama.cpp server."""
+
+    model_name = ""
+    max_tokens = 8192
+    cost_per_token = 0.0
+
+    def __init__(
+        self,
+        model_name: str,
+        base_url: str,
+        api_key: str = "not-needed",
+        max_tokens: int = 8192,
+        cost_per_token: float = 0.0,
+        max_retries: int | None = None,
+        timeout: float | None = None,
+        max_output_tokens: int = 4096,
+    ):
+        super().__init__(api_key=api_key, base_url=base_url, max_retries=max_retries, timeout=timeout)
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.max_output_tokens = max_output_tokens
+        self.cost_per_token = cost_per_token
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chapters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    settings TEXT NOT NULL,
+    source TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    result TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    settings TEXT NOT NULL,
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    chapter_id INTEGER NOT NULL REFERENCES chapters(id)
+);
+CREATE INDEX IF NOT EXISTS buckets_by_key ON buckets (settings, band, bucket);
+"""
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of texts, whose agreement estimates how many word shingles two texts share.
+
+    The fraction of positions at which two signatures are equal is an unbiased estimate of the Jaccard
+    similarity of the texts' sets of `shingle_size`-word shingles. Words are lower-cased and punctuation is
+    dropped first, so that editions which differ only in typography, such as curly quotes or hyphenation,
+    come out identical.
+
+    Attributes
+    ----------
+    num_perm : int
+        The length of a signature. The estimate's standard error is about 1 / sqrt(num_perm).
+    shingle_size : int
+        The number of words in a shingle.
+    """
+
+    # Shingles are permuted this many at a time, so memory stays at num_perm * BLOCK_SIZE values however long the text
+    BLOCK_SIZE = 8192
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Keeping a and b below 2**31 and the shingle hashes below 2**32 means a * h + b never overflows 64 bits
+        generator = np.random.default_rng(seed)
+        self._a = generator.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = generator.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        """The 32-bit hashes of the text's distinct word shingles."""
+        words = re.findall(r"\w+", text.lower())
+        shingles = {" ".join(words[i : i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+        return np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles],
+            dtype=np.uint64,
+        )
+
+    def signature(self, text: str) -> np.ndarray | None:
+        """
+        Computes the signature of a text.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            `num_perm` 32-bit values, or None if the text is shorter than one shingle.
+        """
+        hashes = self.shingle_hashes(text)
+        if not len(hashes):
+            return None
+        minimum = np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), self.BLOCK_SIZE):
+            permuted = np.outer(self._a, hashes[start : start + self.BLOCK_SIZE])
+            permuted += self._b[:, None]
+            permuted %= MERSENNE_PRIME
+            permuted &= MAX_HASH
+            np.minimum(minimum, permuted.min(axis=1), out=minimum)
+        return minimum.astype(np.uint32)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """The estimated Jaccard similarity of the texts behind two signatures."""
+        return float(np.mean(first == second))
+
+
+class NearDuplicateIndex:
+    """
+    A persistent index of summarized chapters, in which chapters that nearly match a new one are found by
+    locality-sensitive hashing of their MinHash signatures.
+
+    Libraries hold many editions and reprints of the same book. Their chapters differ in front matter,
+    typography and the odd corrected word, so their hashes, and the ResultCache keys built from them, never
+    match, but their summaries would be the same. With an index set on BookSummarizer.duplicate_index, each
+    chapter that is at least `threshold` similar to one already summarized with the same settings reuses that
+    chapter's title, worthiness and summary instead of calling the models.
+
+    Each signature is cut into `bands` bands and stored under a hash of each band. A chapter is compared only
+    with the chapters that share at least one band with it, so lookups stay fast however large the library
+    grows. Two chapters with similarity s share a band with probability 1 - (1 - s ** r) ** bands, where
+    r = num_perm / bands. With the defaults that is above 0.99 at the threshold and about 0.06 at 0.5.
+
+    Attributes
+    ----------
+    path : str
+        The SQLite database file. Any number of books and processes can share it.
+    threshold : float
+        The lowest estimated similarity at which a chapter's result is reused.
+    hasher : MinHasher
+        Computes the signatures. Every process sharing the file must use the same num_perm and seed.
+    bands : int
+        The number of bands each signature is cut into. Must divide num_perm.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.9, hasher: MinHasher | None = None, bands: int = 16):
+        self.path = path
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        if self.hasher.num_perm % bands:
+            raise ValueError(f"{bands} bands do not divide a signature of {self.hasher.num_perm} values.")
+        self.bands = bands
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+
+    def _buckets(self, signature: np.ndarray) -> list[tuple[int, str]]:
+        return [
+            (band, hashlib.blake2b(rows.tobytes(), digest_size=8).hexdigest())
+            for band, rows in enumerate(np.split(signature, self.bands))
+        ]
+
+    def find(self, signature: np.ndarray, settings: str) -> dict | None:
+        """
+        Looks for the most similar chapter summarized with the same settings.
+
+        Parameters
+        ----------
+        signature : numpy.ndarray
+            The new chapter's MinHasher signature.
+        settings : str
+            A key for everything besides the text that the result depends on, such as models and prompts.
+
+        Returns
+        -------
+        dict or None
+            {"result": Any, "source": str, "similarity": float} for the best match at or above the threshold,
+            None if there is none.
+        """
+        buckets = self._buckets(signature)
+        where = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, source, signature, result FROM chapters WHERE id IN ("
+                f"SELECT chapter_id FROM buckets WHERE settings = ? AND ({where}))",
+                (settings, *[value for bucket in buckets for value in bucket]),
+            ).fetchall()
+        best = None
+        for _, source, stored, result in rows:
+            similarity = self.hasher.similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+            if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                best = {"result": result, "source": source, "similarity": similarity}
+        if best is not None:
+            best["result"] = json.loads(best["result"])
+        return best
+
+    def add(self, signature: np.ndarray, settings: str, source: str, result: Any) -> None:
+        """
+        Stores a summarized chapter.
+
+        Parameters
+        ----------
+        signature : numpy.ndarray
+            The chapter's MinHasher signature.
+        settings : str
+            The same settings key that find is called with.
+        source : str
+            Where the chapter came from, such as "book.epub#3", which is reported with every reuse.
+        result : Any
+            Anything that can be stored as JSON.
+        """
+        with self._lock, self._connection:
+            chapter_id = self._connection.execute(
+                "INSERT INTO chapters (settings, source, signature, result, created) VALUES (?, ?, ?, ?, ?)",
+                (settings, source, signature.astype(np.uint32).tobytes(), json.dumps(result), time.time()),
+            ).lastrowid
+            self._connection.executemany(
+                "INSERT INTO buckets (settings, band, bucket, chapter_id) VALUES (?, ?, ?, ?)",
+                [(settings, band, bucket, chapter_id) for band, bucket in self._buckets(signature)],
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM chapters").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,372 @@
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+from collections import defaultdict
+from collections.abc import Iterable
+
+from book_summarizer.epub_extractor import EpubExtractor
+
+WORD_PATTERN = re.compile(r"\w+(?:['’]\w+)*")
+QUOTED_PHRASE_PATTERN = re.compile(r'"([^"]+)"|“([^”]+)”')
+
+
+def tokenize_with_offsets(text: str) -> list[tuple[str, int, int]]:
+    """
+    Splits text into lowercased words and records where each word starts and ends in the original text.
+
+    Parameters
+    ----------
+    text : str
+        The text to tokenize.
+
+    Returns
+    -------
+    list of tuple
+        (word, start offset, end offset) for every word, in order.
+    """
+    return [
+        (match.group().lower().replace("’", "'"), match.start(), match.end()) for match in WORD_PATTERN.finditer(text)
+    ]
+
+
+def chapters_key(chapters: Iterable[str]) -> str:
+    """
+    Hashes the chapter texts so that a saved index can be checked against the chapters it is used with.
+
+    Parameters
+    ----------
+    chapters : Iterable of str
+        The chapter texts, in order.
+
+    Returns
+    -------
+    str
+        A hex digest that changes whenever any chapter's text, or the split into chapters, changes.
+    """
+    digest = hashlib.sha256()
+    for chapter in chapters:
+        _update_chapters_digest(digest, chapter)
+    return digest.hexdigest()
+
+
+def _update_chapters_digest(digest, chapter: str) -> None:
+    encoded = chapter.encode("utf-8")
+    digest.update(f"{len(encoded)}:".encode())
+    digest.update(encoded)
+
+
+class QuoteIndex:
+    """
+    A positional inverted index over the chapters of a book, used to find passages and verify quotes locally.
+
+    Every word occurrence is stored with its chapter and word position, and the character offset of each
+    position is kept so that matches can be cited as (chapter, start, end) into the extracted chapter text.
+    Supports exact phrase lookup, proximity queries and BM25-ranked search.
+
+    Attributes
+    ----------
+    postings : dict of str to dict of int to list of int
+        For each word, the chapters it appears in and its word positions within each chapter.
+    offsets : list of list of int
+        For each chapter, the (start, end) character offsets of every word position, flattened.
+    chapter_lengths : list of int
+        The number of words in each chapter.
+    chapters_key : str
+        The `chapters_key` of the chapters the index was built from.
+    """
+
+    VERSION = 2
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self):
+        self.postings: dict[str, dict[int, list[int]]] = defaultdict(dict)
+        self.offsets: list[list[int]] = []
+        self.chapter_lengths: list[int] = []
+        self._digest = hashlib.sha256()
+        self._chapters_key: str | None = None
+
+    @property
+    def chapters_key(self) -> str:
+        return self._chapters_key or self._digest.hexdigest()
+
+    @classmethod
+    def build(cls, chapters: Iterable[str]) -> "QuoteIndex":
+        """
+        Builds the index in a single pass, consuming one chapter at a time.
+
+        Parameters
+        ----------
+        chapters : Iterable of str
+            The chapter texts, for example `EpubExtractor.iter_chapters()`.
+
+        Returns
+        -------
+        QuoteIndex
+            The populated index.
+        """
+        index = cls()
+        for chapter in chapters:
+            index.add_chapter(chapter)
+        return index
+
+    @classmethod
+    def for_book(cls, epub_path: str, chapters: Iterable[str] | None = None) -> "QuoteIndex":
+        """
+        Loads the index saved next to the book, building and saving it first if it is missing or out of date.
+
+        A saved index is reused only if it was built from the same chapter texts as `chapters`, so that its
+        citations line up with them. Without `chapters`, an index newer than the book is trusted.
+
+        Parameters
+        ----------
+        epub_path : str
+            The path to the EPUB file.
+        chapters : Iterable of str, optional
+            Already-extracted chapters. If not given, chapters are streamed from the EPUB.
+
+        Returns
+        -------
+        QuoteIndex
+            The index for the book.
+        """
+        index_path = cls.default_path(epub_path)
+        if chapters is not None:
+            chapters = list(chapters)
+        if os.path.exists(index_path):
+            try:
+                saved = cls.load(index_path)
+            except ValueError:
+                saved = None  # written by an older version of the index
+            if saved is not None:
+                if chapters is not None:
+                    current = saved.chapters_key == chapters_key(chapters)
+                else:
+                    current = os.path.getmtime(index_path) >= os.path.getmtime(epub_path)
+                if current:
+                    return saved
+        if chapters is None:
+            chapters = EpubExtractor(epub_path).iter_chapters()
+        index = cls.build(chapters)
+        index.save(index_path)
+        return index
+
+    @staticmethod
+    def default_path(epub_path: str) -> str:
+        return os.path.splitext(epub_path)[0] + "_index.json.gz"
+
+    def add_chapter(self, text: str) -> int:
+        """
+        Adds the next chapter to the index.
+
+        Parameters
+        ----------
+        text : str
+            The chapter text.
+
+        Returns
+        -------
+        int
+            The chapter number assigned to the text.
+        """
+        chapter = len(self.offsets)
+        _update_chapters_digest(self._digest, text)
+        offsets = []
+        for position, (word, start, end) in enumerate(tokenize_with_offsets(text)):
+            self.postings[word].setdefault(chapter, []).append(position)
+            offsets.extend((start, end))
+        self.offsets.append(offsets)
+        self.chapter_lengths.append(len(offsets) // 2)
+        return chapter
+
+    def _citation(self, chapter: int, first_position: int, last_position: int) -> dict:
+        offsets = self.offsets[chapter]
+        return {"chapter": chapter, "start": offsets[2 * first_position], "end": offsets[2 * last_position + 1]}
+
+    def phrase(self, text: str) -> list[dict]:
+        """
+        Finds every exact occurrence of a phrase, ignoring case and punctuation.
+
+        Parameters
+        ----------
+        text : str
+            The phrase to look for.
+
+        Returns
+        -------
+        list of dict
+            A citation {"chapter", "start", "end"} for each occurrence, in book order.
+        """
+        words = [word for word, _, _ in tokenize_with_offsets(text)]
+        if not words or any(word not in self.postings for word in words):
+            return []
+
+        # Start from the rarest word so the candidate list is as short as possible
+        anchor = min(range(len(words)), key=lambda i: sum(len(p) for p in self.postings[words[i]].values()))
+        citations = []
+        for chapter in sorted(self.postings[words[anchor]]):
+            position_sets = []
+            for word in words:
+                positions = self.postings[word].get(chapter)
+                if positions is None:
+                    break
+                position_sets.append(set(positions))
+            else:
+                for anchor_position in self.postings[words[anchor]][chapter]:
+                    start = anchor_position - anchor
+                    if all(start + i in position_sets[i] for i in range(len(words))):
+                        citations.append(self._citation(chapter, start, start + len(words) - 1))
+        return citations
+
+    def near(self, terms: list[str], window: int = 10) -> list[dict]:
+        """
+        Finds places where all the terms occur within `window` words of each other, in any order.
+
+        Parameters
+        ----------
+        terms : list of str
+            The words that must all appear.
+        window : int
+            The maximum distance in words between the first and last matched term.
+
+        Returns
+        -------
+        list of dict
+            A citation for each smallest non-overlapping span containing every term.
+        """
+        words = list(dict.fromkeys(word for term in terms for word, _, _ in tokenize_with_offsets(term)))
+        if not words or any(word not in self.postings for word in words):
+            return []
+
+        citations = []
+        chapters = set.intersection(*(set(self.postings[word]) for word in words))
+        for chapter in sorted(chapters):
+            hits = sorted((position, i) for i, word in enumerate(words) for position in self.postings[word][chapter])
+            counts = [0] * len(words)
+            covered = 0
+            left = 0
+            last_end = -1
+            for position, i in hits:
+                counts[i] += 1
+                covered += counts[i] == 1
+                if covered < len(words):
+                    continue
+                # Drop hits from the left while the span still contains every term, leaving the smallest span
+                while counts[hits[left][1]] > 1:
+                    counts[hits[left][1]] -= 1
+                    left += 1
+                left_position = hits[left][0]
+                if position - left_position <= window and left_position > last_end:
+                    citations.append(self._citation(chapter, left_position, position))
+                    last_end = position
+        return citations
+
+    def _bm25(self, words: list[str]) -> dict[int, float]:
+        total_chapters = len(self.chapter_lengths)
+        average_length = sum(self.chapter_lengths) / total_chapters if total_chapters else 0
+        scores: dict[int, float] = defaultdict(float)
+        for word in words:
+            chapters = self.postings.get(word, {})
+            if not chapters:
+                continue
+            idf = math.log(1 + (total_chapters - len(chapters) + 0.5) / (len(chapters) + 0.5))
+            for chapter, positions in chapters.items():
+                frequency = len(positions)
+                length_norm = 1 - self.B + self.B * self.chapter_lengths[chapter] / average_length
+                scores[chapter] += idf * frequency * (self.K1 + 1) / (frequency + self.K1 * length_norm)
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """
+        Ranks chapters against a free-text query with BM25.
+        Parts of the query in double quotes must appear as exact phrases in a chapter for it to match.
+
+        Parameters
+        ----------
+        query : str
+            The query, e.g. 'coal "the road to wigan pier"'.
+        limit : int
+            The maximum number of results.
+
+        Returns
+        -------
+        list of dict
+            {"chapter", "score", "start", "end"} for the best chapters, highest score first. The offsets cite
+            the first required phrase if there is one, otherwise the first occurrence of the rarest query word.
+        """
+        phrases = [first or second for first, second in QUOTED_PHRASE_PATTERN.findall(query)]
+        words = [word for word, _, _ in tokenize_with_offsets(query)]
+        if not words:
+            return []
+
+        scores = self._bm25(words)
+        phrase_hits: dict[int, dict] = {}
+        for phrase in phrases:
+            hits = {}
+            for citation in self.phrase(phrase):
+                hits.setdefault(citation["chapter"], citation)
+            scores = {chapter: score for chapter, score in scores.items() if chapter in hits}
+            for chapter, citation in hits.items():
+                phrase_hits.setdefault(chapter, citation)
+
+        present = [word for word in words if word in self.postings]
+        results = []
+        for chapter, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            citation = phrase_hits.get(chapter)
+            if citation is None:
+                in_chapter = [word for word in present if chapter in self.postings[word]]
+                rarest = min(in_chapter, key=lambda word: len(self.postings[word]))
+                position = self.postings[rarest][chapter][0]
+                citation = self._citation(chapter, position, position)
+            results.append({**citation, "score": score})
+        return results
+
+    def save(self, path: str) -> str:
+        """
+        Saves the index as gzipped JSON.
+
+        Parameters
+        ----------
+        path : str
+            Where to write the index.
+
+        Returns
+        -------
+        str
+            The path the index was written to.
+        """
+        data = {
+            "version": self.VERSION,
+            "chapters_key": self.chapters_key,
+            "chapter_lengths": self.chapter_lengths,
+            "offsets": self.offsets,
+            "postings": self.postings,
+        }
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=5) as file:
+            json.dump(data, file, separators=(",", ":"))
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "QuoteIndex":
+        """
+        Loads an index written by `save`.
+
+        Raises
+        ------
+        ValueError
+            If the file was written by an incompatible version of the index.
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported quote index version in {path}: {data.get('version')}")
+        index = cls()
+        index._chapters_key = data["chapters_key"]
+        index.chapter_lengths = data["chapter_lengths"]
+        index.offsets = data["offsets"]
+        for word, chapters in data["postings"].items():
+            index.postings[word] = {int(chapter): positions for chapter, positions in chapters.items()}
+        return index
@@ -0,0 +1,324 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+from book_summarizer.quote_index import tokenize_with_offsets
+
+QUOTE_PATTERN = re.compile(r"“([^”]+)”|\"([^\"\n]+)\"")
+# N-grams of books with a very large vocabulary are hashed modulo this prime rather than numbered exactly
+MERSENNE_61 = (1 << 61) - 1
+NGRAM_HASH_BASE = 0x1BD1E9955BD1E995
+
+
+def mulmod61(a: np.ndarray, b: int) -> np.ndarray:
+    """
+    (a * b) mod 2**61 - 1 for an array of values below the prime, without the product overflowing 64 bits.
+
+    Both factors are split into 32-bit halves, and the partial products folded back using 2**61 ≡ 1.
+    """
+    a = a.astype(np.uint64)
+    b_high, b_low = np.uint64(b >> 32), np.uint64(b & 0xFFFFFFFF)
+    a_high, a_low = a >> np.uint64(32), a & np.uint64(0xFFFFFFFF)
+    high = a_high * b_high
+    middle = a_low * b_high + a_high * b_low
+    low = a_low * b_low
+    prime = np.uint64(MERSENNE_61)
+    # 2**64 ≡ 8 and 2**61 ≡ 1, so each part reduces to a sum of terms below 2**61
+    total = high << np.uint64(3)
+    total += middle >> np.uint64(29)
+    total += (middle & np.uint64((1 << 29) - 1)) << np.uint64(32)
+    total += low >> np.uint64(61)
+    total += low & prime
+    total = (total & prime) + (total >> np.uint64(61))
+    return np.where(total >= prime, total - prime, total)
+
+
+def extract_quotes(text: str, min_words: int = 4) -> list[dict]:
+    """
+    Finds quoted spans in a summary. Short quotes such as scare quotes around a single term are skipped.
+
+    Args:
+        text (str): The summary text.
+        min_words (int): The fewest words a quoted span must have to be treated as a quote.
+
+    Returns:
+        list[dict]: {"quote": str, "start": int, "end": int} for each quote, with offsets of the quoted
+            text (excluding the quote marks) in the summary.
+    """
+    quotes = []
+    for match in QUOTE_PATTERN.finditer(text):
+        group = 1 if match.group(1) is not None else 2
+        quote = match.group(group)
+        if len(quote.split()) >= min_words:
+            quotes.append({"quote": quote, "start": match.start(group), "end": match.end(group)})
+    return quotes
+
+
+def banded_alignment(query: list[str], target: list[str], band: int) -> tuple[int, int, int]:
+    """
+    Aligns the whole query against the best-matching span of the target with word-level edit distance.
+    The target is expected to be a window in which the query starts about `band` words in, so only cells
+    within `band` of that diagonal are computed: O(len(query) * band) instead of O(len(query) * len(target)).
+
+    Args:
+        query (list[str]): The words of the quote.
+        target (list[str]): The words of the source window.
+        band (int): How far the alignment may drift from the expected diagonal.
+
+    Returns:
+        tuple[int, int, int]: (edit distance, first target word, one past the last target word) of the best span.
+    """
+    infinity = len(query) + len(target) + 1
+    width = len(target) + 1
+    # previous[j] holds the cost of aligning query[:i] ending at target[:j], and starts[j] where that span began
+    previous = [0] * width
+    starts = list(range(width))
+    for i in range(1, len(query) + 1):
+        low = max(0, i - 1)
+        high = min(len(target), i + 2 * band)
+        current = [infinity] * width
+        current_starts = [0] * width
+        for j in range(low, high + 1):
+            # Skipping a quote word
+            best = previous[j] + 1
+            start = starts[j]
+            if j > 0:
+                # Matching or substituting a word
+                diagonal = previous[j - 1] + (query[i - 1] != target[j - 1])
+                if diagonal < best:
+                    best, start = diagonal, starts[j - 1]
+                # Skipping a source word
+                if current[j - 1] + 1 < best:
+                    best, start = current[j - 1] + 1, current_starts[j - 1]
+            current[j] = best
+            current_starts[j] = start
+        previous, starts = current, current_starts
+
+    # On a tie prefer the longer span, which reaches the source word matching the end of the quote
+    end = min(range(width), key=lambda j: (previous[j], -j))
+    return previous[end], starts[end], end
+
+
+def describe_match(result: dict) -> str:
+    """
+    The note that follows a quote to say where it was found and how closely it matched.
+
+    Args:
+        result (dict): The QuoteVerifier.verify_quote result for the quote.
+
+    Returns:
+        str: The note, starting with a space.
+    """
+    if result["status"] == "not_found":
+        return " [quote not found in source]"
+    if result["status"] == "exact":
+        return f" [verified: section {result['chapter'] + 1}, offset {result['start']}]"
+    return f" [close match {result['score']:.0%}: section {result['chapter'] + 1}, offset {result['start']}]"
+
+
+class QuoteVerifier:
+    """
+    Checks quotes from summaries against the chapter text they claim to come from.
+
+    The chapters are indexed once by word n-grams. For each quote, n-gram hits vote for an alignment
+    diagonal (chapter, source position minus quote position), and the best few diagonals are checked with
+    a banded word-level edit distance. This finds verbatim quotes, lightly paraphrased ones and misattributed
+    ones without comparing the quote against the whole book.
+
+    Attributes
+    ----------
+    chapters : list of str
+        The chapter texts.
+    ngram : int
+        The number of words in each seed.
+    band : int
+        The number of words an alignment may drift from its seed diagonal.
+    """
+
+    MAX_SEED_HITS = 200  # n-grams more common than this carry no signal about where a quote came from
+    CANDIDATES = 3
+
+    def __init__(self, chapters: list[str], ngram: int = 3, band: int = 8, close_threshold: float = 0.7):
+        self.chapters = chapters
+        self.ngram = ngram
+        self.band = band
+        self.close_threshold = close_threshold
+        self._vocabulary: dict[str, int] = {}
+        self._words: list[list[str]] = []
+        self._offsets: list[list[tuple[int, int]]] = []
+        word_ids = []
+        for chapter in chapters:
+            tokens = tokenize_with_offsets(chapter)
+            words = [word for word, _, _ in tokens]
+            self._words.append(words)
+            self._offsets.append([(start, end) for _, start, end in tokens])
+            word_ids.append(
+                np.fromiter(
+                    (self._vocabulary.setdefault(word, len(self._vocabulary)) for word in words),
+                    dtype=np.int64,
+                    count=len(words),
+                )
+            )
+
+        # Each n-gram becomes one integer key; sorting the keys once turns every seed lookup into a binary search
+        keys, seed_chapters, seed_positions = [], [], []
+        for chapter_index, ids in enumerate(word_ids):
+            chapter_keys = self._ngram_keys(ids)
+            keys.append(chapter_keys)
+            seed_chapters.append(np.full(len(chapter_keys), chapter_index, dtype=np.int32))
+            seed_positions.append(np.arange(len(chapter_keys), dtype=np.int32))
+        keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self._seed_keys = keys[order]
+        self._seed_chapters = np.concatenate(seed_chapters)[order] if seed_chapters else np.zeros(0, dtype=np.int32)
+        self._seed_positions = np.concatenate(seed_positions)[order] if seed_positions else np.zeros(0, dtype=np.int32)
+
+    def _ngram_keys(self, ids: np.ndarray) -> np.ndarray:
+        count = len(ids) - self.ngram + 1
+        if count <= 0:
+            return np.zeros(0, dtype=np.int64)
+        base = max(len(self._vocabulary), 1)
+        if base**self.ngram < 2**63:
+            # Small enough to number every n-gram exactly
+            keys = ids[:count].copy()
+            for offset in range(1, self.ngram):
+                keys = keys * base + ids[offset : offset + count]
+            return keys
+        # Exact keys would overflow int64, so use a polynomial hash; unknown words (-1) become 0
+        shifted = (ids + 1).astype(np.uint64)
+        keys = shifted[:count].copy()
+        for offset in range(1, self.ngram):
+            keys = mulmod61(keys, NGRAM_HASH_BASE % MERSENNE_61) + shifted[offset : offset + count]
+            keys = np.where(keys >= np.uint64(MERSENNE_61), keys - np.uint64(MERSENNE_61), keys)
+        return keys.astype(np.int64)
+
+    def _candidates(self, words: list[str], chapter: int | None) -> list[tuple[int, int]]:
+        ids = np.array([self._vocabulary.get(word, -1) for word in words], dtype=np.int64)
+        keys = self._ngram_keys(ids)
+        # n-grams containing a word the book never uses cannot match anything
+        known = np.array(
+            [(ids[position : position + self.ngram] >= 0).all() for position in range(len(keys))], dtype=bool
+        )
+        lows = np.searchsorted(self._seed_keys, keys, side="left")
+        highs = np.searchsorted(self._seed_keys, keys, side="right")
+
+        votes: Counter = Counter()
+        for position, (low, high) in enumerate(zip(lows, highs)):
+            if not known[position] or high - low > self.MAX_SEED_HITS:
+                continue
+            for hit_chapter, hit_position in zip(self._seed_chapters[low:high], self._seed_positions[low:high]):
+                if chapter is None or hit_chapter == chapter:
+                    votes[(int(hit_chapter), int(hit_position) - position)] += 1
+
+        # Nearby diagonals are the same candidate shifted by an insertion or deletion, so keep the best of each cluster
+        candidates: list[tuple[int, int]] = []
+        for (hit_chapter, diagonal), _ in votes.most_common():
+            if all(c != hit_chapter or abs(d - diagonal) > self.band for c, d in candidates):
+                candidates.append((hit_chapter, diagonal))
+            if len(candidates) == self.CANDIDATES:
+                break
+        return candidates
+
+    def verify_quote(self, quote: str, chapter: int | None = None) -> dict:
+        """
+        Locates a single quote in the book.
+
+        Parameters
+        ----------
+        quote : str
+            The quoted text.
+        chapter : int, optional
+            Restrict the search to this chapter.
+
+        Returns
+        -------
+        dict
+            {"quote", "status", "score", "chapter", "start", "end", "source_text"}. status is "exact" when the
+            words match verbatim, "close" when the score is at least close_threshold, otherwise "not_found".
+            score is 1 minus the word edit distance divided by the quote length. source_text is the matching
+            passage of the chapter, which can replace a misquoted quote.
+        """
+        words = [word for word, _, _ in tokenize_with_offsets(quote)]
+        best = {"quote": quote, "status": "not_found", "score": 0.0, "chapter": None, "start": None, "end": None}
+        best["source_text"] = None
+        if not words:
+            return best
+
+        for candidate_chapter, diagonal in self._candidates(words, chapter):
+            source = self._words[candidate_chapter]
+            window_start = max(0, diagonal - self.band)
+            window = source[window_start : diagonal + len(words) + self.band]
+            distance, first, last = banded_alignment(words, window, self.band)
+            score = 1 - distance / len(words)
+            if score > best["score"] and last > first:
+                offsets = self._offsets[candidate_chapter]
+                start = offsets[window_start + first][0]
+                end = offsets[window_start + last - 1][1]
+                best.update(
+                    score=score,
+                    chapter=candidate_chapter,
+                    start=start,
+                    end=end,
+                    source_text=self.chapters[candidate_chapter][start:end],
+                )
+
+        if best["score"] == 1.0:
+            best["status"] = "exact"
+        elif best["score"] >= self.close_threshold:
+            best["status"] = "close"
+        return best
+
+    def verify(self, summary: str, chapter: int | None = None) -> list[dict]:
+        """
+        Verifies every quote in a summary.
+
+        Parameters
+        ----------
+        summary : str
+            The summary text.
+        chapter : int, optional
+            The chapter the summary is about. Quotes are only searched for there if given.
+
+        Returns
+        -------
+        list of dict
+            The verify_quote result for each quote, plus "summary_start" and "summary_end" offsets.
+        """
+        results = []
+        for quote in extract_quotes(summary):
+            result = self.verify_quote(quote["quote"], chapter)
+            result["summary_start"] = quote["start"]
+            result["summary_end"] = quote["end"]
+            results.append(result)
+        return results
+
+    def annotate(self, summary: str, chapter: int | None = None, correct: bool = False) -> str:
+        """
+        Adds a note after each quote in a summary saying where it was found and how closely it matched.
+
+        Parameters
+        ----------
+        summary : str
+            The summary text.
+        chapter : int, optional
+            The chapter the summary is about.
+        correct : bool
+            If True, close matches are replaced with the exact source text.
+
+        Returns
+        -------
+        str
+            The annotated summary.
+        """
+        annotated = summary
+        # Work backwards so earlier offsets stay valid as text is inserted
+        for result in reversed(self.verify(summary, chapter)):
+            start, end = result["summary_start"], result["summary_end"]
+            note = describe_match(result)
+            if correct and result["status"] == "close":
+                annotated = annotated[:start] + result["source_text"] + annotated[end:]
+                end = start + len(result["source_text"])
+            closing = end + 1  # skip past the closing quote mark
+            annotated = annotated[:closing] + note + annotated[closing:]
+        return annotated
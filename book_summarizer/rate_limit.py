@@ -0,0 +1,136 @@
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+from book_summarizer.llm_core import LLMClient
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket that keeps request and token throughput under per-minute limits.
+
+    Callers `acquire` before each request and block until there is room. The buckets start full, so a
+    burst of up to one minute's allowance goes out at once and the rest is spread evenly after that.
+
+    Attributes
+    ----------
+    requests_per_minute : float, optional
+        The most requests per minute, or None for no request limit.
+    tokens_per_minute : float, optional
+        The most tokens per minute, or None for no token limit.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._request_allowance = requests_per_minute or 0.0
+        self._token_allowance = tokens_per_minute or 0.0
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                self.requests_per_minute, self._request_allowance + elapsed * self.requests_per_minute / 60
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                self.tokens_per_minute, self._token_allowance + elapsed * self.tokens_per_minute / 60
+            )
+
+    def _wait_time(self, tokens: float) -> float:
+        """Seconds until both buckets hold enough for the request, 0 if they already do."""
+        wait = 0.0
+        if self.requests_per_minute and self._request_allowance < 1:
+            wait = max(wait, (1 - self._request_allowance) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute and self._token_allowance < tokens:
+            wait = max(wait, (tokens - self._token_allowance) * 60 / self.tokens_per_minute)
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Blocks until a request of `tokens` tokens fits under the limits, then takes its share.
+
+        Parameters
+        ----------
+        tokens : int
+            The estimated tokens of the request, prompt and response together. A request larger than
+            a whole minute's allowance waits for a full bucket rather than forever.
+
+        Returns
+        -------
+        float
+            The number of seconds spent waiting.
+        """
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                wait = self._wait_time(tokens)
+                if wait == 0:
+                    self._request_allowance -= 1
+                    self._token_allowance -= tokens
+                    return waited
+            self._sleep(wait)
+            waited += wait
+
+
+class RateLimitedClient(LLMClient):
+    """
+    Wraps an LLMClient so that every call first waits on a shared RateLimiter.
+    Several clients, or several threads using one client, can share a limiter to stay under one account's limits.
+    """
+
+    CHARS_PER_TOKEN = 4  # a rough estimate is enough for pacing and avoids tokenizing every prompt twice
+
+    def __init__(self, client: LLMClient, limiter: RateLimiter, response_tokens: int = 500):
+        """
+        Args:
+            client (LLMClient): The client to wrap.
+            limiter (RateLimiter): The limiter shared by everything calling the same account.
+            response_tokens (int): The expected response length, counted against the token limit.
+        """
+        self.client = client
+        self.limiter = limiter
+        self.response_tokens = response_tokens
+
+    @property
+    def model_name(self) -> str:
+        return self.client.model_name
+
+    @property
+    def max_tokens(self) -> int:
+        return self.client.max_tokens
+
+    @property
+    def max_output_tokens(self) -> int:
+        return self.client.max_output_tokens
+
+    @property
+    def cost_per_token(self) -> float:
+        return self.client.cost_per_token
+
+    def _acquire(self, system_prompt: str, instruction: str) -> None:
+        prompt_tokens = (len(system_prompt) + len(instruction)) // self.CHARS_PER_TOKEN
+        self.limiter.acquire(prompt_tokens + self.response_tokens)
+
+    def call(self, system_prompt: str, instruction: str) -> str:
+        self._acquire(system_prompt, instruction)
+        return self.client.call(system_prompt, instruction)
+
+    def stream(self, system_prompt: str, instruction: str) -> Iterator[str]:
+        self._acquire(system_prompt, instruction)
+        yield from self.client.stream(system_prompt, instruction)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any
+
+
+class ResultCache:
+    """
+    A persistent, content-addressed store for the results of each stage of summarization.
+
+    Every result is keyed by a hash of all of its inputs (model, prompts and input text), so a result is
+    reused exactly when nothing that produced it has changed. Because a stage's input includes the outputs
+    of the stages before it, this gives the pipeline incremental rebuilds for free: after editing only the
+    combiner prompt, every chunk summary is a hit and only the combine calls run again.
+
+    Attributes
+    ----------
+    path : str
+        The SQLite database file.
+    hits : int
+        The number of lookups that found a result since the cache was opened.
+    misses : int
+        The number of lookups that found nothing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def key(kind: str, *parts: Any) -> str:
+        """
+        Hashes a stage name and all of its inputs into a cache key.
+
+        Parameters
+        ----------
+        kind : str
+            The stage, e.g. "call" or "chunk_plan".
+        *parts : Any
+            Everything the result depends on. Each part is converted with str().
+
+        Returns
+        -------
+        str
+            A hex digest that changes whenever any part changes.
+        """
+        digest = hashlib.sha256(kind.encode("utf-8"))
+        for part in parts:
+            encoded = str(part).encode("utf-8")
+            # Length-prefix each part so ("ab", "c") and ("a", "bc") hash differently
+            digest.update(len(encoded).to_bytes(8, "little"))
+            digest.update(encoded)
+        return f"{kind}:{digest.hexdigest()}"
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def __contains__(self, key: str) -> bool:
+        """Checks for a result without counting a hit or a miss."""
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone() is not None
+
+    def set(self, key: str, value: str) -> None:
+        kind = key.split(":", 1)[0]
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, kind, value, created) VALUES (?, ?, ?, ?)",
+                (key, kind, value, time.time()),
+            )
+
+    def get_json(self, key: str) -> Any | None:
+        value = self.get(key)
+        return None if value is None else json.loads(value)
+
+    def set_json(self, key: str, value: Any) -> None:
+        self.set(key, json.dumps(value))
+
+    def stats(self) -> dict:
+        """Returns hit and miss counts for this session and the number of stored results of each kind."""
+        with self._lock:
+            counts = dict(self._connection.execute("SELECT kind, COUNT(*) FROM results GROUP BY kind").fetchall())
+        return {"hits": self.hits, "misses": self.misses, "stored": counts}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import re
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+
+import numpy as np
+
+from book_summarizer.epub_extractor import EpubExtractor
+from book_summarizer.llm_core import CLIENT, retry_handler
+from book_summarizer.quote_index import chapters_key
+from book_summarizer.text_processing import TextProcessor
+
+
+class EmbeddingBackend(ABC):
+    @property
+    @abstractmethod
+    def model_name(self) -> str:
+        pass
+
+    @property
+    @abstractmethod
+    def dimensions(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def cost_per_token(self) -> float:
+        pass
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Returns one row per text, shape (len(texts), dimensions)."""
+        pass
+
+
+class OpenAIEmbedding(EmbeddingBackend):
+    client = CLIENT
+    model_name = "text-embedding-3-small"
+    dimensions = 1536
+    cost_per_token = 0.02 / 1000000
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        response = retry_handler(self._make_request, texts)
+        if isinstance(response, str):
+            # retry_handler reports failures as an error string rather than raising
+            raise RuntimeError(response)
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+    def _make_request(self, texts: list[str]):
+        return self.client.embeddings.create(model=self.model_name, input=texts)
+
+
+class HashingEmbedding(EmbeddingBackend):
+    """
+    A local, deterministic embedding built by hashing words and word pairs into a fixed number of signed buckets.
+    It needs no network and no model download, which makes it useful for offline use and tests,
+    but it only captures lexical overlap rather than meaning.
+    """
+
+    WORD_PATTERN = re.compile(r"\w+")
+    model_name = "hashing-512"
+    dimensions = 512
+    cost_per_token = 0.0
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+        self.model_name = f"hashing-{dimensions}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = self.WORD_PATTERN.findall(text.lower())
+            features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(feature.encode()) for feature in features), dtype=np.uint32)
+            signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)
+            np.add.at(matrix[row], hashes % self.dimensions, signs)
+        return matrix
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+class VectorIndex:
+    """
+    Embedded chunks of a book, stored as a memory-mapped matrix of unit vectors for top-k cosine search.
+
+    The index is a directory holding `vectors.npy` (float32, one row per chunk) and `chunks.json`
+    (the chunk texts, their chapters and content hashes). Rebuilding over an existing index only embeds
+    chunks whose text is new, so re-chunking or a small text fix costs a handful of embedding calls.
+
+    Attributes
+    ----------
+    vectors : numpy.ndarray
+        The unit-length chunk embeddings, memory-mapped read-only when loaded from disk.
+    chunks : list of dict
+        {"chapter": int, "text": str, "key": str} for each row of `vectors`.
+    embedder : EmbeddingBackend
+        The backend used for both the chunks and incoming queries.
+    chapters_key : str or None
+        The `chapters_key` of the chapters the index was built from, or None for an index from an older version.
+    """
+
+    VERSION = 2
+    VECTORS_FILE = "vectors.npy"
+    CHUNKS_FILE = "chunks.json"
+
+    def __init__(
+        self, vectors: np.ndarray, chunks: list[dict], embedder: EmbeddingBackend, chapters_key: str | None = None
+    ):
+        self.vectors = vectors
+        self.chunks = chunks
+        self.embedder = embedder
+        self.chapters_key = chapters_key
+        self._query_cache: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(
+        cls,
+        chapters: Iterable[str],
+        embedder: EmbeddingBackend,
+        path: str,
+        processor: TextProcessor | None = None,
+        chunk_size: int = 400,
+        overlap: int = 50,
+        batch_size: int = 128,
+        previous: "VectorIndex | None" = None,
+    ) -> "VectorIndex":
+        """
+        Chunks the chapters on sentence boundaries, embeds the chunks in batches and writes the index to `path`.
+
+        Parameters
+        ----------
+        chapters : Iterable of str
+            The chapter texts.
+        embedder : EmbeddingBackend
+            The embedding backend.
+        path : str
+            The directory to write the index to.
+        processor : TextProcessor, optional
+            Used for token counting when chunking. Defaults to the GPT-4o-mini tokenizer.
+        chunk_size : int
+            The maximum number of tokens in a chunk.
+        overlap : int
+            The maximum number of tokens shared by consecutive chunks.
+        batch_size : int
+            The number of chunks sent in each embedding request.
+        previous : VectorIndex, optional
+            An earlier index whose vectors are reused for chunks with identical text.
+
+        Returns
+        -------
+        VectorIndex
+            The new index, loaded back from disk.
+        """
+        processor = processor or TextProcessor()
+        chapters = list(chapters)
+        chunks = [
+            {"chapter": chapter_index, "text": text, "key": text_key(text)}
+            for chapter_index, chapter in enumerate(chapters)
+            for text in processor.chunk_sentences(chapter, chunk_size, overlap)
+        ]
+
+        known = {}
+        if previous is not None and previous.embedder.model_name == embedder.model_name:
+            known = {chunk["key"]: row for row, chunk in enumerate(previous.chunks)}
+
+        os.makedirs(path, exist_ok=True)
+        vectors_path = os.path.join(path, cls.VECTORS_FILE)
+        # Write to a temporary file so that `previous` can still be read if it lives in the same directory
+        temporary_path = vectors_path + ".tmp.npy"
+        shape = (len(chunks), embedder.dimensions)
+        if chunks:
+            vectors = np.lib.format.open_memmap(temporary_path, mode="w+", dtype=np.float32, shape=shape)
+        else:
+            vectors = np.zeros(shape, dtype=np.float32)
+
+        missing = []
+        for row, chunk in enumerate(chunks):
+            if chunk["key"] in known:
+                vectors[row] = previous.vectors[known[chunk["key"]]]
+            else:
+                missing.append(row)
+        for start in range(0, len(missing), batch_size):
+            rows = missing[start : start + batch_size]
+            vectors[rows] = normalize_rows(embedder.embed([chunks[row]["text"] for row in rows]))
+
+        if chunks:
+            vectors.flush()
+            del vectors
+            os.replace(temporary_path, vectors_path)
+        else:
+            np.save(vectors_path, vectors)
+
+        metadata = {
+            "version": cls.VERSION,
+            "chapters_key": chapters_key(chapters),
+            "model_name": embedder.model_name,
+            "chunk_size": chunk_size,
+            "overlap": overlap,
+            "embedded_chunks": len(missing),
+            "chunks": chunks,
+        }
+        with open(os.path.join(path, cls.CHUNKS_FILE), "w") as file:
+            json.dump(metadata, file)
+        return cls.load(path, embedder)
+
+    @classmethod
+    def load(cls, path: str, embedder: EmbeddingBackend) -> "VectorIndex":
+        """
+        Opens a saved index, memory-mapping the vectors rather than reading them into memory.
+
+        Raises
+        ------
+        ValueError
+            If the index was built with a different embedding model.
+        """
+        with open(os.path.join(path, cls.CHUNKS_FILE)) as file:
+            metadata = json.load(file)
+        if metadata["model_name"] != embedder.model_name:
+            raise ValueError(
+                f"Vector index at {path} was built with {metadata['model_name']}, not {embedder.model_name}."
+            )
+        vectors = np.load(os.path.join(path, cls.VECTORS_FILE), mmap_mode="r")
+        key = metadata["chapters_key"] if metadata.get("version") == cls.VERSION else None
+        return cls(vectors, metadata["chunks"], embedder, key)
+
+    @classmethod
+    def for_book(
+        cls,
+        epub_path: str,
+        embedder: EmbeddingBackend,
+        chapters: Iterable[str] | None = None,
+        processor: TextProcessor | None = None,
+    ) -> "VectorIndex":
+        """
+        Loads the index saved next to the book, rebuilding it if it is missing, out of date or uses another model.
+        Vectors from the old index are reused wherever chunk text is unchanged.
+
+        When `chapters` are given the saved index is reused only if it was built from the same chapter texts;
+        otherwise an index from this version that is newer than the book is trusted.
+        """
+        path = cls.default_path(epub_path)
+        if chapters is not None:
+            chapters = list(chapters)
+        previous = None
+        if os.path.exists(os.path.join(path, cls.CHUNKS_FILE)):
+            try:
+                previous = cls.load(path, embedder)
+            except ValueError:
+                previous = None
+            if previous is not None and previous.chapters_key is not None:
+                if chapters is not None:
+                    current = previous.chapters_key == chapters_key(chapters)
+                else:
+                    current = os.path.getmtime(path) >= os.path.getmtime(epub_path)
+                if current:
+                    return previous
+        if chapters is None:
+            chapters = EpubExtractor(epub_path).iter_chapters()
+        return cls.build(chapters, embedder, path, processor=processor, previous=previous)
+
+    @staticmethod
+    def default_path(epub_path: str) -> str:
+        return os.path.splitext(epub_path)[0] + "_vectors"
+
+    def embed_query(self, query: str) -> np.ndarray:
+        if query not in self._query_cache:
+            self._query_cache[query] = normalize_rows(self.embedder.embed([query]))[0]
+        return self._query_cache[query]
+
+    def search(self, query: str, k: int = 5) -> list[dict]:
+        """
+        Finds the k chunks most similar to the query by cosine similarity.
+
+        Parameters
+        ----------
+        query : str
+            The question or passage to search for.
+        k : int
+            The number of chunks to return.
+
+        Returns
+        -------
+        list of dict
+            {"chapter": int, "text": str, "score": float, "row": int} for the best chunks, most similar first.
+        """
+        k = min(k, len(self.chunks))
+        if k <= 0:
+            return []
+        scores = self.vectors @ self.embed_query(query)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "chapter": self.chunks[row]["chapter"],
+                "text": self.chunks[row]["text"],
+                "score": float(scores[row]),
+                "row": int(row),
+            }
+            for row in top
+        ]
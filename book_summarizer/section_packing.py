@@ -0,0 +1,78 @@
+import json
+import re
+
+from book_summarizer.text_processing import find_boolean_in_string
+
+# Models often wrap JSON in a markdown code fence despite being asked not to
+CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+
+def bin_sections(token_counts: dict[int, int], budget: int, max_sections: int) -> list[list[int]]:
+    """
+    Groups sections into bins that each fit in one request, keeping neighbouring sections together.
+
+    Args:
+        token_counts (dict[int, int]): The token count of each section to pack, keyed by section index.
+        budget (int): The most tokens of section text in one bin.
+        max_sections (int): The most sections in one bin, which bounds the size of the response.
+
+    Returns:
+        list[list[int]]: The section indices in each bin, in order.
+    """
+    bins: list[list[int]] = []
+    current: list[int] = []
+    used = 0
+    for index in sorted(token_counts):
+        tokens = token_counts[index]
+        if current and (used + tokens > budget or len(current) >= max_sections):
+            bins.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += tokens
+    if current:
+        bins.append(current)
+    return bins
+
+
+def format_packed_sections(sections: dict[int, str]) -> str:
+    """Marks each section with its index so that the model can refer to it in its response."""
+    return "\n\n".join(f'<section id="{index}">\n{text}\n</section>' for index, text in sections.items())
+
+
+def parse_packed_response(response: str, indices: list[int]) -> dict[int, dict]:
+    """
+    Splits a packed response back into per-section results.
+
+    Args:
+        response (str): The model's response, expected to be a JSON array of
+            {"id": int, "title": str, "worthy": bool, "summary": str} objects.
+        indices (list[int]): The sections that were sent.
+
+    Returns:
+        dict[int, dict]: {"title": str, "worthiness": bool, "summary": str} for each section whose result was
+            complete. Sections that are missing or malformed are left out, so that the caller can retry them
+            on their own; an unparseable response gives an empty dict.
+    """
+    try:
+        entries = json.loads(CODE_FENCE.sub("", response))
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(entries, list):
+        return {}
+
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        title, worthy, summary = entry.get("title"), entry.get("worthy"), entry.get("summary") or ""
+        if index not in indices or not isinstance(title, str) or not isinstance(summary, str):
+            continue
+        worthiness = worthy if isinstance(worthy, bool) else find_boolean_in_string(str(worthy))
+        if worthiness and not summary.strip():
+            continue
+        results[index] = {"title": title, "worthiness": worthiness, "summary": summary}
+    return results
@@ -0,0 +1,140 @@
+import threading
+from collections.abc import Callable
+from typing import Any
+
+
+class OrderedCompletionBuffer:
+    """
+    Releases results in index order even though they complete out of order.
+
+    Workers `add` their result as soon as it is done; the buffer holds it until every earlier index
+    has arrived and then returns the whole run of consecutive results that became ready. Callbacks registered
+    with `watch` are called when their index reaches the head.
+
+    Attributes
+    ----------
+    next_index : int
+        The index of the next result to be released, i.e. the one the reader is waiting on.
+    """
+
+    def __init__(self, start_index: int = 0):
+        self.next_index = start_index
+        self._pending: dict[int, Any] = {}
+        self._watchers: dict[int, Callable[[], None]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, index: int, item: Any) -> list[Any]:
+        """
+        Stores a completed item and returns all items that can now be released in order.
+
+        Parameters
+        ----------
+        index : int
+            The position of the item in the original sequence.
+        item : Any
+            The completed result.
+
+        Returns
+        -------
+        list of Any
+            The released items, possibly empty if an earlier index is still outstanding.
+        """
+        with self._lock:
+            self._pending[index] = item
+            head = self.next_index
+            released = []
+            while self.next_index in self._pending:
+                released.append(self._pending.pop(self.next_index))
+                self.next_index += 1
+            # Every index that reached the head on the way, including ones released in this same call
+            heads = [self._watchers.pop(i) for i in range(head, self.next_index + 1) if i in self._watchers]
+        for callback in heads:
+            callback()
+        return released
+
+    def watch(self, index: int, callback: Callable[[], None]) -> None:
+        """Calls `callback` once `index` reaches the head, or immediately if it already has."""
+        with self._lock:
+            if index > self.next_index:
+                self._watchers[index] = callback
+                return
+        callback()
+
+    def is_next(self, index: int) -> bool:
+        with self._lock:
+            return index == self.next_index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+class HeadOfLineTokenRelay:
+    """
+    Forwards streamed tokens for one item only while that item is at the head of an OrderedCompletionBuffer.
+
+    Tokens produced while an earlier item is still outstanding are held back, then flushed in one go as soon as
+    the item reaches the head, even if it finished streaming before then, so the reader never sees a partial or
+    interleaved stream.
+    """
+
+    def __init__(self, index: int, buffer: OrderedCompletionBuffer, on_token: Callable[[int, str], None]):
+        self.index = index
+        self.buffer = buffer
+        self.on_token = on_token
+        self._held: list[str] = []
+        self._lock = threading.Lock()
+        buffer.watch(index, self.flush)
+
+    def __call__(self, token: str) -> None:
+        # Checking the head under the lock means a token is either forwarded or held before the flush
+        with self._lock:
+            if not self.buffer.is_next(self.index):
+                self._held.append(token)
+                return
+            if self._held:
+                token = "".join(self._held) + token
+                self._held = []
+            self.on_token(self.index, token)
+
+    def flush(self) -> None:
+        """Forwards the held tokens. Called by the buffer when the item reaches the head."""
+        with self._lock:
+            if self._held:
+                self.on_token(self.index, "".join(self._held))
+                self._held = []
+
+
+class TokenGate:
+    """
+    Holds streamed tokens back until the stream is known to be wanted.
+
+    Used when work starts speculatively: tokens are kept until `open` forwards them and everything after,
+    or `discard` drops them and everything after.
+    """
+
+    def __init__(self, on_token: Callable[[str], None]):
+        self.on_token = on_token
+        self._held: list[str] = []
+        self._state = "held"
+        self._lock = threading.Lock()
+
+    def __call__(self, token: str) -> None:
+        # Forwarding under the lock keeps held tokens ahead of ones that arrive while the gate opens
+        with self._lock:
+            if self._state == "held":
+                self._held.append(token)
+            elif self._state == "open":
+                self.on_token(token)
+
+    def open(self) -> None:
+        with self._lock:
+            self._state = "open"
+            if self._held:
+                self.on_token("".join(self._held))
+                self._held = []
+
+    def discard(self) -> None:
+        with self._lock:
+            self._state = "discarded"
+            self._held = []
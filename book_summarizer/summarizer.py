@@ -1,48 +1,269 @@
+import contextvars
+import itertools
+import math
 import os
-from functools import wraps
+import threading
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, nullcontext
+from typing import TYPE_CHECKING, Any, TextIO
 
-import weave
 from dotenv import load_dotenv
 from joblib import Parallel, delayed
 
+from book_summarizer import tracing
+from book_summarizer.chunk_analysis import format_points, merge_analyses, parse_analysis_response
+from book_summarizer.chunk_planner import ChunkPlanner
+from book_summarizer.compression import ExtractiveCompressor
+from book_summarizer.deadlines import Deadline
 from book_summarizer.default_prompts import DEFAULT_PROMPTS
 from book_summarizer.epub_extractor import EpubExtractor
-from book_summarizer.llm_core import GPT4O, GPT4oMini, LLMClient
+from book_summarizer.hedging import HedgedClient
+from book_summarizer.llm_core import GPT4O, GPT4oMini, LLMClient, is_error_response
+from book_summarizer.near_duplicates import NearDuplicateIndex
+from book_summarizer.quote_index import QuoteIndex
+from book_summarizer.quote_verifier import QuoteVerifier, describe_match
+from book_summarizer.result_cache import ResultCache
+from book_summarizer.retrieval import EmbeddingBackend, OpenAIEmbedding, VectorIndex
+from book_summarizer.section_packing import bin_sections, format_packed_sections, parse_packed_response
+from book_summarizer.streaming import HeadOfLineTokenRelay, OrderedCompletionBuffer, TokenGate
+from book_summarizer.summary_checks import SummaryChecker
+from book_summarizer.text_extractor import TextExtractor
 from book_summarizer.text_processing import TextProcessor, find_boolean_in_string
+from book_summarizer.tracing import Tracer, WeaveExporter
+
+if TYPE_CHECKING:
+    from book_summarizer.daemon import DaemonClient
+    from book_summarizer.job_queue import JobQueue
 
 # Load the API key which OpenAI will read from the environment
 load_dotenv()
 
 
-def conditional_wandb_log(func):
-    """this wraps the weave.op() decorator so that it is only applied if the log_to_wandb attribute is set to True"""
-
-    @wraps(func)
-    def wrapper(self, *args, **kwargs):
-        if getattr(self, "log_to_wandb", False):
-            # Apply the @weave.op() decorator
-            decorated_func = weave.op()(func)
-            return decorated_func(self, *args, **kwargs)
-        else:
-            # Call the original function
-            return func(self, *args, **kwargs)
-
-    return wrapper
-
-
 class BookSummarizer:
     SUMMARY_SIZE = 1500  # gpt-3.5-turbo summaries for 12k chapters were 500 tokens. 1500 should be safe.
     CHUNK_OVERLAP = 50
+    MAX_WORKERS = 16  # LLM calls are I/O bound, so run more threads than there are cores
+    NOT_WORTHY_SUMMARY = "Evaluated as not worth summarizing."
+    SPECULATION_MIN_CHARS = 20000  # chapters shorter than this summarize quickly enough to wait for worthiness
+    PACKING_MAX_SECTION_TOKENS = 800  # epigraphs, part dividers, short prefaces
+    PACKING_BUDGET = 6000  # tokens of section text per packed request
+    PACKING_MAX_SECTIONS = 12  # keeps the JSON response well inside the output limit
 
-    def __init__(self, epub_path: str):
+    def __init__(self, epub_path: str, cache_path: str | None = None):
+        """
+        Args:
+            epub_path (str): The path to the EPUB file, or to a plain-text or Markdown file, which is read with
+                TextExtractor.
+            cache_path (Optional[str]): A SQLite file in which every model response and chunk plan is stored,
+                keyed by a hash of its inputs. Re-running with changed prompts or models then only repeats the
+                stages whose inputs changed. Pass BookSummarizer.default_cache_path(epub_path) to keep it
+                next to the book. No caching if None.
+        """
         self.epub_path = epub_path
-        self.extractor = EpubExtractor(epub_path)
-        self.chapters = self.extractor.chapters
-        self.log_to_wandb = False
+        self.extractor = TextExtractor(epub_path) if TextExtractor.handles(epub_path) else EpubExtractor(epub_path)
+        self._chapters: list[str] | None = None
+        # Set to a Tracer to record how long each book, chapter, chunk and model call takes
+        self.tracer: Tracer | None = None
+        self.cache = ResultCache(cache_path) if cache_path else None
+        self.chunk_planner = ChunkPlanner(summary_reserve=self.SUMMARY_SIZE)
+        # Set to True to end chunks where the text's own sentences say, so that most chunks, and their cached
+        # summaries, survive edits to the text and changes to the chunk plan
+        self.content_defined_chunks = False
+        # Decides which chapters a cascade summarizes again with the stronger model
+        self.summary_checker = SummaryChecker()
+        # Set to an ExtractiveCompressor to drop low-information sentences from chapters before summarizing them
+        self.compressor: ExtractiveCompressor | None = None
+        # Set to a NearDuplicateIndex to reuse the results of chapters that nearly match ones summarized before,
+        # such as the same chapter in another edition. Packed sections are not looked up.
+        self.duplicate_index: NearDuplicateIndex | None = None
+        self._quote_index: QuoteIndex | None = None
+        self._quote_verifier: QuoteVerifier | None = None
+        self._vector_index: VectorIndex | None = None
+
+    @property
+    def chapters(self) -> Sequence[str]:
+        """
+        The chapter texts, extracted from the EPUB on first use so that a thin client never reads the book.
+        Text files are memory-mapped, and each chapter is decoded only when it is used.
+        """
+        if self._chapters is None:
+            with tracing.span("extract", tracer=self.tracer) as span:
+                self._chapters = self.extractor.chapters
+                span.set(chapters=len(self._chapters))
+        return self._chapters
+
+    @chapters.setter
+    def chapters(self, chapters: Sequence[str]) -> None:
+        self._chapters = chapters
 
     def _default_save_path(self) -> str:
         return os.path.splitext(self.epub_path)[0] + "_summary.md"
 
+    @staticmethod
+    def default_cache_path(epub_path: str) -> str:
+        return os.path.splitext(epub_path)[0] + "_cache.sqlite3"
+
+    @staticmethod
+    def _call_key(model: LLMClient, system_prompt: str, instruction: str) -> str:
+        return ResultCache.key("call", model.model_name, system_prompt, instruction)
+
+    def _call_model(
+        self,
+        model: LLMClient,
+        system_prompt: str,
+        instruction: str,
+        on_token: Callable[[str], None] | None = None,
+    ) -> str:
+        """
+        Calls the model, or returns the stored response if this exact call has been made before.
+        Every stage of summarization goes through here, so a stage is only rerun when its model,
+        prompts or input text change. Error responses are never stored.
+        No call is made once the current Deadline has passed.
+        """
+        deadline = Deadline.current()
+        if deadline is not None and deadline.expired():
+            return "Error: Deadline exceeded before the call was made."
+
+        prompts = {}
+        if tracing.recording_prompts(self.tracer):
+            prompts = {"system_prompt": system_prompt, "instruction": instruction}
+        with tracing.span("llm_call", tracer=self.tracer, model=model.model_name, **prompts) as span:
+            key = None
+            response = None
+            if self.cache is not None:
+                key = self._call_key(model, system_prompt, instruction)
+                response = self.cache.get(key)
+                span.set(cached=response is not None)
+
+            if response is not None:
+                if on_token:
+                    on_token(response)
+            elif on_token is None:
+                response = model.call(system_prompt, instruction)
+            else:
+                pieces = []
+                for piece in model.stream(system_prompt, instruction):
+                    on_token(piece)
+                    if is_error_response(piece):
+                        # The stream broke off, so what arrived before it is not a whole response
+                        pieces = [piece]
+                        break
+                    pieces.append(piece)
+                response = "".join(pieces)
+
+            if span.recording:
+                span.set(
+                    input_tokens=self._token_count(model, f"{system_prompt}{instruction}"),
+                    output_tokens=self._token_count(model, response),
+                    failed=is_error_response(response),
+                )
+                if prompts:
+                    span.set(response=response)
+        if key is not None and not is_error_response(response):
+            self.cache.set(key, response)
+        return response
+
+    @staticmethod
+    def _token_count(model: LLMClient, text: str) -> int | None:
+        """The length of the text in the model's tokens, or None if tiktoken does not know the model."""
+        try:
+            return len(TextProcessor(model).tokenize_text(text))
+        except KeyError:
+            return None
+
+    def plan_chunks(
+        self,
+        text: str,
+        summarizer_model: LLMClient,
+        summarizer_prompt: str = DEFAULT_PROMPTS["summarizer_prompt"],
+        summarizer_instruction: str = DEFAULT_PROMPTS["summarizer_instruction"],
+        combiner_model: LLMClient | None = None,
+        combiner_prompt: str = DEFAULT_PROMPTS["combiner_prompt"],
+    ) -> list[str]:
+        """
+        Splits a text into the chunks that chunk_planner chooses for it, counting the prompts against each
+        model's context window. With content_defined_chunks, the planned chunk size is only the average the
+        chunks aim for, see TextProcessor.chunk_content_defined.
+
+        Args:
+            text (str): The text to split.
+            summarizer_model (LLMClient): The model that summarizes each chunk.
+            summarizer_prompt (str): The system prompt sent with each chunk and with the combine call.
+            summarizer_instruction (str): The instruction sent with each chunk.
+            combiner_model (Optional[LLMClient]): The model that combines the chunk summaries.
+            combiner_prompt (str): The instruction sent with the combine call.
+
+        Returns:
+            list[str]: The chunks, in order.
+        """
+        with tracing.span("plan_chunks", tracer=self.tracer) as span:
+            text_processor = TextProcessor(summarizer_model)
+            text_tokens = len(text_processor.tokenize_text(text))
+            prompt_tokens = len(text_processor.tokenize_text(f"{summarizer_prompt}{summarizer_instruction}\n"))
+            plan = self.chunk_planner.plan(
+                text_tokens,
+                summarizer_model,
+                prompt_tokens=prompt_tokens,
+                combine_prompt_tokens=len(text_processor.tokenize_text(f"{summarizer_prompt}{combiner_prompt}\n")),
+                combiner_model=combiner_model,
+                overlap=0 if self.content_defined_chunks else self.CHUNK_OVERLAP,
+            )
+            if self.content_defined_chunks and plan["chunks"] > 1:
+                max_size = self.chunk_planner.max_chunk_size(summarizer_model, prompt_tokens)
+                chunks = self._chunk_plan(text, summarizer_model, plan["chunk_size"], max_size=max_size)
+            else:
+                chunks = self._chunk_plan(text, summarizer_model, plan["chunk_size"])
+            span.set(text_tokens=text_tokens, chunks=len(chunks), chunk_size=plan["chunk_size"])
+        return chunks
+
+    def _chunk_plan(self, text: str, model: LLMClient, chunk_size: int, max_size: int | None = None) -> list[str]:
+        """
+        Splits the text into chunks for the model, reusing a stored plan for the same text and chunk settings.
+        Given max_size, the chunks are content-defined, aiming for chunk_size tokens and never exceeding max_size.
+        """
+        if max_size is not None:
+            # Snap the target to a coarse grid, steps of about 19%, so that a small edit, which nudges the
+            # planned size, usually leaves the boundaries where they were
+            chunk_size = int(2 ** (math.floor(4 * math.log2(chunk_size)) / 4))
+        key = None
+        if self.cache is not None:
+            settings = ("content", max_size) if max_size is not None else (self.CHUNK_OVERLAP,)
+            key = ResultCache.key("chunk_plan", model.model_name, chunk_size, *settings, text)
+            chunks = self.cache.get_json(key)
+            if chunks is not None:
+                return chunks
+
+        if max_size is not None:
+            chunks = TextProcessor(model).chunk_content_defined(text, target_tokens=chunk_size, max_tokens=max_size)
+        else:
+            chunks = TextProcessor(model).chunk_text(text=text, chunk_size=chunk_size, overlap=self.CHUNK_OVERLAP)
+        if key is not None:
+            self.cache.set_json(key, chunks)
+        return chunks
+
+    def quote_index(self) -> QuoteIndex:
+        """Returns the full-text index of the book, building and saving it next to the EPUB on first use."""
+        if self._quote_index is None:
+            self._quote_index = QuoteIndex.for_book(self.epub_path, chapters=self.chapters)
+        return self._quote_index
+
+    def quote_verifier(self) -> QuoteVerifier:
+        """Returns a QuoteVerifier over the book's chapters, for checking quotes in summaries against the source."""
+        if self._quote_verifier is None:
+            self._quote_verifier = QuoteVerifier(self.chapters)
+        return self._quote_verifier
+
+    def vector_index(self, embedder: EmbeddingBackend | None = None) -> VectorIndex:
+        """
+        Returns the embedding index of the book, building it next to the EPUB on first use.
+        Uses OpenAI embeddings unless another backend, such as HashingEmbedding for offline use, is given.
+        """
+        embedder = embedder or OpenAIEmbedding()
+        if self._vector_index is None or self._vector_index.embedder.model_name != embedder.model_name:
+            self._vector_index = VectorIndex.for_book(self.epub_path, embedder, chapters=self.chapters)
+        return self._vector_index
+
     def _deduce_worthiness(
         self,
         chapter_text: str,
@@ -52,7 +273,7 @@ class BookSummarizer:
         instruction: str = DEFAULT_PROMPTS["worthiness_instruction"],
     ) -> str:
         instruction_with_text = f"{instruction}\n{chapter_text[:characters]}"
-        worthiness_boolean = model.call(system_prompt, instruction_with_text)
+        worthiness_boolean = self._call_model(model, system_prompt, instruction_with_text)
         return find_boolean_in_string(worthiness_boolean)
 
     def _deduce_chapter_title(
@@ -74,26 +295,34 @@ class BookSummarizer:
             str: The deduced chapter title.
         """
         instruction_with_text = f"{instruction}\n{chapter_text[:characters]}"
-        chapter_title = model.call(system_prompt, instruction_with_text)
+        chapter_title = self._call_model(model, system_prompt, instruction_with_text)
         return chapter_title
 
-    def deduce_chapter_metadata(self, chapter: str, deduction_limit: int) -> dict:
-        title = self._deduce_chapter_title(chapter, deduction_limit)
-        worthiness = self._deduce_worthiness(chapter, deduction_limit)
+    def deduce_chapter_metadata(
+        self,
+        chapter: str,
+        deduction_limit: int,
+        title_model: LLMClient = GPT4O(),
+        worthiness_model: LLMClient = GPT4oMini(),
+    ) -> dict:
+        with tracing.span("metadata", tracer=self.tracer):
+            title = self._deduce_chapter_title(chapter, deduction_limit, model=title_model)
+            worthiness = self._deduce_worthiness(chapter, deduction_limit, model=worthiness_model)
         return {"title": title, "worthiness": worthiness, "chapter": chapter}
 
     def log_future_calls_to_wandb(self, project_name: str = "book-summarizer") -> None:
-        """will log future calls of summarize_text to wandb."""
-        weave.init(project_name)
-        self.log_to_wandb = True
+        """Logs the spans of future runs, from whole books down to single model calls, to a Weave project."""
+        if self.tracer is None:
+            self.tracer = Tracer()
+        self.tracer.add_exporter(WeaveExporter(project_name))
 
-    @conditional_wandb_log
     def summarize_text(
         self,
         text: str,
         model: LLMClient = GPT4oMini(),
         system_prompt: str = DEFAULT_PROMPTS["summarizer_prompt"],
         instruction: str = DEFAULT_PROMPTS["summarizer_instruction"],
+        on_token: Callable[[str], None] | None = None,
     ) -> str:
         """
         Summarizes the given text using the specified model. Does not handle chunking.
@@ -104,13 +333,14 @@ class BookSummarizer:
             system_prompt (Optional[str]): Custom system prompt for the model. If None, uses the default prompt.
             instruction (Optional[str]): Custom user instruction for the model. If None, uses the default prompt.
                 The text will be automatically appended to the instruction.
+            on_token (Optional[Callable[[str], None]]): If given, the response is streamed from the model
+                and each piece is passed to this callback as it arrives.
 
         Returns:
             str: The generated summary.
         """
         instruction_with_text = f"{instruction}\n{text}"
-        summary = model.call(system_prompt, instruction_with_text)
-        return summary
+        return self._call_model(model, system_prompt, instruction_with_text, on_token=on_token)
 
     def summarize_text_with_chunking(
         self,
@@ -120,50 +350,553 @@ class BookSummarizer:
         summarizer_instruction: str = DEFAULT_PROMPTS["summarizer_instruction"],
         combiner_model: LLMClient = GPT4O(),
         combiner_prompt: str = DEFAULT_PROMPTS["combiner_prompt"],
+        on_token: Callable[[str], None] | None = None,
+        cancelled: threading.Event | None = None,
     ) -> str:
         """
         Summarizes the given text by chunking it and then combining the chunk summaries.
-        By default, gpt-3.5-turbo is used for summarizing chunks and gpt-4o for combining summaries.
+        By default, gpt-4o-mini is used for summarizing chunks and gpt-4o for combining summaries.
+        The chunks are chosen by chunk_planner and summarized up to chunk_planner.concurrency at a time.
 
         Args:
             text (str): The text to be summarized.
             summarizer_model (Optional[LLMClient]): The model to use for summarizing chunks.
             combiner_model (Optional[LLMClient]): The model to use for combining summaries.
             combiner_prompt (Optional[str]): Custom prompt for combining summaries. If None, uses the default prompt.
+            on_token (Optional[Callable[[str], None]]): Streams the final call (the combine, or the only chunk)
+                to this callback as it is generated.
+            cancelled (Optional[threading.Event]): Once set, no further calls are started and the summaries
+                made so far are returned.
 
         Returns:
             str: The combined summary.
         """
-        chunk_size = summarizer_model.max_tokens - self.SUMMARY_SIZE
-
-        chunks = TextProcessor(summarizer_model).chunk_text(
-            text=text,
-            chunk_size=chunk_size,
-            overlap=self.CHUNK_OVERLAP,
+        chunks = self.plan_chunks(
+            text, summarizer_model, summarizer_prompt, summarizer_instruction, combiner_model, combiner_prompt
         )
 
-        appended_summaries = ""
-        for chunk in chunks:
-            appended_summaries += self.summarize_text(
-                text=chunk,
-                model=summarizer_model,
-                system_prompt=summarizer_prompt,
-                instruction=summarizer_instruction,
-            )
-            appended_summaries += "\n"
+        def summarize_chunk(index: int, chunk: str) -> str:
+            if cancelled is not None and cancelled.is_set():
+                return ""
+            with tracing.span("chunk", tracer=self.tracer, index=index):
+                return self.summarize_text(
+                    text=chunk,
+                    model=summarizer_model,
+                    system_prompt=summarizer_prompt,
+                    instruction=summarizer_instruction,
+                    on_token=on_token if len(chunks) == 1 else None,
+                )
 
+        chunk_summaries = self._map_chunks(summarize_chunk, chunks)
+        appended_summaries = "".join(f"{summary}\n" for summary in chunk_summaries)
+
+        if cancelled is not None and cancelled.is_set():
+            return appended_summaries
         if len(chunks) > 1:
-            combined_summary = self.summarize_text(
-                text=appended_summaries,
-                model=combiner_model,
-                system_prompt=summarizer_prompt,
-                instruction=combiner_prompt,
-            )
+            with tracing.span("combine", tracer=self.tracer, chunks=len(chunks)):
+                combined_summary = self.summarize_text(
+                    text=appended_summaries,
+                    model=combiner_model,
+                    system_prompt=summarizer_prompt,
+                    instruction=combiner_prompt,
+                    on_token=on_token,
+                )
         else:
             combined_summary = appended_summaries
 
         return combined_summary
 
+    def _map_chunks(self, function: Callable[[int, str], Any], chunks: list[str]) -> list:
+        """Calls function(index, chunk) on every chunk, up to chunk_planner.concurrency at a time, in chunk order."""
+        if len(chunks) == 1:
+            return [function(0, chunks[0])]
+        # Chunks are processed side by side; each task gets its own copy of the context for the deadline
+        with ThreadPoolExecutor(max_workers=min(len(chunks), self.chunk_planner.concurrency)) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, function, index, chunk)
+                for index, chunk in enumerate(chunks)
+            ]
+            return [future.result() for future in futures]
+
+    def analyze_text_with_chunking(
+        self,
+        text: str,
+        summarizer_model: LLMClient = GPT4oMini(),
+        summarizer_prompt: str = DEFAULT_PROMPTS["summarizer_prompt"],
+        summarizer_instruction: str = DEFAULT_PROMPTS["summarizer_instruction"],
+        combiner_model: LLMClient = GPT4O(),
+        combiner_prompt: str = DEFAULT_PROMPTS["combiner_prompt"],
+        on_token: Callable[[str], None] | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> dict:
+        """
+        Reads the text once, in chunks, and gets its summary, quotes and facts from the same call per chunk.
+        The chunk summaries are combined with the combiner model as in summarize_text_with_chunking; the quotes
+        and facts are merged locally, without another call.
+
+        Args:
+            text (str): The text to be analyzed.
+            summarizer_model (Optional[LLMClient]): The model that analyzes each chunk.
+            summarizer_prompt (Optional[str]): The system prompt for combining the chunk summaries.
+            summarizer_instruction (Optional[str]): What the summary of each chunk should hold.
+            combiner_model (Optional[LLMClient]): The model to use for combining summaries.
+            combiner_prompt (Optional[str]): Custom prompt for combining summaries.
+            on_token (Optional[Callable[[str], None]]): Streams the combine call. A text that fits in one chunk
+                is not streamed, since its response is JSON.
+            cancelled (Optional[threading.Event]): Once set, no further calls are started.
+
+        Returns:
+            dict: {"summary": str, "quotes": list[str], "facts": list[str]}. Quotes are as the model gave them;
+                chunks whose response is not JSON contribute their whole response to the summary and nothing else.
+        """
+        analysis_prompt = DEFAULT_PROMPTS["analysis_prompt"]
+        instruction = f"{DEFAULT_PROMPTS['analysis_instruction']}\nFor the summary: {summarizer_instruction}"
+        chunks = self.plan_chunks(text, summarizer_model, analysis_prompt, instruction, combiner_model, combiner_prompt)
+
+        def analyze_chunk(index: int, chunk: str) -> dict:
+            if cancelled is not None and cancelled.is_set():
+                return {"summary": [], "quotes": [], "facts": []}
+            with tracing.span("chunk", tracer=self.tracer, index=index, analysis=True):
+                response = self.summarize_text(
+                    text=chunk, model=summarizer_model, system_prompt=analysis_prompt, instruction=instruction
+                )
+            analysis = None if is_error_response(response) else parse_analysis_response(response)
+            return analysis or {"summary": [response], "quotes": [], "facts": []}
+
+        merged = merge_analyses(self._map_chunks(analyze_chunk, chunks))
+        summary = format_points(merged["summary"])
+        if len(chunks) > 1 and not (cancelled is not None and cancelled.is_set()):
+            with tracing.span("combine", tracer=self.tracer, chunks=len(chunks)):
+                summary = self.summarize_text(
+                    text=summary,
+                    model=combiner_model,
+                    system_prompt=summarizer_prompt,
+                    instruction=combiner_prompt,
+                    on_token=on_token,
+                )
+        return {"summary": summary, "quotes": merged["quotes"], "facts": merged["facts"]}
+
+    def _summarize_chapter(
+        self,
+        index: int,
+        chapter: str,
+        title_model: LLMClient,
+        worthiness_model: LLMClient,
+        on_token: Callable[[str], None] | None = None,
+        verify_quotes: bool = False,
+        deadline: Deadline | None = None,
+        speculate: bool = False,
+        analyze: bool = False,
+        escalation_model: LLMClient | None = None,
+        **summary_options,
+    ) -> dict:
+        """
+        Runs one chapter through metadata deduction and, if it is worthy, chunked summarization.
+        With a compressor, the result also holds the chapter's token "compression" statistics.
+        With analyze, the chapter is read with analyze_text_with_chunking and the result also holds its
+        "quotes", each located in the chapter by the quote verifier, and its "facts".
+        With an escalation_model, the summary is checked by summary_checker and, if it fails, made again with
+        the escalation model for both chunks and combine. The result then also holds "cascade", which records
+        the failed checks and whether the chapter was escalated. Streamed tokens are held until the check passes.
+        With a duplicate_index, a chapter that nearly matches one summarized with the same settings reuses its
+        title, worthiness and summary without any model calls, and the result also holds "reused", which records
+        where the match came from and how similar it is. Quotes are still located in this book's chapter.
+        Other chapters are added to the index unless they failed or ran out of time.
+        """
+        summarize = self.analyze_text_with_chunking if analyze else self.summarize_text_with_chunking
+        gate = TokenGate(on_token) if escalation_model and on_token else None
+        with tracing.span("chapter", tracer=self.tracer, index=index, characters=len(chapter)) as span:
+            duplicate, signature, settings = None, None, None
+            if self.duplicate_index is not None:
+                signature = self.duplicate_index.hasher.signature(chapter)
+                settings = self._duplicate_settings(
+                    title_model, worthiness_model, analyze, escalation_model, summary_options
+                )
+                duplicate = self.duplicate_index.find(signature, settings) if signature is not None else None
+            if duplicate:
+                meta, summary = duplicate["result"], duplicate["result"]["summary"]
+                cascade = None
+                span.set(reused=duplicate["source"])
+                if on_token and summary is not None:
+                    on_token(summary["summary"] if analyze else summary)
+            else:
+                with tracing.span("compress", tracer=self.tracer) if self.compressor else nullcontext():
+                    text = self.compressor.compress(chapter) if self.compressor else chapter
+                # Worker threads do not inherit the caller's context, so the deadline is entered here
+                with deadline.scope() if deadline else nullcontext():
+                    if speculate and len(chapter) >= self.SPECULATION_MIN_CHARS:
+                        meta, summary = self._summarize_speculatively(
+                            chapter,
+                            title_model,
+                            worthiness_model,
+                            gate or on_token,
+                            text=text,
+                            analyze=analyze,
+                            **summary_options,
+                        )
+                    else:
+                        meta = self.deduce_chapter_metadata(chapter, 500, title_model, worthiness_model)
+                        summary = None
+                        if meta["worthiness"]:
+                            summary = summarize(text, on_token=gate or on_token, **summary_options)
+                    cascade = None
+                    if escalation_model and summary is not None:
+                        failures = self.summary_checker.check(
+                            summary["summary"] if analyze else summary, chapter, self.quote_verifier(), index
+                        )
+                        cascade = {"escalated": bool(failures), "failures": failures}
+                        if failures:
+                            if gate:
+                                gate.discard()
+                            strong = {"summarizer_model": escalation_model, "combiner_model": escalation_model}
+                            with tracing.span("escalate", tracer=self.tracer, failures=",".join(failures)):
+                                summary = summarize(text, on_token=on_token, **{**summary_options, **strong})
+                        elif gate:
+                            gate.open()
+                failed = is_error_response(meta["title"]) or (
+                    summary is not None and is_error_response(summary["summary"] if analyze else summary)
+                )
+                if signature is not None and not failed and not (deadline and deadline.expired()):
+                    stored = {"title": meta["title"], "worthiness": meta["worthiness"], "summary": summary}
+                    self.duplicate_index.add(signature, settings, f"{self.epub_path}#{index}", stored)
+            outputs = {"quotes": [], "facts": []}
+            if analyze and summary is not None:
+                quotes = [self.quote_verifier().verify_quote(quote, chapter=index) for quote in summary["quotes"]]
+                outputs = {"quotes": quotes, "facts": summary["facts"]}
+                summary = summary["summary"]
+            if summary is None:
+                summary = self.NOT_WORTHY_SUMMARY
+            elif verify_quotes:
+                summary = self.quote_verifier().annotate(summary, chapter=index)
+            span.set(worthiness=meta["worthiness"])
+        result = {"index": index, "title": meta["title"], "worthiness": meta["worthiness"], "summary": summary}
+        if analyze:
+            result.update(outputs)
+        if cascade is not None:
+            result["cascade"] = cascade
+        if duplicate:
+            result["reused"] = {"source": duplicate["source"], "similarity": duplicate["similarity"]}
+        elif self.compressor:
+            result["compression"] = self.compression_stats(
+                chapter, text, summary_options.get("summarizer_model", GPT4oMini())
+            )
+        return result
+
+    def _duplicate_settings(
+        self,
+        title_model: LLMClient,
+        worthiness_model: LLMClient,
+        analyze: bool,
+        escalation_model: LLMClient | None,
+        summary_options: dict,
+    ) -> str:
+        """A key for everything besides the chapter text that a chapter result depends on, see duplicate_index."""
+        options = sorted((name, getattr(value, "model_name", value)) for name, value in summary_options.items())
+        return ResultCache.key(
+            "chapter",
+            title_model.model_name,
+            worthiness_model.model_name,
+            analyze,
+            escalation_model.model_name if escalation_model else None,
+            vars(self.summary_checker) if escalation_model else None,
+            vars(self.compressor) if self.compressor else None,
+            self.content_defined_chunks,
+            *options,
+        )
+
+    @staticmethod
+    def compression_stats(original: str, compressed: str, model: LLMClient) -> dict:
+        """
+        Counts the input tokens that compression saved on one text.
+
+        Args:
+            original (str): The text before compression.
+            compressed (str): The text that was sent to the model.
+            model (LLMClient): The model whose tokenizer counts the tokens.
+
+        Returns:
+            dict: {"original_tokens": int, "compressed_tokens": int, "saved": float}, where saved is the
+                fraction of tokens removed.
+        """
+        text_processor = TextProcessor(model)
+        original_tokens = len(text_processor.tokenize_text(original))
+        compressed_tokens = original_tokens if compressed is original else len(text_processor.tokenize_text(compressed))
+        return {
+            "original_tokens": original_tokens,
+            "compressed_tokens": compressed_tokens,
+            "saved": 1 - compressed_tokens / original_tokens if original_tokens else 0.0,
+        }
+
+    def _summarize_speculatively(
+        self,
+        chapter: str,
+        title_model: LLMClient,
+        worthiness_model: LLMClient,
+        on_token: Callable[[str], None] | None = None,
+        text: str | None = None,
+        analyze: bool = False,
+        **summary_options,
+    ) -> tuple[dict, str | dict | None]:
+        """
+        Starts summarizing the chapter while its worthiness is still being decided, and stops the summary
+        before its next call if the chapter turns out not to be worth summarizing. Streamed tokens are held
+        until the verdict is in. Returns the metadata and the summary, which is None for an unworthy chapter
+        and the analyze_text_with_chunking result with analyze.
+        """
+        cancelled = threading.Event()
+        gate = TokenGate(on_token) if on_token else None
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            summary = executor.submit(
+                context.run,
+                self.analyze_text_with_chunking if analyze else self.summarize_text_with_chunking,
+                chapter if text is None else text,
+                on_token=gate,
+                cancelled=cancelled,
+                **summary_options,
+            )
+            # Worthiness first, so that an unworthy chapter is cancelled as early as possible
+            worthiness = self._deduce_worthiness(chapter, 500, model=worthiness_model)
+            if not worthiness:
+                cancelled.set()
+                if gate:
+                    gate.discard()
+            elif gate:
+                gate.open()
+            title = self._deduce_chapter_title(chapter, 500, model=title_model)
+            summary_text = summary.result()
+        return {"title": title, "worthiness": worthiness}, summary_text if worthiness else None
+
+    def _short_sections(self, model: LLMClient) -> dict[int, int]:
+        """The token counts of the sections small enough to be packed together."""
+        text_processor = TextProcessor(model)
+        token_counts = {}
+        for index, chapter in enumerate(self.chapters):
+            # Skip tokenizing sections that are clearly too long; a token is rarely more than 8 characters
+            if len(chapter) > self.PACKING_MAX_SECTION_TOKENS * 8:
+                continue
+            tokens = len(text_processor.tokenize_text(chapter))
+            if tokens <= self.PACKING_MAX_SECTION_TOKENS:
+                token_counts[index] = tokens
+        return token_counts
+
+    def _summarize_packed(
+        self,
+        indices: list[int],
+        title_model: LLMClient,
+        worthiness_model: LLMClient,
+        verify_quotes: bool = False,
+        deadline: Deadline | None = None,
+        escalation_model: LLMClient | None = None,
+        **summary_options,
+    ) -> list[dict]:
+        """
+        Deduces the title and worthiness of several short sections, and summarizes them, in one call.
+        Sections the response leaves out or gets malformed are run on their own with _summarize_chapter.
+        Packed sections are too short to need a cascade; escalation_model only applies to those run on their own.
+        """
+        model = summary_options.get("summarizer_model", GPT4oMini())
+        summarizer_instruction = summary_options.get(
+            "summarizer_instruction", DEFAULT_PROMPTS["summarizer_instruction"]
+        )
+        instruction = (
+            f"{DEFAULT_PROMPTS['packed_instruction']}\n"
+            f"For each section worth summarizing: {summarizer_instruction}\n\n"
+            f"{format_packed_sections({index: self.chapters[index] for index in indices})}"
+        )
+        with tracing.span("packed", tracer=self.tracer, sections=len(indices)):
+            with deadline.scope() if deadline else nullcontext():
+                response = self._call_model(model, DEFAULT_PROMPTS["packed_prompt"], instruction)
+        parsed = {} if is_error_response(response) else parse_packed_response(response, indices)
+
+        results = []
+        for index in indices:
+            if index not in parsed:
+                results.append(
+                    self._summarize_chapter(
+                        index,
+                        self.chapters[index],
+                        title_model,
+                        worthiness_model,
+                        verify_quotes=verify_quotes,
+                        deadline=deadline,
+                        escalation_model=escalation_model,
+                        **summary_options,
+                    )
+                )
+                continue
+            meta = parsed[index]
+            summary = meta["summary"] if meta["worthiness"] else self.NOT_WORTHY_SUMMARY
+            if meta["worthiness"] and verify_quotes:
+                summary = self.quote_verifier().annotate(summary, chapter=index)
+            results.append(
+                {"index": index, "title": meta["title"], "worthiness": meta["worthiness"], "summary": summary}
+            )
+        return results
+
+    def iter_book_summaries(
+        self,
+        summarizer_model: LLMClient = GPT4oMini(),
+        summarizer_prompt: str = DEFAULT_PROMPTS["summarizer_prompt"],
+        summarizer_instruction: str = DEFAULT_PROMPTS["summarizer_instruction"],
+        combiner_model: LLMClient = GPT4O(),
+        combiner_prompt: str = DEFAULT_PROMPTS["combiner_prompt"],
+        title_model: LLMClient = GPT4O(),
+        worthiness_model: LLMClient = GPT4oMini(),
+        on_token: Callable[[int, str], None] | None = None,
+        verify_quotes: bool = False,
+        time_budget: float | None = None,
+        hedge_metadata: bool = False,
+        speculate: bool = False,
+        pack_sections: bool = False,
+        analyze: bool = False,
+        escalation_model: LLMClient | None = None,
+    ) -> Iterator[dict]:
+        """
+        Summarizes every chapter in parallel and yields the results in chapter order as soon as they are ready.
+        Each chapter goes through metadata deduction and summarization on its own, so the first chapter
+        is yielded after roughly one chapter's latency rather than after the whole book.
+
+        Args:
+            summarizer_model (LLMClient): The model to use for summarization.
+            summarizer_prompt (Optional[str]): Custom system prompt for the summarizer model.
+            summarizer_instruction (Optional[str]): Custom user instruction for the summarizer model.
+            combiner_model (LLMClient): The model to use for combining summaries.
+            combiner_prompt (Optional[str]): Custom prompt for the combiner model.
+            title_model (LLMClient): The model used to deduce chapter titles.
+            worthiness_model (LLMClient): The model used to decide whether a chapter is worth summarizing.
+            on_token (Optional[Callable[[int, str], None]]): Receives (chapter index, text) as the summary of the
+                chapter currently being read, i.e. the next one due to be yielded, streams from the model.
+            verify_quotes (bool): If True, each quote in a summary is checked against the chapter text and
+                annotated with where it was found and how closely it matched.
+            time_budget (Optional[float]): Seconds the whole book may take. Each call's timeout is cut to the
+                time left, and calls that would start after the budget is spent return an error instead.
+            hedge_metadata (bool): If True, title and worthiness calls that run slower than usual are sent a
+                second time and the first response is used, see HedgedClient.
+            speculate (bool): If True, chapters longer than SPECULATION_MIN_CHARS start summarizing while their
+                worthiness is still being decided, and stop if they turn out not to be worth summarizing. This
+                takes the worthiness call off the critical path of long chapters, at the cost of the calls
+                already made for long unworthy sections such as an index.
+            pack_sections (bool): If True, sections of up to PACKING_MAX_SECTION_TOKENS tokens, such as epigraphs
+                and part dividers, are grouped into shared requests to the summarizer model that return the title,
+                worthiness and summary of each section as JSON. Sections missing from the response are run on
+                their own. Packed sections are not streamed to on_token.
+            analyze (bool): If True, each chunk is asked for its summary points, verbatim quotes and facts in one
+                call, see analyze_text_with_chunking, so all three come from a single read of the book. Each result
+                then also holds "quotes", the QuoteVerifier.verify_quote result for each quote, which anchors it to
+                its offsets in the chapter, and "facts", a list of strings. pack_sections is ignored, since the
+                packed response has no room for quotes and facts.
+            escalation_model (Optional[LLMClient]): If given, the book is summarized as a cascade. Every chapter is
+                summarized, chunks and combine, with summarizer_model, and combiner_model is not used. Each summary
+                is then checked locally by summary_checker, for length, list structure and invented quotes, and
+                only the chapters that fail are summarized again with the escalation model. Each result then holds
+                "cascade": {"escalated": bool, "failures": list[str]}.
+
+        Yields:
+            dict: {"index": int, "title": str, "worthiness": bool, "summary": str} for each chapter, in order.
+        """
+        # A generator shares its context with whoever iterates it, so the book span is not entered here.
+        # The extraction and every task run under it in a copy of the context instead.
+        book = tracing.span("book", tracer=self.tracer, epub_path=self.epub_path)
+        chapters = book.context().run(lambda: self.chapters)
+        if verify_quotes or analyze or escalation_model:
+            self.quote_verifier()  # build the verifier once, before the workers need it
+        deadline = Deadline(time_budget) if time_budget is not None else None
+        hedged = []
+        if hedge_metadata:
+            title_model = HedgedClient(title_model, max_workers=self.MAX_WORKERS)
+            worthiness_model = HedgedClient(worthiness_model, max_workers=self.MAX_WORKERS)
+            hedged = [title_model, worthiness_model]
+        summary_options = {
+            "summarizer_model": summarizer_model,
+            "summarizer_prompt": summarizer_prompt,
+            "summarizer_instruction": summarizer_instruction,
+            "combiner_model": combiner_model,
+            "combiner_prompt": combiner_prompt,
+        }
+        if escalation_model:
+            summary_options["combiner_model"] = summarizer_model
+        bins = []
+        if pack_sections and not analyze:
+            short_sections = self._short_sections(summarizer_model)
+            # A section alone in its bin gains nothing from packing
+            bins = [
+                indices
+                for indices in bin_sections(short_sections, self.PACKING_BUDGET, self.PACKING_MAX_SECTIONS)
+                if len(indices) > 1
+            ]
+        packed = {index for indices in bins for index in indices}
+
+        buffer = OrderedCompletionBuffer()
+        tasks = [
+            delayed(book.context().run)(
+                self._summarize_packed,
+                indices,
+                title_model,
+                worthiness_model,
+                verify_quotes=verify_quotes,
+                deadline=deadline,
+                escalation_model=escalation_model,
+                **summary_options,
+            )
+            for indices in bins
+        ]
+        # A generator, so that each chapter is only read once a worker is ready for it
+        chapter_tasks = (
+            delayed(book.context().run)(
+                self._summarize_chapter,
+                index,
+                chapter,
+                title_model,
+                worthiness_model,
+                on_token=HeadOfLineTokenRelay(index, buffer, on_token) if on_token else None,
+                verify_quotes=verify_quotes,
+                deadline=deadline,
+                speculate=speculate,
+                analyze=analyze,
+                escalation_model=escalation_model,
+                **summary_options,
+            )
+            for index, chapter in enumerate(chapters)
+            if index not in packed
+        )
+        results = Parallel(n_jobs=self.MAX_WORKERS, prefer="threads", return_as="generator_unordered")(
+            itertools.chain(tasks, chapter_tasks)
+        )
+        try:
+            for result in results:
+                # Packed tasks return the results of several sections
+                for section in result if isinstance(result, list) else [result]:
+                    yield from buffer.add(section["index"], section)
+        finally:
+            for client in hedged:
+                client.close()
+            book.set(chapters=len(chapters))
+            book.end()
+
+    @staticmethod
+    def write_chapter(file: TextIO, result: dict) -> None:
+        """
+        Writes one chapter result in the summary file format that load_summaries reads back.
+        The chapter's index goes in a comment before its heading, which Markdown viewers do not show.
+        """
+        file.write(f"<!-- chapter {result['index']} -->\n## {result['title']}\n")
+        file.write(result["summary"])
+        file.write("\n\n")
+
+    @staticmethod
+    def write_analysis(file: TextIO, result: dict, output: str) -> None:
+        """
+        Writes the "quotes" or "facts" of one analyzed chapter result under its title, as a list.
+        Each quote is followed by a note saying where it was found in the chapter. Chapters without any are skipped.
+        """
+        if not result.get(output):
+            return
+        file.write(f"## {result['title']}\n")
+        for item in result[output]:
+            file.write(f"- “{item['quote']}”{describe_match(item)}\n" if output == "quotes" else f"- {item}\n")
+        file.write("\n")
+
     def summarize_book(
         self,
         output_filename: str | None = None,
@@ -172,50 +905,168 @@ class BookSummarizer:
         summarizer_instruction: str = DEFAULT_PROMPTS["summarizer_instruction"],
         combiner_model: LLMClient = GPT4O(),
         combiner_prompt: str = DEFAULT_PROMPTS["combiner_prompt"],
+        title_model: LLMClient = GPT4O(),
+        worthiness_model: LLMClient = GPT4oMini(),
+        on_chapter: Callable[[dict], None] | None = None,
+        on_token: Callable[[int, str], None] | None = None,
+        verify_quotes: bool = False,
+        time_budget: float | None = None,
+        hedge_metadata: bool = False,
+        speculate: bool = False,
+        pack_sections: bool = False,
+        analyze: bool = False,
+        escalation_model: LLMClient | None = None,
     ) -> None:
         """
         Summarizes the entire book and saves the summary to a file.
+        Chapters are written and flushed in order as they complete, so the file fills in while the book
+        is still being processed and a late failure keeps everything written so far.
 
         Args:
             output_filename (Optional[str]): The filename to save the book summary.
+                Defaults to the EPUB path with a _summary.md suffix.
             summarizer_model (LLMClient): The model to use for summarization.
             summarizer_prompt (Optional[str]): Custom system prompt for the summarizer model.
             summarizer_instruction (Optional[str]): Custom user instruction for the summarizer model.
             combiner_model (LLMClient): The model to use for combining summaries.
             combiner_prompt (Optional[str]): Custom prompt for the combiner model.
+            title_model (LLMClient): The model used to deduce chapter titles.
+            worthiness_model (LLMClient): The model used to decide whether a chapter is worth summarizing.
+            on_chapter (Optional[Callable[[dict], None]]): Called with each chapter result after it is written.
+            on_token (Optional[Callable[[int, str], None]]): Streams the chapter currently being read,
+                see iter_book_summaries.
+            verify_quotes (bool): Annotate each quote in the summaries with its location in the source text.
+            time_budget (Optional[float]): Seconds the whole book may take, see iter_book_summaries.
+            hedge_metadata (bool): Hedge slow title and worthiness calls, see iter_book_summaries.
+            speculate (bool): Summarize long chapters while their worthiness is decided, see iter_book_summaries.
+            pack_sections (bool): Handle short sections several to a request, see iter_book_summaries.
+            analyze (bool): Also collect each chapter's quotes and facts in the same calls as its summary, see
+                iter_book_summaries. They are written next to the summary, to files with _quotes.md and
+                _facts.md suffixes.
+            escalation_model (Optional[LLMClient]): Summarize with summarizer_model alone and redo only the chapters
+                whose summaries fail summary_checker with this model, see iter_book_summaries.
         """
-        chapter_metadata = Parallel(n_jobs=-1)(
-            delayed(self.deduce_chapter_metadata)(chapter, 500) for chapter in self.chapters
+        output_filename = output_filename or self._default_save_path()
+        output_paths = {"summary": output_filename}
+        if analyze:
+            base = os.path.splitext(output_filename)[0]
+            output_paths.update(quotes=f"{base}_quotes.md", facts=f"{base}_facts.md")
+        chapter_results = self.iter_book_summaries(
+            summarizer_model,
+            summarizer_prompt,
+            summarizer_instruction,
+            combiner_model,
+            combiner_prompt,
+            title_model,
+            worthiness_model,
+            on_token=on_token,
+            verify_quotes=verify_quotes,
+            time_budget=time_budget,
+            hedge_metadata=hedge_metadata,
+            speculate=speculate,
+            pack_sections=pack_sections,
+            analyze=analyze,
+            escalation_model=escalation_model,
         )
 
-        # Filter chapters based on worthiness
-        worthy_chapters = [
-            (index, meta["chapter"]) for index, meta in enumerate(chapter_metadata) if meta["worthiness"]
-        ]
+        with ExitStack() as stack:
+            files = {output: stack.enter_context(open(path, "w")) for output, path in output_paths.items()}
+            for result in chapter_results:
+                self.write_chapter(files["summary"], result)
+                for output in ("quotes", "facts"):
+                    if output in files:
+                        self.write_analysis(files[output], result, output)
+                for file in files.values():
+                    file.flush()
+                if on_chapter:
+                    on_chapter(result)
+        print(f"Book summary saved to {output_filename}")
 
-        # Parallelize the summarization process
-        summarized_results = Parallel(n_jobs=-1)(
-            delayed(self.summarize_text_with_chunking)(
-                chapter,
-                summarizer_model,
-                summarizer_prompt,
-                summarizer_instruction,
-                combiner_model,
-                combiner_prompt,
-            )
-            for _, chapter in worthy_chapters
-        )
+    def submit_book(self, queue: "JobQueue", output_filename: str | None = None, priority: int = 0, **options) -> int:
+        """
+        Adds this book to a JobQueue for workers to summarize. Nothing is read or summarized in this process.
 
-        # Mapping summaries back to the chapter indices
-        summary_dict = {index: summary for (index, _), summary in zip(worthy_chapters, summarized_results)}
+        Args:
+            queue (JobQueue): The queue the workers are pulling from.
+            output_filename (Optional[str]): Where the workers write the summary. Defaults to the EPUB path
+                with a _summary.md suffix.
+            priority (int): Books with a higher priority are worked on first.
+            **options: Prompts for this book: summarizer_prompt, summarizer_instruction, combiner_prompt or
+                verify_quotes. The models are chosen by the workers.
 
-        with open(output_filename, "w") as file:
-            for index, meta in enumerate(chapter_metadata):
-                file.write(f"## {meta['title']}\n")
-                summary = summary_dict.get(index, "Evaluated as not worth summarizing.")
-                file.write(summary)
-                file.write("\n\n")
-        print(f"Book summary saved to {output_filename}")
+        Returns:
+            int: The job id.
+        """
+        return queue.submit(self.epub_path, output_filename or self._default_save_path(), priority, options)
+
+    def summarize_book_with_workers(
+        self,
+        queue: "JobQueue",
+        output_filename: str | None = None,
+        priority: int = 0,
+        timeout: float | None = None,
+        poll_interval: float = 2.0,
+        **options,
+    ) -> dict:
+        """
+        Submits this book to a JobQueue and waits for the workers to finish it, using BookSummarizer as a thin client.
+
+        Args:
+            queue (JobQueue): The queue the workers are pulling from.
+            output_filename (Optional[str]): Where the workers write the summary.
+            priority (int): Books with a higher priority are worked on first.
+            timeout (Optional[float]): Give up waiting after this many seconds. The job carries on regardless.
+            poll_interval (float): Seconds between checks on the job.
+            **options: Prompts for this book, see submit_book.
+
+        Returns:
+            dict: The finished job, including its "output_path".
+
+        Raises:
+            RuntimeError: If the workers could not summarize the book.
+            TimeoutError: If the job did not finish within the timeout.
+        """
+        job_id = self.submit_book(queue, output_filename, priority, **options)
+        job = queue.wait(job_id, poll_interval=poll_interval, timeout=timeout)
+        if job["status"] == "failed":
+            raise RuntimeError(f"Summarizing {self.epub_path} failed: {job['error']}")
+        print(f"Book summary saved to {job['output_path']}")
+        return job
+
+    def summarize_book_with_daemon(
+        self,
+        daemon: "DaemonClient",
+        output_filename: str | None = None,
+        timeout: float | None = None,
+        poll_interval: float = 0.2,
+        **options,
+    ) -> dict:
+        """
+        Hands this book to a running SummarizationDaemon and waits for it, using BookSummarizer as a thin client.
+        The daemon already has its models, encodings, cache and any recently summarized books loaded.
+
+        Args:
+            daemon (DaemonClient): A client for the daemon, which must be able to read the EPUB path.
+            output_filename (Optional[str]): Where the daemon writes the summary. Defaults to the EPUB path
+                with a _summary.md suffix.
+            timeout (Optional[float]): Give up waiting after this many seconds. The job carries on regardless.
+            poll_interval (float): Seconds between checks on the job.
+            **options: Any of summarizer_prompt, summarizer_instruction, combiner_prompt, verify_quotes, speculate,
+                pack_sections, analyze or time_budget. The models are chosen by the daemon.
+
+        Returns:
+            dict: The finished job, including its "output_path".
+
+        Raises:
+            RuntimeError: If the daemon refused the job or could not summarize the book.
+            TimeoutError: If the job did not finish within the timeout.
+        """
+        job_id = daemon.submit(self.epub_path, output_filename or self._default_save_path(), **options)
+        job = daemon.wait(job_id, poll_interval=poll_interval, timeout=timeout)
+        if job["status"] == "failed":
+            raise RuntimeError(f"Summarizing {self.epub_path} failed: {job['error']}")
+        print(f"Book summary saved to {job['output_path']}")
+        return job
 
 
 # Example usage
@@ -0,0 +1,85 @@
+import re
+
+from book_summarizer.llm_core import is_error_response
+from book_summarizer.quote_verifier import QuoteVerifier
+
+LIST_ITEM = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+\S", re.MULTILINE)
+
+
+class SummaryChecker:
+    """
+    Checks a chapter summary for the usual signs of a weak one, locally and without any model calls.
+
+    Used by the model cascade: every chapter is summarized with the cheap model first, and only chapters
+    whose summary fails a check are summarized again with the stronger model. The checks are:
+
+    - "error": the summary is an error response.
+    - "too_short": fewer than `min_words` words, which for a chapter worth summarizing means the model gave up
+      or refused. Very short chapters only need a tenth of their own length.
+    - "too_long": more than `max_length_ratio` of the chapter's length, and more than `min_words`, which means
+      the model copied the text rather than summarizing it.
+    - "no_list": fewer than `min_points` list items, when the instructions ask for a list of key points.
+    - "invented_quotes": more than `max_invented_quotes` quotes that cannot be found in the chapter.
+
+    Attributes
+    ----------
+    min_words : int
+        The shortest acceptable summary, in words.
+    max_length_ratio : float
+        The longest acceptable summary, as a fraction of the chapter's words.
+    min_points : int
+        The fewest list items, or 0 to accept prose.
+    max_invented_quotes : int
+        How many quotes may be missing from the chapter.
+    """
+
+    def __init__(
+        self,
+        min_words: int = 40,
+        max_length_ratio: float = 0.5,
+        min_points: int = 2,
+        max_invented_quotes: int = 0,
+    ):
+        self.min_words = min_words
+        self.max_length_ratio = max_length_ratio
+        self.min_points = min_points
+        self.max_invented_quotes = max_invented_quotes
+
+    def check(
+        self, summary: str, chapter: str, verifier: QuoteVerifier | None = None, chapter_index: int | None = None
+    ) -> list[str]:
+        """
+        Runs every check on one summary.
+
+        Parameters
+        ----------
+        summary : str
+            The summary to check.
+        chapter : str
+            The text it summarizes.
+        verifier : QuoteVerifier, optional
+            Checks the quotes in the summary against the book. Quotes are not checked without one.
+        chapter_index : int, optional
+            Where the chapter is in the verifier's book, so that quotes are only looked for there.
+
+        Returns
+        -------
+        list of str
+            The names of the failed checks, empty if the summary passed.
+        """
+        if is_error_response(summary):
+            return ["error"]
+        failures = []
+        summary_words = len(summary.split())
+        chapter_words = len(chapter.split())
+        if summary_words < min(self.min_words, chapter_words // 10):
+            failures.append("too_short")
+        if summary_words > max(self.min_words, self.max_length_ratio * chapter_words):
+            failures.append("too_long")
+        if len(LIST_ITEM.findall(summary)) < self.min_points:
+            failures.append("no_list")
+        if verifier is not None:
+            quotes = verifier.verify(summary, chapter=chapter_index)
+            if sum(quote["status"] == "not_found" for quote in quotes) > self.max_invented_quotes:
+                failures.append("invented_quotes")
+        return failures
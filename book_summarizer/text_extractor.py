@@ -0,0 +1,172 @@
+import mmap
+import os
+import re
+from collections.abc import Iterator, Sequence
+from functools import cached_property
+
+NUMBER_WORDS = (
+    rb"(?:(?:Twenty|Thirty|Forty|Fifty|Sixty|Seventy|Eighty|Ninety)(?:-(?:One|Two|Three|Four|Five|Six|Seven|Eight|Nine))?"
+    rb"|One|Two|Three|Four|Five|Six|Seven|Eight|Nine|Ten|Eleven|Twelve"
+    rb"|Thirteen|Fourteen|Fifteen|Sixteen|Seventeen|Eighteen|Nineteen|Hundred)"
+)
+# Markdown headings of the first two levels, and plain-text headings such as "CHAPTER XII", "Part Two" or
+# "Chapter 3: The Pit". The number may only be followed by a short title after a separator, or by one in capitals,
+# so that prose lines such as "Part Two of the plan was..." or "Book Club meets..." do not start chapters.
+HEADING_PATTERN = (
+    rb"^[ \t]*(?:#{1,2}[ \t]+\S[^\r\n]*"
+    rb"|(?:CHAPTER|Chapter|BOOK|Book|PART|Part)[ \t]+(?:\d+|[IVXLCDM]+|(?i:" + NUMBER_WORDS + rb"))\b"
+    rb"(?:[ \t]*(?:[.:-]|\xe2\x80\x93|\xe2\x80\x94)[^\r\n]{0,80}|[ \t]+[^a-z\r\n]{1,80})?[ \t]*)\r?$"
+)
+NOT_BLANK = re.compile(rb"\S")
+
+
+class TextChapters(Sequence):
+    """
+    The chapters of a TextExtractor, decoded from the mapped file only when one is indexed or iterated.
+
+    Behaves like the list of str EpubExtractor.chapters returns, without ever holding more than the
+    chapters a caller keeps references to.
+    """
+
+    def __init__(self, extractor: "TextExtractor"):
+        self.extractor = extractor
+
+    def __len__(self) -> int:
+        return len(self.extractor.spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        start, end = self.extractor.spans[range(len(self))[index]]
+        return self.extractor.read(start, end)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.extractor.iter_chapters()
+
+
+class TextExtractor:
+    """
+    Splits plain-text and Markdown files into chapters without reading the whole file into memory.
+
+    The file is memory-mapped and chapter headings are found with a regular expression scan over the mapped
+    bytes, so only the byte offsets of each chapter are kept. A chapter's text is decoded when it is used,
+    and the operating system pages the file in and out as needed, so files larger than the available memory
+    can be summarized. Text before the first heading, such as a preface, is a chapter of its own. Chapters
+    longer than `max_chapter_bytes`, including whole files without any headings such as transcripts, are
+    split into parts at the last paragraph break before the limit.
+
+    Attributes
+    ----------
+    text_file_path : str
+        The file path to the text file.
+    chapters : TextChapters
+        The chapters, a sequence of str that is decoded lazily.
+    spans : list of tuple of int
+        The (start, end) byte offsets of each chapter in the file.
+    """
+
+    EXTENSIONS = (".txt", ".text", ".md", ".markdown")
+    MAX_CHAPTER_BYTES = 2_000_000  # about 500k tokens, far more than any real chapter
+
+    def __init__(
+        self,
+        text_file_path: str,
+        heading_pattern: bytes = HEADING_PATTERN,
+        encoding: str = "utf-8",
+        max_chapter_bytes: int | None = None,
+    ):
+        """
+        Validates the incoming file path. The file is scanned the first time `chapters` is accessed.
+
+        Parameters
+        ----------
+        text_file_path : str
+            The file path to the text file.
+        heading_pattern : bytes
+            A regular expression, matched line by line, for the lines that start a chapter.
+        encoding : str
+            The file's text encoding. Bytes that cannot be decoded are replaced.
+        max_chapter_bytes : int, optional
+            The longest chapter, in bytes, before it is split into parts. Defaults to MAX_CHAPTER_BYTES.
+        """
+        self.text_file_path = text_file_path
+        self.heading_pattern = re.compile(heading_pattern, re.MULTILINE)
+        self.encoding = encoding
+        self.max_chapter_bytes = max_chapter_bytes or self.MAX_CHAPTER_BYTES
+        self._validate_file_path()
+
+    @staticmethod
+    def handles(path: str) -> bool:
+        """True if the path is a plain-text or Markdown file, by its extension."""
+        return os.path.splitext(path)[1].lower() in TextExtractor.EXTENSIONS
+
+    def _validate_file_path(self) -> None:
+        """
+        Validates if the provided file path exists.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file does not exist.
+        """
+        if not os.path.exists(self.text_file_path):
+            raise FileNotFoundError(f"File {self.text_file_path} does not exist.")
+
+    @cached_property
+    def _map(self) -> mmap.mmap | bytes:
+        with open(self.text_file_path, "rb") as file:
+            # An empty file cannot be mapped
+            if os.fstat(file.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @cached_property
+    def spans(self) -> list[tuple[int, int]]:
+        data = self._map
+        starts = [0] + [match.start() for match in self.heading_pattern.finditer(data) if match.start() > 0]
+        spans = []
+        for start, end in zip(starts, starts[1:] + [len(data)]):
+            while end - start > self.max_chapter_bytes:
+                cut = self._part_end(start, start + self.max_chapter_bytes)
+                spans.append((start, cut))
+                start = cut
+            spans.append((start, end))
+        return [(start, end) for start, end in spans if NOT_BLANK.search(data, start, end)]
+
+    def _part_end(self, start: int, limit: int) -> int:
+        """Where to end a part of an overlong chapter: after the last paragraph or line break before the limit."""
+        data = self._map
+        for separator in (b"\n\n", b"\n"):
+            position = data.rfind(separator, start + 1, limit)
+            if position != -1:
+                return position + len(separator)
+        # No line breaks at all; step back so that a multi-byte character is not split
+        while limit > start + 1 and data[limit] & 0xC0 == 0x80:
+            limit -= 1
+        return limit
+
+    @cached_property
+    def chapters(self) -> TextChapters:
+        return TextChapters(self)
+
+    def read(self, start: int, end: int) -> str:
+        """Decodes and cleans the text between two byte offsets."""
+        text = self._map[start:end].decode(self.encoding, errors="replace")
+        return re.sub(r"\n+", "\n", text.replace("\r\n", "\n")).strip()
+
+    def iter_chapters(self) -> Iterator[str]:
+        """
+        Yields the chapters one at a time, for callers that make a single pass over the file.
+
+        Yields
+        ------
+        str
+            The text of each non-empty chapter, in file order.
+        """
+        for start, end in self.spans:
+            yield self.read(start, end)
+
+    def close(self) -> None:
+        """Unmaps the file. Chapters cannot be read afterwards."""
+        if isinstance(self.__dict__.get("_map"), mmap.mmap):
+            self._map.close()
@@ -1,4 +1,6 @@
+import hashlib
 import re
+from functools import cached_property
 
 import tiktoken
 
@@ -28,13 +30,60 @@ def find_boolean_in_string(text: str) -> bool:
     return True
 
 
+# A sentence ends at terminal punctuation (plus any closing quotes or brackets) followed by whitespace, or at a newline
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])[\"'”’)\]]*\s+|\n+")
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Splits text into sentences. Each sentence keeps its trailing whitespace, so joining them gives back the text.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list[str]: The sentences, in order.
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        sentences.append(text[start : match.end()])
+        start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
+def is_content_boundary(sentence: str, tokens: int, spacing: int) -> bool:
+    """
+    Decides from a sentence's own text whether a content-defined chunk may end after it.
+
+    The sentence is hashed, so the same sentence gives the same answer wherever it falls in the text. Each
+    sentence is a boundary with probability tokens / spacing, which puts boundaries about `spacing` tokens apart
+    whatever the length of the sentences.
+
+    Args:
+        sentence (str): The sentence, as it appears in the text.
+        tokens (int): Its length in tokens.
+        spacing (int): The average number of tokens between boundaries.
+
+    Returns:
+        bool: True if a chunk may end after the sentence.
+    """
+    digest = hashlib.blake2b(sentence.strip().encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") < min(1.0, tokens / max(spacing, 1)) * 2**64
+
+
 class TextProcessor:
     def __init__(self, model: LLMClient | None = None):
         self.model = model or GPT4oMini()
 
+    @cached_property
+    def encoding(self) -> tiktoken.Encoding:
+        return tiktoken.encoding_for_model(self.model.model_name)
+
     def tokenize_text(self, text: str) -> list[int]:
-        encoding = tiktoken.encoding_for_model(self.model.model_name)
-        return encoding.encode(text)
+        return self.encoding.encode(text)
 
     def chunk_tokens(self, tokens: list[int], chunk_size: int, overlap: int) -> list[list[int]]:
         chunks = []
@@ -47,8 +96,94 @@ class TextProcessor:
     def chunk_text(self, text: str, chunk_size: int, overlap: int) -> list[str]:
         tokens = self.tokenize_text(text)
         tokenized_chunks = self.chunk_tokens(tokens, chunk_size, overlap)
-        encoding = tiktoken.encoding_for_model(self.model.model_name)
-        return [encoding.decode(chunk) for chunk in tokenized_chunks]
+        return [self.encoding.decode(chunk) for chunk in tokenized_chunks]
+
+    def chunk_sentences(self, text: str, chunk_size: int, overlap: int) -> list[str]:
+        """
+        Chunks text on sentence boundaries, packing whole sentences into chunks of at most chunk_size tokens.
+        Consecutive chunks share up to `overlap` tokens of whole sentences. A sentence longer than chunk_size
+        is split on token boundaries instead.
+
+        Args:
+            text (str): The text to chunk.
+            chunk_size (int): The maximum number of tokens in a chunk.
+            overlap (int): The maximum number of tokens repeated from the end of the previous chunk.
+
+        Returns:
+            list[str]: The chunks, each an exact substring of the text.
+        """
+        sentences = self._sentence_tokens(text, chunk_size)
+        chunks = []
+        start = 0
+        while start < len(sentences):
+            end = start
+            total = 0
+            while end < len(sentences) and (end == start or total + sentences[end][1] <= chunk_size):
+                total += sentences[end][1]
+                end += 1
+            chunks.append("".join(sentence for sentence, _ in sentences[start:end]))
+            if end == len(sentences):
+                break
+
+            # Step back over whole sentences that fit in the overlap, but always move forward
+            next_start = end
+            repeated = 0
+            while next_start - 1 > start and repeated + sentences[next_start - 1][1] <= overlap:
+                next_start -= 1
+                repeated += sentences[next_start][1]
+            start = next_start
+        return chunks
+
+    def chunk_content_defined(
+        self, text: str, target_tokens: int, max_tokens: int, min_tokens: int | None = None
+    ) -> list[str]:
+        """
+        Chunks text on sentence boundaries chosen by the content of the sentences rather than by their offsets.
+
+        Once a chunk holds min_tokens, it ends after the first sentence that is_content_boundary picks, or before
+        a sentence that would take it past max_tokens. Since boundaries depend on the sentences themselves, an
+        edit only changes the chunks around it: the chunks after it end at the same sentences as before and
+        are identical, so their cached summaries are reused. Chunks do not overlap, since no sentence is cut
+        in half. A sentence longer than max_tokens is split on token boundaries instead.
+
+        Args:
+            text (str): The text to chunk.
+            target_tokens (int): The average chunk length to aim for.
+            max_tokens (int): The maximum number of tokens in a chunk.
+            min_tokens (Optional[int]): The fewest tokens a chunk holds before it may end, except the last.
+                Defaults to half of target_tokens.
+
+        Returns:
+            list[str]: The chunks, which join back into the text.
+        """
+        min_tokens = target_tokens // 2 if min_tokens is None else min_tokens
+        chunks = []
+        current: list[str] = []
+        total = 0
+        for sentence, tokens in self._sentence_tokens(text, max_tokens):
+            if current and total + tokens > max_tokens:
+                chunks.append("".join(current))
+                current, total = [], 0
+            current.append(sentence)
+            total += tokens
+            if total >= min_tokens and is_content_boundary(sentence, tokens, target_tokens - min_tokens):
+                chunks.append("".join(current))
+                current, total = [], 0
+        if current:
+            chunks.append("".join(current))
+        return chunks
+
+    def _sentence_tokens(self, text: str, max_tokens: int) -> list[tuple[str, int]]:
+        """The sentences of the text with their token counts, with sentences over max_tokens split on tokens."""
+        sentences = []
+        for sentence in split_sentences(text):
+            tokens = self.encoding.encode_ordinary(sentence)
+            if len(tokens) <= max_tokens:
+                sentences.append((sentence, len(tokens)))
+            else:
+                for piece in self.chunk_tokens(tokens, max_tokens, 0):
+                    sentences.append((self.encoding.decode(piece), len(piece)))
+        return sentences
 
 
 # Example usage
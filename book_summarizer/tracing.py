@@ -0,0 +1,331 @@
+import contextvars
+import itertools
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("span", default=None)
+_span_ids = itertools.count(1)
+PROMPT_ATTRIBUTES = ("system_prompt", "instruction")
+
+
+class Span:
+    """
+    One timed step of a run, such as a chapter, a chunk or a model call, nested under the step that started it.
+
+    Used as a context manager, a span is the current span for the block it wraps, so spans started inside
+    the block become its children, and it ends when the block exits. A span that is not entered can still be
+    ended by hand and have tasks run under it in other threads with `context`.
+
+    Attributes
+    ----------
+    name : str
+        What the step is, such as "chapter" or "llm_call".
+    span_id : int
+        Unique within the process.
+    parent_id : int or None
+        The span this one is nested under, None for the root of a trace.
+    attributes : dict
+        Facts about the step, such as the chapter index or the tokens sent to the model.
+    start : float
+        When the span started, on the tracer's clock.
+    end_time : float or None
+        When the span ended, None while it is still open.
+    thread_id : int
+        The thread that started the span.
+    """
+
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, parent: "Span | None", attributes: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+        self.end_time: float | None = None
+        self._token: contextvars.Token | None = None
+        self.start = tracer.clock()
+        tracer._on_start(self)
+
+    @property
+    def duration(self) -> float | None:
+        """Seconds from start to end, None while the span is open."""
+        return None if self.end_time is None else self.end_time - self.start
+
+    def set(self, **attributes: Any) -> None:
+        """Adds attributes to the span, such as token counts that are only known once the step is done."""
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        """Ends the span. Later calls do nothing."""
+        if self.end_time is None:
+            self.end_time = self.tracer.clock()
+            self.tracer._on_end(self)
+
+    def context(self) -> contextvars.Context:
+        """A copy of the current context with this span current, for running a task under it in another thread."""
+        context = contextvars.copy_context()
+        context.run(_current_span.set, self)
+        return context
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.set(error=repr(exc))
+        self.end()
+
+
+class _NullSpan:
+    """Stands in for a span when nothing is being traced, so that instrumented code costs almost nothing."""
+
+    recording = False
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def context(self) -> contextvars.Context:
+        return contextvars.copy_context()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Records spans and passes each one to its exporters as it starts and ends.
+
+    Attributes
+    ----------
+    exporters : list
+        Objects with `on_start(span)`, `on_end(span)` and `close()` methods, see ChromeTraceExporter,
+        InMemoryExporter and WeaveExporter. Spans end on many threads, so these methods must be thread-safe.
+    clock : Callable[[], float]
+        The time source for span timings, in seconds.
+    record_prompts : bool
+        Whether model call spans also carry their system prompt, instruction and response. These are large, so
+        they are only recorded once an exporter that sets `records_prompts = True`, such as WeaveExporter, is
+        added.
+    """
+
+    def __init__(self, exporters: Iterable = (), clock: Callable[[], float] = time.perf_counter):
+        self.exporters = list(exporters)
+        self.clock = clock
+        self.record_prompts = any(getattr(exporter, "records_prompts", False) for exporter in self.exporters)
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter) -> None:
+        with self._lock:
+            self.exporters.append(exporter)
+            self.record_prompts = self.record_prompts or getattr(exporter, "records_prompts", False)
+
+    def span(self, name: str, **attributes: Any) -> Span:
+        """Starts a span under the current span, or a new trace if there is none."""
+        return Span(self, name, _current_span.get(), attributes)
+
+    def _exporters(self) -> list:
+        with self._lock:
+            return list(self.exporters)
+
+    def _on_start(self, span: Span) -> None:
+        for exporter in self._exporters():
+            exporter.on_start(span)
+
+    def _on_end(self, span: Span) -> None:
+        # Spans end on many threads at once, so exporters are called without holding the tracer's lock and
+        # guard their own state; one exporter waiting on the network does not hold up the others
+        for exporter in self._exporters():
+            exporter.on_end(span)
+
+    def close(self) -> None:
+        """Flushes every exporter, writing out any trace files."""
+        for exporter in self._exporters():
+            exporter.close()
+
+
+def span(name: str, tracer: Tracer | None = None, **attributes: Any) -> Span | _NullSpan:
+    """
+    Starts a span under the current span, or a new trace with `tracer` if no span is current.
+    Returns NULL_SPAN, which records nothing, when neither is available.
+
+    Parameters
+    ----------
+    name : str
+        What the step is.
+    tracer : Tracer, optional
+        Starts a new trace if no span is current.
+    **attributes
+        Facts about the step.
+
+    Returns
+    -------
+    Span or NULL_SPAN
+        To be used as a context manager, or ended by hand.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        return Span(parent.tracer, name, parent, attributes)
+    if tracer is not None:
+        return Span(tracer, name, None, attributes)
+    return NULL_SPAN
+
+
+def recording_prompts(tracer: Tracer | None = None) -> bool:
+    """Whether a span started now, with `tracer` if no span is current, should record prompts and responses."""
+    parent = _current_span.get()
+    tracer = parent.tracer if parent is not None else tracer
+    return tracer is not None and tracer.record_prompts
+
+
+def current_span() -> Span | None:
+    """The innermost span, or None when nothing is being traced."""
+    return _current_span.get()
+
+
+class InMemoryExporter:
+    """
+    Keeps finished spans in memory and totals the time spent in each kind of step.
+
+    Attributes
+    ----------
+    spans : list[Span]
+        The finished spans, in the order they ended.
+    """
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def close(self) -> None:
+        pass
+
+    def summary(self) -> dict[str, dict]:
+        """
+        Totals the spans by name.
+
+        Returns
+        -------
+        dict
+            {name: {"count": int, "seconds": float, ...}}, where every numeric attribute of the spans, such as
+            token counts, is summed as well. Spans that overlap in time are all counted in full.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        totals: dict[str, dict] = {}
+        for span in spans:
+            total = totals.setdefault(span.name, {"count": 0, "seconds": 0.0})
+            total["count"] += 1
+            total["seconds"] += span.duration
+            for key, value in span.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and key != "index":
+                    total[key] = total.get(key, 0) + value
+        return totals
+
+
+class ChromeTraceExporter:
+    """
+    Writes the spans to a JSON file in the Chrome trace event format, which chrome://tracing and
+    https://ui.perfetto.dev show as a timeline with one row per thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.events: list[dict] = []
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        event = {
+            "name": span.name,
+            "ph": "X",
+            "ts": span.start * 1e6,
+            "dur": span.duration * 1e6,
+            "pid": 1,
+            "tid": span.thread_id,
+            "args": {"span_id": span.span_id, "parent_id": span.parent_id, **span.attributes},
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def close(self) -> None:
+        with self._lock:
+            events = list(self.events)
+        with open(self.path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file, default=str)
+
+
+class WeaveExporter:
+    """
+    Logs the spans to a Weights & Biases Weave project as nested calls, as they start and end.
+
+    The tracer records prompts while this exporter is attached, so each model call is logged with its system
+    prompt and instruction as inputs and its response as output, and prompt changes can be compared in Weave.
+
+    Attributes
+    ----------
+    client : weave.trace.weave_client.WeaveClient
+        The Weave client the calls are logged with.
+    """
+
+    records_prompts = True
+
+    def __init__(self, project_name: str = "book-summarizer", client=None):
+        """
+        Parameters
+        ----------
+        project_name : str
+            The Weave project to log to.
+        client : WeaveClient, optional
+            An already initialised client, in place of calling weave.init(project_name).
+        """
+        if client is None:
+            import weave
+
+            client = weave.init(project_name)
+        self.client = client
+        self._calls: dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        with self._lock:
+            parent = self._calls.get(span.parent_id)
+        # use_stack=False: the parent is given explicitly, so Weave's own thread-local call stack is left alone
+        call = self.client.create_call(span.name, dict(span.attributes), parent=parent, use_stack=False)
+        with self._lock:
+            self._calls[span.span_id] = call
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            call = self._calls.pop(span.span_id, None)
+        if call is not None:
+            # The prompts were logged as inputs when the call started, so only the rest goes in the output
+            output = {key: value for key, value in span.attributes.items() if key not in PROMPT_ATTRIBUTES}
+            self.client.finish_call(call, output={"seconds": span.duration, **output})
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import pytest
+
+from book_summarizer import BookSummarizer
+from book_summarizer.chat import BookChat, BudgetExceededError, load_summaries
+from book_summarizer.fake_llm import FakeLLMClient
+from book_summarizer.llm_core import GPT35Turbo
+from book_summarizer.result_cache import ResultCache
+from book_summarizer.retrieval import HashingEmbedding, VectorIndex
+from book_summarizer.text_processing import TextProcessor
+
+SUMMARIES = [
+    {"title": "Chapter 1", "summary": "- The first chapter introduces the book."},
+    {"title": "Chapter 2", "summary": "- The second chapter continues the argument."},
+]
+
+
+class RecordingClient(FakeLLMClient):
+    def __init__(self, **kwargs):
+        super().__init__(model_name="gpt-3.5-turbo", **kwargs)
+        self.instructions = []
+
+    def call(self, system_prompt: str, instruction: str, max_retries: int = 5) -> str:
+        self.instructions.append(instruction)
+        return super().call(system_prompt, instruction, max_retries)
+
+
+@pytest.fixture
+def chat(sample_epub_path: Path, tmp_path: Path) -> BookChat:
+    summarizer = BookSummarizer(str(sample_epub_path))
+    index = VectorIndex.build(
+        summarizer.chapters, HashingEmbedding(), str(tmp_path / "vectors"), TextProcessor(GPT35Turbo())
+    )
+    return BookChat(
+        summarizer,
+        summaries=SUMMARIES,
+        model=RecordingClient(responder=lambda system_prompt, instruction: "An answer."),
+        vector_index=index,
+        passages=1,
+    )
+
+
+def test_load_summaries(tmp_path: Path):
+    """Validates that a summary file written by summarize_book parses back into chapters."""
+    path = tmp_path / "book_summary.md"
+    path.write_text("## Chapter 1\n- Point one\n- Point two\n\n## Copyright\nEvaluated as not worth summarizing.\n\n")
+    assert load_summaries(str(path)) == [
+        {"title": "Chapter 1", "summary": "- Point one\n- Point two"},
+        {"title": "Copyright", "summary": "Evaluated as not worth summarizing."},
+    ]
+
+
+def test_load_summaries_ignores_headings_inside_summaries(tmp_path: Path):
+    path = tmp_path / "book_summary.md"
+    with open(path, "w") as file:
+        BookSummarizer.write_chapter(file, {"index": 0, "title": "Chapter 1", "summary": "## Key points\n- One"})
+        BookSummarizer.write_chapter(file, {"index": 2, "title": "Chapter 3", "summary": "- Three"})
+    assert load_summaries(str(path)) == [
+        {"title": "Chapter 1", "summary": "## Key points\n- One"},
+        {"title": "Section 2", "summary": ""},
+        {"title": "Chapter 3", "summary": "- Three"},
+    ]
+
+
+def test_answers_go_through_the_summarizer_cache(chat: BookChat, tmp_path: Path):
+    chat.summarizer.cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+    assert chat.ask("What happens in the second chapter?") == "An answer."
+    chat.history.clear()
+    assert chat.ask("What happens in the second chapter?") == "An answer."
+    assert len(chat.model.instructions) == 1
+    assert chat.summarizer.cache.hits == 1
+
+    # Cached answers are free, so they neither count against nor are refused by the budget
+    spent = chat.spent
+    chat.budget = spent
+    chat.history.clear()
+    assert chat.ask("What happens in the second chapter?") == "An answer."
+    assert chat.spent == spent
+
+
+def test_error_answers_are_not_charged_or_remembered(chat: BookChat):
+    chat.model.responder = lambda system_prompt, instruction: "Error: Error code: 500 - The server had an error."
+    assert chat.ask("What happens in the second chapter?").startswith("Error: ")
+    assert chat.spent == 0
+    assert chat.history == []
+
+
+def test_ask_sends_relevant_summary_and_passage(chat: BookChat):
+    assert chat.ask("What happens in the second chapter?") == "An answer."
+    instruction = chat.model.instructions[-1]
+    assert "The second chapter continues the argument." in instruction
+    assert "This is the second chapter." in instruction
+    assert "The first chapter introduces the book." not in instruction
+    assert instruction.endswith("Reader: What happens in the second chapter?")
+
+
+def test_follow_up_includes_history_and_reuses_retrieval(chat: BookChat):
+    chat.ask("What happens in the second chapter?")
+    chat.ask("What happens in the second chapter?")
+    assert len(chat._retrieval_cache) == 1
+    assert "Reader: What happens in the second chapter?\nYou: An answer." in chat.model.instructions[-1]
+
+
+def test_history_is_trimmed_to_budget(chat: BookChat):
+    chat.history_tokens = 30
+    for i in range(5):
+        chat.ask(f"Question number {i}?")
+    assert "Question number 3?" in chat._history_text()
+    assert "Question number 0?" not in chat._history_text()
+
+
+def test_budget_is_enforced(chat: BookChat):
+    chat.model.cost_per_token = 1.0
+    chat.budget = 10.0
+    with pytest.raises(BudgetExceededError):
+        chat.ask("What happens in the first chapter?")
+    assert chat.model.instructions == []
+
+
+if __name__ == "__main__":
+    pytest.main()
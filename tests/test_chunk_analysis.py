@@ -0,0 +1,29 @@
+from book_summarizer.chunk_analysis import format_points, merge_analyses, parse_analysis_response
+
+
+def test_parse_analysis_response_keeps_well_formed_outputs():
+    response = """```json
+    {
+        "summary": ["Coal underpins modern life.", "", 7],
+        "quotes": ["\\u201cThe miner is a sort of grimy caryatid.\\u201d", "  "],
+        "facts": "not a list"
+    }
+    ```"""
+    assert parse_analysis_response(response) == {
+        "summary": ["Coal underpins modern life."],
+        "quotes": ["The miner is a sort of grimy caryatid."],
+        "facts": [],
+    }
+    assert parse_analysis_response("- Coal underpins modern life.") is None
+    assert parse_analysis_response('["a list"]') is None
+
+
+def test_merge_analyses_keeps_repeated_quotes_and_facts_once():
+    first = {"summary": ["Point one."], "quotes": ["A quote from the overlap."], "facts": ["Wigan is in Lancashire."]}
+    second = {"summary": ["Point one."], "quotes": ["a quote from the overlap"], "facts": ["Miners earn £3 a week."]}
+    assert merge_analyses([first, second]) == {
+        "summary": ["Point one.", "Point one."],
+        "quotes": ["A quote from the overlap."],
+        "facts": ["Wigan is in Lancashire.", "Miners earn £3 a week."],
+    }
+    assert format_points(["One.", "Two."]) == "- One.\n- Two.\n"
@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from book_summarizer.chunk_planner import ChunkPlanner
+from book_summarizer.fake_llm import FakeLLMClient
+
+
+def test_latency_objective_splits_long_chapters_that_fit_in_one_call():
+    model = FakeLLMClient(max_tokens=128000)
+    planner = ChunkPlanner(objective="latency", concurrency=4)
+    assert planner.plan(5000, model, prompt_tokens=100)["chunks"] == 1
+
+    plan = planner.plan(100000, model, prompt_tokens=100, overlap=50)
+    assert plan["chunks"] == 4
+    assert plan["chunk_size"] == math.ceil((100000 - 50) / 4) + 50
+    assert plan["seconds"] < planner.estimate(1, 100000, 100, 100, model)["seconds"]
+
+
+def test_cost_and_quality_objectives():
+    model = FakeLLMClient(max_tokens=128000)
+    assert ChunkPlanner(objective="cost").plan(100000, model, prompt_tokens=100)["chunks"] == 1
+    plan = ChunkPlanner(objective="quality").plan(100000, model, prompt_tokens=100, overlap=50)
+    assert plan["chunks"] == 7
+    assert plan["chunk_size"] <= 16000
+
+
+def test_plan_respects_prompt_and_output_limits():
+    """Validates that the prompt and the room for the response both count against the context window."""
+    model = FakeLLMClient(max_tokens=16385, max_output_tokens=1000)
+    planner = ChunkPlanner(objective="cost", summary_reserve=1500)
+    assert planner.max_chunk_size(model, prompt_tokens=100) == 16385 - 100 - ChunkPlanner.MESSAGE_OVERHEAD - 1000
+    plan = planner.plan(100000, model, prompt_tokens=100, overlap=50)
+    assert plan["chunk_size"] <= planner.max_chunk_size(model, prompt_tokens=100)
+    assert plan["chunks"] == math.ceil((100000 - 50) / (planner.max_chunk_size(model, 100) - 50))
+
+    with pytest.raises(ValueError):
+        planner.max_chunk_size(model, prompt_tokens=16000)
+    with pytest.raises(ValueError):
+        ChunkPlanner(objective="speed")
@@ -0,0 +1,133 @@
+import time
+
+import pytest
+
+from book_summarizer.client_pool import CircuitBreaker, ClientPool
+from book_summarizer.fake_llm import FakeLLMClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def failing_client() -> FakeLLMClient:
+    return FakeLLMClient(rate_limit_probability=1.0)
+
+
+def test_circuit_breaker_opens_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_pool_fails_over_and_skips_a_failing_backend():
+    bad, good = failing_client(), FakeLLMClient()
+    pool = ClientPool([bad, good], names=["bad", "good"], failure_threshold=2)
+    responses = [pool.call("system", f"Summarize chapter {number}.") for number in range(6)]
+    assert all(response.startswith("- ") for response in responses)
+    assert good.usage()["calls"] == 6
+    status = {member["name"]: member for member in pool.status()}
+    assert status["bad"]["state"] == CircuitBreaker.OPEN
+    assert status["bad"]["calls"] == 2
+
+
+def test_pool_prefers_fast_backends_and_rate_limit_headroom():
+    slow = FakeLLMClient(latency=0.05)
+    fast = FakeLLMClient()
+    pool = ClientPool([slow, fast], names=["slow", "fast"])
+    for _ in range(10):
+        pool.call("system", "instruction")
+    assert slow.usage()["calls"] == 1
+    assert fast.usage()["calls"] == 9
+
+    fast.rate_limits = {"limit_requests": 100, "remaining_requests": 0}
+    fast.rate_limits_updated = time.time()
+    assert pool.members[1].headroom() == 0.0
+    pool.call("system", "instruction")
+    assert slow.usage()["calls"] == 2
+
+
+def test_pool_reports_an_error_when_every_backend_fails():
+    pool = ClientPool([failing_client(), failing_client()], failure_threshold=1)
+    assert pool.call("system", "instruction").startswith("Error: ")
+    assert pool.call("system", "instruction") == "Error: No backend in the pool is available."
+
+
+def test_health_check_brings_a_recovered_backend_back():
+    clock = FakeClock()
+    flaky = failing_client()
+    pool = ClientPool([flaky, FakeLLMClient()], names=["flaky", "steady"], failure_threshold=1, clock=clock)
+    pool.call("system", "instruction")
+    assert pool.status()[0]["state"] == CircuitBreaker.OPEN
+
+    flaky.rate_limit_probability = 0.0
+    assert pool.check_health()[0]["state"] == CircuitBreaker.OPEN  # not due a trial yet
+    clock.now = 60
+    assert pool.check_health()[0]["state"] == CircuitBreaker.CLOSED
+
+
+def test_pool_streams_from_a_working_backend():
+    pool = ClientPool([failing_client(), FakeLLMClient(responder=lambda system_prompt, instruction: "one two")])
+    assert "".join(pool.stream("system", "instruction")) == "one two"
+
+
+def test_request_errors_are_returned_without_failing_over():
+    def too_long(system_prompt: str, instruction: str) -> str:
+        return "Error: Error code: 400 - This model's maximum context length is 128000 tokens."
+
+    first, second = FakeLLMClient(responder=too_long), FakeLLMClient(responder=too_long)
+    pool = ClientPool([first, second], names=["first", "second"], failure_threshold=1)
+    for _ in range(3):
+        assert pool.call("system", "instruction").startswith("Error: Error code: 400")
+    assert first.usage()["calls"] + second.usage()["calls"] == 3
+    assert [member["state"] for member in pool.status()] == [CircuitBreaker.CLOSED, CircuitBreaker.CLOSED]
+
+
+class BrokenStreamClient(FakeLLMClient):
+    def stream(self, system_prompt: str, instruction: str, max_retries: int = 5):
+        yield "one "
+        raise ConnectionError("Connection reset by peer.")
+
+
+def test_streams_that_break_off_count_as_failures():
+    pool = ClientPool([BrokenStreamClient()], failure_threshold=1)
+    with pytest.raises(ConnectionError):
+        "".join(pool.stream("system", "instruction"))
+    assert pool.status()[0]["state"] == CircuitBreaker.OPEN
+
+    class ReportingStreamClient(FakeLLMClient):
+        def stream(self, system_prompt: str, instruction: str, max_retries: int = 5):
+            yield "one "
+            yield "Error: Connection reset by peer."
+
+    pool = ClientPool([ReportingStreamClient()], failure_threshold=1)
+    assert list(pool.stream("system", "instruction")) == ["one ", "Error: Connection reset by peer."]
+    assert pool.status()[0]["state"] == CircuitBreaker.OPEN
+
+    steady = ClientPool([FakeLLMClient(responder=lambda system_prompt, instruction: "one two three")])
+    stream = steady.stream("system", "instruction")
+    next(stream)
+    stream.close()  # the caller stopped reading; the backend did nothing wrong
+    assert steady.status()[0]["state"] == CircuitBreaker.CLOSED
+    assert steady.status()[0]["in_flight"] == 0
+
+
+def test_close_stops_the_health_check_thread():
+    pool = ClientPool([FakeLLMClient()], health_check_interval=0.01)
+    pool.close()
+    assert not pool._health_checker.is_alive()
@@ -0,0 +1,56 @@
+import pytest
+
+from book_summarizer.compression import ExtractiveCompressor, quoted_sentences
+from book_summarizer.text_processing import split_sentences
+
+CHAPTER = (
+    "Chapter 3: The Mine. "
+    "The miners walked two miles underground to reach the coal face. "
+    "The coal face was low, and the miners worked on their knees. "
+    "It rained that morning. "
+    "Wages for the miners depended on the coal they cut at the face. "
+    'Orwell wrote that "our civilisation is founded on coal". '
+    "I had tea afterwards. "
+    "The coal was loaded into tubs and hauled to the shaft by the miners. "
+    "Someone mentioned the weather. "
+    "Dust from the coal filled the miners' lungs. "
+    "He said, “The work is hard. "
+    "Nobody stays long.” "
+    "The walk back from the coal face took the miners an hour."
+)
+
+
+def test_quoted_sentences_cover_quotes_spanning_sentences():
+    sentences = ["He said, “The work is hard. ", "Nobody stays long.” ", "Then he left. ", 'A "scare" quote. ']
+    assert quoted_sentences(sentences) == [True, True, False, True]
+
+
+@pytest.mark.parametrize("method", ExtractiveCompressor.METHODS)
+def test_compress_drops_low_information_sentences_in_order(method: str):
+    compressed = ExtractiveCompressor(ratio=0.6, method=method).compress(CHAPTER)
+    assert len(compressed) < len(CHAPTER)
+    assert compressed.startswith("Chapter 3: The Mine.")
+    assert '"our civilisation is founded on coal"' in compressed
+    assert "“The work is hard. Nobody stays long.”" in compressed
+    assert "It rained that morning." not in compressed
+    # Kept sentences are in their original order and unchanged
+    kept = split_sentences(compressed)
+    positions = [CHAPTER.index(sentence) for sentence in kept]
+    assert positions == sorted(positions)
+
+
+def test_short_texts_and_invalid_settings():
+    assert ExtractiveCompressor().compress("Too short. To compress.") == "Too short. To compress."
+    assert ExtractiveCompressor(ratio=1).compress(CHAPTER) == CHAPTER
+    with pytest.raises(ValueError):
+        ExtractiveCompressor(ratio=0)
+    with pytest.raises(ValueError):
+        ExtractiveCompressor(method="lsa")
+
+
+def test_textrank_only_links_nearby_sentences():
+    sentences = split_sentences(" ".join(["The miners cut coal at the face."] * 30))
+    sources, targets, weights = ExtractiveCompressor(window=4).similarity_graph(sentences)
+    assert len(sources) == 2 * sum(min(4, 29 - index) for index in range(30))
+    assert (abs(sources - targets) <= 4).all()
+    assert weights == pytest.approx(1)
@@ -0,0 +1,131 @@
+import http.client
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from book_summarizer import BookSummarizer
+from book_summarizer.daemon import DaemonClient, SummarizationDaemon
+from book_summarizer.fake_llm import FakeLLMClient
+
+
+def fake_daemon(**options) -> SummarizationDaemon:
+    return SummarizationDaemon(
+        summarizer_model=FakeLLMClient(model_name="gpt-3.5-turbo"),
+        combiner_model=FakeLLMClient(model_name="gpt-3.5-turbo"),
+        title_model=FakeLLMClient(model_name="gpt-3.5-turbo", responder=lambda system_prompt, instruction: "A Chapter"),
+        worthiness_model=FakeLLMClient(model_name="gpt-3.5-turbo", responder=lambda system_prompt, instruction: "True"),
+        **options,
+    )
+
+
+def test_daemon_keeps_parsed_books_and_cache_warm(sample_epub_path: Path, tmp_path: Path):
+    daemon = fake_daemon(cache_path=str(tmp_path / "cache.sqlite3"))
+    server = daemon.serve("127.0.0.1:0")
+    client = DaemonClient(f"127.0.0.1:{server.server_address[1]}", token=daemon.token)
+    book = BookSummarizer(str(sample_epub_path))
+    try:
+        first = book.summarize_book_with_daemon(client, str(tmp_path / "first.md"), timeout=30, poll_interval=0.02)
+        warm = daemon.summarizer(str(sample_epub_path))
+        second = book.summarize_book_with_daemon(client, str(tmp_path / "second.md"), timeout=30, poll_interval=0.02)
+        health = client.health()
+    finally:
+        daemon.close()
+
+    assert (first["status"], first["chapters"], first["chapters_done"]) == ("done", 2, 2)
+    assert book._chapters is None  # the client never read the book
+    assert Path(second["output_path"]).read_text() == Path(first["output_path"]).read_text()
+    assert "first chapter" in Path(second["output_path"]).read_text()
+    assert daemon.summarizer(str(sample_epub_path)) is warm
+    assert health["books"] == 1
+    assert health["cache"]["hits"] > 0  # the second job was answered from the shared cache
+
+
+def test_edited_books_are_parsed_again(sample_epub_path: Path):
+    daemon = fake_daemon(max_books=1)
+    try:
+        warm = daemon.summarizer(str(sample_epub_path))
+        stat = os.stat(sample_epub_path)
+        os.utime(sample_epub_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert daemon.summarizer(str(sample_epub_path)) is not warm
+        assert len(daemon._books) == 1
+    finally:
+        daemon.close()
+
+
+def test_daemon_answers_on_a_unix_socket(sample_epub_path: Path, tmp_path: Path):
+    daemon = fake_daemon()
+    socket_path = tmp_path / "daemon.sock"
+    daemon.serve(f"unix:{socket_path}")
+    client = DaemonClient(f"unix:{socket_path}", token=daemon.token)
+    try:
+        with pytest.raises(RuntimeError, match="Unknown options: compression_ratio"):
+            client.submit(str(sample_epub_path), compression_ratio=0.5)
+        with pytest.raises(RuntimeError, match="No such book"):
+            client.submit(str(tmp_path / "missing.epub"))
+        job_id = client.submit(str(sample_epub_path), str(tmp_path / "summary.md"), analyze=True)
+        job = client.wait(job_id, poll_interval=0.02, timeout=30)
+    finally:
+        daemon.close()
+
+    assert job["status"] == "done"
+    assert job["options"] == {"analyze": True}
+    assert (tmp_path / "summary_facts.md").exists()
+    assert not socket_path.exists()
+
+
+def test_daemon_refuses_unauthenticated_and_unsafe_requests(sample_epub_path: Path, tmp_path: Path):
+    (tmp_path / "summaries").mkdir()
+    daemon = fake_daemon(token="secret", output_dirs=[str(tmp_path / "summaries")])
+    server = daemon.serve("127.0.0.1:0")
+    address = f"127.0.0.1:{server.server_address[1]}"
+    try:
+        with pytest.raises(RuntimeError, match="wrong daemon token"):
+            DaemonClient(address, token="guess").health()
+        with pytest.raises(RuntimeError, match="wrong daemon token"):
+            DaemonClient(address).submit(str(sample_epub_path))
+
+        # A form post from a web page, even with the token, is not accepted
+        connection = http.client.HTTPConnection(*server.server_address)
+        body = json.dumps({"epub_path": str(sample_epub_path)})
+        connection.request(
+            "POST", "/jobs", body=body, headers={"Content-Type": "text/plain", "Authorization": "Bearer secret"}
+        )
+        assert connection.getresponse().status == 415
+        connection.close()
+
+        client = DaemonClient(address, token="secret")
+        with pytest.raises(RuntimeError, match="must end in .md"):
+            client.submit(str(sample_epub_path), str(tmp_path / "notes.txt"))
+        with pytest.raises(RuntimeError, match="only be written next to the book"):
+            client.submit(str(sample_epub_path), str(tmp_path.parent / "elsewhere.md"))
+        (tmp_path / "link").symlink_to(tmp_path.parent)
+        with pytest.raises(RuntimeError, match="only be written next to the book"):
+            client.submit(str(sample_epub_path), str(tmp_path / "link" / "elsewhere.md"))
+        (tmp_path / "notes.md").write_text("Notes that are not a summary.")
+        with pytest.raises(RuntimeError, match="did not write"):
+            client.submit(str(sample_epub_path), str(tmp_path / "notes.md"))
+        with pytest.raises(RuntimeError, match="overwrite the book itself"):
+            client.submit(str(tmp_path / "notes.md"), str(tmp_path / "notes.md"))
+        assert (tmp_path / "notes.md").read_text() == "Notes that are not a summary."
+
+        job_id = client.submit(str(sample_epub_path), str(tmp_path / "summaries" / "book.md"))
+        assert client.wait(job_id, poll_interval=0.02, timeout=30)["status"] == "done"
+        # The daemon may replace a summary it wrote itself
+        job_id = client.submit(str(sample_epub_path), str(tmp_path / "summaries" / "book.md"))
+        assert client.wait(job_id, poll_interval=0.02, timeout=30)["status"] == "done"
+    finally:
+        daemon.close()
+
+
+def test_finished_jobs_are_evicted(sample_epub_path: Path):
+    daemon = fake_daemon(max_jobs=1, max_finished_jobs=1)
+    try:
+        first = daemon.submit(str(sample_epub_path))
+        second = daemon.submit(str(sample_epub_path))
+        daemon._executor.shutdown(wait=True)
+    finally:
+        daemon.close()
+    assert daemon.job(first) is None
+    assert daemon.job(second)["status"] == "done"
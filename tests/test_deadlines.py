@@ -0,0 +1,42 @@
+import time
+
+from book_summarizer.deadlines import Deadline, call_timeout
+from book_summarizer.fake_llm import FakeLLMClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_nested_scopes_keep_the_earlier_deadline():
+    clock = FakeClock()
+    book = Deadline(10, clock=clock)
+    assert Deadline.current() is None
+    with book.scope():
+        with Deadline(60, clock=clock).scope() as inner:
+            assert inner is book
+        with Deadline(2, clock=clock).scope() as inner:
+            assert Deadline.current() is inner
+        assert Deadline.current() is book
+        clock.now = 4
+        assert call_timeout() == 6
+        assert call_timeout(3) == 3
+        clock.now = 12
+        assert book.expired()
+        assert book.remaining() == 0
+    assert Deadline.current() is None
+    assert call_timeout(3) == 3
+
+
+def test_fake_client_times_out_at_the_deadline():
+    slow = FakeLLMClient(latency=5)
+    start = time.monotonic()
+    with Deadline(0.05).scope():
+        response = slow.call("system", "instruction")
+    assert response == "Error: Request timed out."
+    assert time.monotonic() - start < 1
+    assert FakeLLMClient(latency=5, timeout=0.01).call("system", "instruction") == "Error: Request timed out."
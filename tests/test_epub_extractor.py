@@ -1,8 +1,11 @@
+import zipfile
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
+from ebooklib import epub
 
-from book_summarizer.epub_extractor import EpubExtractor
+from book_summarizer.epub_extractor import BoilerplateFilter, EpubExtractor
 
 
 @pytest.fixture
@@ -79,6 +82,90 @@ class TestEpubExtractor:
         assert "This is the first chapter." in content
         assert "This is the second chapter." in content
 
+    def test_boilerplate_is_removed_across_chapters(self, tmp_path: Path):
+        book = epub.EpubBook()
+        book.set_title("Boilerplate")
+        chapters = []
+        for number in range(1, 5):
+            chapter = epub.EpubHtml(title=f"Chapter {number}", file_name=f"chap_{number}.xhtml", lang="en")
+            chapter.content = (
+                f"<html><body><p>THE ROAD TO WIGAN PIER</p><h1>Chapter {number}</h1>"
+                f"<p>The miners of chapter {number} walked to the pit.</p>"
+                "<p>Copyright 1937 Victor Gollancz Ltd.</p></body></html>"
+            )
+            book.add_item(chapter)
+            chapters.append(chapter)
+        book.spine = chapters
+        book.add_item(epub.EpubNcx())
+        epub_path = tmp_path / "boilerplate.epub"
+        epub.write_epub(epub_path, book, {})
+
+        extractor = EpubExtractor(epub_path, remove_boilerplate=True)
+        assert extractor.chapters[0] == "Chapter 1\nThe miners of chapter 1 walked to the pit."
+        with patch.object(extractor, "_iter_documents", side_effect=AssertionError("the book was parsed again")):
+            assert list(extractor.iter_chapters()) == extractor.chapters
+        report = extractor.boilerplate_report
+        assert report["lines"] == ["THE ROAD TO WIGAN PIER", "Copyright 1937 Victor Gollancz Ltd."]
+        assert report["bytes_removed"] == sum(report["bytes_removed_per_chapter"]) > 0
+
+        assert "Copyright" in EpubExtractor(epub_path).chapters[0]
+
+    def test_documents_are_read_from_the_zip_in_spine_order(self, tmp_path: Path):
+        """Validates that only spine documents are decompressed, in reading order, without the nav or media."""
+        epub_path = tmp_path / "handmade.epub"
+        with zipfile.ZipFile(epub_path, "w") as archive:
+            archive.writestr("mimetype", "application/epub+zip")
+            archive.writestr(
+                "META-INF/container.xml",
+                '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+                '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+                "</rootfiles></container>",
+            )
+            archive.writestr(
+                "OEBPS/content.opf",
+                '<package xmlns="http://www.idpf.org/2007/opf"><manifest>'
+                '<item id="two" href="text/part%20two.xhtml" media-type="application/xhtml+xml"/>'
+                '<item id="one" href="text/one.xhtml" media-type="application/xhtml+xml"/>'
+                '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>'
+                '<item id="notes" href="text/notes.xhtml" media-type="application/xhtml+xml"/>'
+                '<item id="plate" href="images/plate.jpg" media-type="image/jpeg"/>'
+                '</manifest><spine><itemref idref="one"/><itemref idref="two"/></spine></package>',
+            )
+            archive.writestr("OEBPS/text/one.xhtml", "<html><head><title>Book</title></head><body>One</body></html>")
+            archive.writestr("OEBPS/text/part two.xhtml", "<html><body><p>Two</p></body></html>")
+            archive.writestr("OEBPS/text/notes.xhtml", "<html><body><p>Notes</p></body></html>")
+            archive.writestr("OEBPS/nav.xhtml", "<html><body><p>Contents</p></body></html>")
+            archive.writestr("OEBPS/images/plate.jpg", b"not really an image")
+
+        with zipfile.ZipFile(epub_path) as archive:
+            assert EpubExtractor.document_paths(archive) == [
+                "OEBPS/text/one.xhtml",
+                "OEBPS/text/part two.xhtml",
+                "OEBPS/text/notes.xhtml",
+            ]
+        assert EpubExtractor(epub_path).chapters == ["One", "Two", "Notes"]
+
+        # A document that fails its CRC check after chapters have been yielded must not restart the book
+        epub_path.write_bytes(epub_path.read_bytes().replace(b"<p>Two</p>", b"<p>Twx</p>"))
+        extractor = EpubExtractor(epub_path)
+        read = []
+        with patch.object(extractor, "_iter_documents_with_ebooklib", return_value=iter(["One", "Two", "Notes"])):
+            with pytest.raises(zipfile.BadZipFile):
+                read.extend(extractor.iter_chapters())
+        assert read == ["One"]
+
+
+def test_boilerplate_filter_needs_enough_repeats():
+    boilerplate = BoilerplateFilter(min_chapters=3, min_fraction=0.5)
+    for chapter in ["Header\nOne", "Header\nTwo", "Header\nThree", "Four", "Five", "Six", "Seven"]:
+        boilerplate.add(chapter)
+    # In three of seven chapters: enough for min_chapters but not for min_fraction
+    assert boilerplate.boilerplate() == []
+    boilerplate.add("Header\nEight")
+    assert boilerplate.boilerplate() == ["Header"]
+    assert boilerplate.strip("Header\nEight") == "Eight"
+    assert boilerplate.strip("Only content") == "Only content"
+
 
 # Suppress specific warnings for clean test output
 @pytest.fixture(autouse=True)
@@ -0,0 +1,84 @@
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from book_summarizer import BookSummarizer
+from book_summarizer.compression import ExtractiveCompressor
+from book_summarizer.experiments import PromptExperiment, variant_grid
+from book_summarizer.fake_llm import FakeLLMClient
+
+
+@pytest.fixture
+def summarizer(sample_epub_path: Path, mocker: Any, tmp_path: Path) -> BookSummarizer:
+    mock_extractor: MagicMock = mocker.patch("book_summarizer.EpubExtractor").return_value
+    mock_extractor.chapters = [f"Chapter {number}. The miners walked to the pit." for number in range(1, 6)]
+    with patch("book_summarizer.EpubExtractor._validate_file_path"):
+        return BookSummarizer(sample_epub_path, cache_path=str(tmp_path / "cache.sqlite3"))
+
+
+def test_variant_grid_builds_every_combination():
+    variants = variant_grid(
+        {"a": FakeLLMClient(), "b": FakeLLMClient()},
+        instructions={"short": "Be brief.", "long": "Be thorough."},
+    )
+    assert [variant["name"] for variant in variants] == [
+        "a/default/short",
+        "a/default/long",
+        "b/default/short",
+        "b/default/long",
+    ]
+
+
+def test_experiment_reports_each_variant_and_reuses_the_cache(summarizer: BookSummarizer):
+    brief = FakeLLMClient(model_name="gpt-3.5-turbo", responder=lambda system_prompt, instruction: "Short.")
+    verbose = FakeLLMClient(
+        model_name="gpt-3.5-turbo",
+        cost_per_token=1e-6,
+        responder=lambda system_prompt, instruction: "A much longer summary of the chapter.",
+    )
+    variants = [
+        {"name": "brief", "model": brief, "instruction": "Summarize briefly."},
+        {"name": "verbose", "model": verbose, "instruction": "Summarize at length."},
+    ]
+    experiment = PromptExperiment(summarizer, variants, sample_size=2, seed=1)
+    assert len(experiment.chapters) == 2
+
+    results = experiment.run()
+    assert [(result["variant"], result["chapter"]) for result in results] == [
+        (variant, chapter) for variant in ("brief", "verbose") for chapter in experiment.chapters
+    ]
+    table = {row["variant"]: row for row in experiment.summary_table()}
+    assert table["brief"]["mean_words"] == 1
+    assert table["verbose"]["mean_words"] == 7
+    assert table["verbose"]["cost"] > 0
+    report = experiment.report()
+    assert "| brief | gpt-3.5-turbo | 2 | 0 | 0 |" in report
+    assert f"## Chapter {experiment.chapters[0] + 1}" in report
+
+    brief.reset_usage()
+    experiment.run()
+    assert brief.usage()["calls"] == 0
+    assert all(row["cached"] == 2 and row["cost"] == 0 for row in experiment.summary_table())
+
+
+def test_experiment_compares_compression_ratios(summarizer: BookSummarizer):
+    summarizer.chapters = [
+        "Chapter 1. " + " ".join(f"The miners cut {number} tons of coal at the face." for number in range(20))
+    ]
+    variants = variant_grid(
+        {"fake": FakeLLMClient(model_name="gpt-3.5-turbo")},
+        compressors={"full": None, "half": ExtractiveCompressor(ratio=0.5)},
+    )
+    assert [variant["name"] for variant in variants] == ["fake/default/default/full", "fake/default/default/half"]
+    experiment = PromptExperiment(summarizer, variants, chapters=[0])
+    experiment.run()
+    table = {row["variant"]: row for row in experiment.summary_table()}
+    assert table["fake/default/default/full"]["tokens_saved"] == 0
+    assert table["fake/default/default/half"]["tokens_saved"] > 0
+
+
+def test_duplicate_variant_names_are_rejected(summarizer: BookSummarizer):
+    with pytest.raises(ValueError):
+        PromptExperiment(summarizer, [{"name": "x", "model": FakeLLMClient()}] * 2)
@@ -0,0 +1,63 @@
+import pickle
+import time
+
+import pytest
+
+from book_summarizer.fake_llm import FakeLLMClient
+
+
+def test_fake_client_is_deterministic():
+    """Validates that two fakes with the same settings produce the same response."""
+    first = FakeLLMClient().call("system", "Summarize this chapter about coal miners and their wages.")
+    second = FakeLLMClient().call("system", "Summarize this chapter about coal miners and their wages.")
+    assert first == second
+    assert first.startswith("- ")
+
+
+def test_fake_client_tracks_usage():
+    """Validates that calls and estimated tokens are tallied and can be reset."""
+    fake = FakeLLMClient(cost_per_token=1.0)
+    fake.call("x" * 40, "y" * 400)
+    usage = fake.usage()
+    assert usage["calls"] == 1
+    assert usage["prompt_tokens"] == 110
+    assert usage["cost"] == usage["prompt_tokens"] + usage["completion_tokens"]
+    fake.reset_usage()
+    assert fake.usage()["calls"] == 0
+
+
+def test_fake_client_simulates_latency():
+    fake = FakeLLMClient(latency=0.05)
+    start = time.perf_counter()
+    fake.call("system", "instruction")
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_fake_client_rate_limits_are_retried():
+    """Validates that simulated rate-limit errors go through retry_handler and eventually succeed."""
+    fake = FakeLLMClient(rate_limit_probability=0.5, seed=3)
+    responses = [fake.call("system", "some instruction text") for _ in range(10)]
+    assert all(not response.startswith("Error") for response in responses)
+    assert fake.usage()["rate_limit_errors"] > 0
+    assert fake.usage()["calls"] == 10
+
+
+def test_fake_client_gives_up_after_max_retries():
+    fake = FakeLLMClient(rate_limit_probability=1.0)
+    assert fake.call("system", "instruction", max_retries=2) == "Error: Rate limit exceeded after 2 retries."
+
+
+def test_fake_client_custom_responder():
+    fake = FakeLLMClient(responder=lambda system_prompt, instruction: "True")
+    assert fake.call("system", "instruction") == "True"
+
+
+def test_fake_client_can_be_pickled():
+    """Validates that the fake survives joblib's process backend, which pickles its arguments."""
+    fake = pickle.loads(pickle.dumps(FakeLLMClient(latency=0.01)))
+    assert fake.latency == 0.01
+    assert fake.call("system", "instruction")
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,67 @@
+import threading
+
+from book_summarizer.deadlines import Deadline
+from book_summarizer.fake_llm import FakeLLMClient
+from book_summarizer.hedging import HedgedClient
+
+
+def test_slow_call_is_answered_by_the_hedge():
+    stuck = threading.Event()
+
+    def stuck_responder(system_prompt: str, instruction: str) -> str:
+        stuck.wait(5)
+        return "Too late"
+
+    slow = FakeLLMClient(responder=stuck_responder)
+    fast = FakeLLMClient(responder=lambda system_prompt, instruction: "Chapter 1")
+    client = HedgedClient(slow, hedge_client=fast, initial_delay=0.01)
+    try:
+        assert client.call("system", "instruction") == "Chapter 1"
+    finally:
+        stuck.set()
+        client.close()
+    assert (client.calls, client.hedges, client.hedge_wins) == (1, 1, 1)
+
+
+def test_hedges_do_not_queue_behind_original_requests():
+    stuck = threading.Event()
+
+    def responder(system_prompt: str, instruction: str) -> str:
+        if threading.current_thread().name.startswith("hedged-call"):
+            stuck.wait(5)
+            return "Too late"
+        return "Chapter 1"
+
+    fake = FakeLLMClient(responder=responder)
+    client = HedgedClient(fake, initial_delay=0.01, max_workers=2)
+    try:
+        callers = [threading.Thread(target=client.call, args=("system", "instruction")) for _ in range(2)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join(2)
+        assert not any(caller.is_alive() for caller in callers)  # every original request is still stuck
+    finally:
+        stuck.set()
+        client.close()
+    assert (client.hedges, client.hedge_wins) == (2, 2)
+
+
+def test_fast_calls_are_not_hedged_and_set_the_delay():
+    fake = FakeLLMClient(responder=lambda system_prompt, instruction: "True")
+    client = HedgedClient(fake, initial_delay=5, min_samples=3)
+    assert client.hedge_delay() == 5
+    for _ in range(3):
+        assert client.call("system", "instruction") == "True"
+    assert client.hedges == 0
+    assert client.hedge_delay() < 1
+    assert fake.usage()["calls"] == 3
+    client.close()
+
+
+def test_deadline_reaches_hedged_requests():
+    client = HedgedClient(FakeLLMClient(latency=5), initial_delay=0.01)
+    with Deadline(0.05).scope():
+        assert client.call("system", "instruction") == "Error: Request timed out."
+    assert client.hedges == 1
+    client.close()
@@ -0,0 +1,220 @@
+import shutil
+import threading
+from pathlib import Path
+
+from book_summarizer import BookSummarizer
+from book_summarizer.fake_llm import FakeLLMClient
+from book_summarizer.job_queue import BookScheduler, JobQueue, run_worker_processes
+from book_summarizer.rate_limit import RateLimiter
+
+
+def fake_models(**overrides) -> dict:
+    models = {
+        "summarizer_model": FakeLLMClient(model_name="gpt-3.5-turbo"),
+        "combiner_model": FakeLLMClient(model_name="gpt-3.5-turbo"),
+        "title_model": FakeLLMClient(responder=lambda system_prompt, instruction: "A Chapter"),
+        "worthiness_model": FakeLLMClient(responder=lambda system_prompt, instruction: "True"),
+    }
+    models.update(overrides)
+    return models
+
+
+def complete_book(queue: JobQueue, chapters: int) -> None:
+    unit = queue.claim()
+    assert unit["kind"] == "book"
+    queue.complete(unit, {"chapters": chapters})
+
+
+def test_claims_are_shared_fairly_between_books(tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    first = queue.submit("first.epub")
+    second = queue.submit("second.epub")
+    books = [queue.claim(), queue.claim()]
+    for book in books:
+        queue.complete(book, {"chapters": 4})
+    claimed = [queue.claim()["job_id"] for _ in range(4)]
+    assert claimed == [first, second, first, second]
+
+
+def test_higher_priority_jobs_are_served_first(tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    normal = queue.submit("normal.epub")
+    urgent = queue.submit("urgent.epub", priority=5)
+    assert [queue.claim()["job_id"] for _ in range(2)] == [urgent, normal]
+
+
+def test_units_are_created_as_their_inputs_finish(tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("book.epub")
+    complete_book(queue, 2)
+
+    long_chapter, short_chapter = queue.claim(), queue.claim()
+    queue.complete(long_chapter, {"title": "One", "worthiness": True, "chunks": ["a", "b"]})
+    queue.complete(short_chapter, {"title": "Two", "worthiness": False, "chunks": []})
+    chunks = [queue.claim(), queue.claim()]
+    assert [(unit["kind"], unit["part"]) for unit in chunks] == [("chunk", 0), ("chunk", 1)]
+    queue.complete(chunks[1], {"summary": "second"})
+    queue.complete(chunks[0], {"summary": "first"})
+
+    combine = queue.claim()
+    assert combine["kind"] == "combine"
+    assert queue.chunk_summaries(job_id, 0) == ["first", "second"]
+    assert queue.complete(combine, {"summary": "combined"}) == "writing"
+    assert queue.job(job_id)["status"] == "writing"  # not "done" until the output is written
+    write = queue.claim()
+    assert write["kind"] == "write"
+    assert queue.complete(write, {"output_path": "book_summary.md"}) == "done"
+    assert [result["summary"] for result in queue.results(job_id)] == ["combined", BookSummarizer.NOT_WORTHY_SUMMARY]
+    assert queue.progress()[0]["chapters_done"] == 2
+
+
+def test_expired_leases_are_taken_over_and_results_stored_once(tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+    queue.submit("book.epub")
+    slow = queue.claim(worker_id="slow", lease_seconds=-1)
+    fast = queue.claim(worker_id="fast")
+    assert (fast["kind"], fast["attempts"]) == ("book", 2)
+    assert not queue.renew(slow, worker_id="slow")
+
+    queue.complete(fast, {"chapters": 1})
+    queue.complete(slow, {"chapters": 5})  # the late duplicate is ignored
+    assert queue.progress()[0]["chapters"] == 1
+
+    abandoned = queue.claim(lease_seconds=-1)
+    queue.claim(lease_seconds=-1)
+    assert queue.claim() is None  # out of attempts
+    job = queue.job(abandoned["job_id"])
+    assert job["status"] == "failed"
+    assert queue.retry_failed(job["id"]) == 1
+    assert queue.claim()["kind"] == "metadata"
+
+
+def test_scheduler_summarizes_every_book(sample_epub_path: Path, tmp_path: Path):
+    other_epub_path = tmp_path / "other.epub"
+    shutil.copy(sample_epub_path, other_epub_path)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    first = queue.submit(str(sample_epub_path), priority=1)
+    second = queue.submit(str(other_epub_path), options={"summarizer_instruction": "Summarize the other book."})
+
+    updates = []
+    scheduler = BookScheduler(
+        queue,
+        rate_limiter=RateLimiter(requests_per_minute=6000),
+        max_workers=4,
+        on_progress=updates.append,
+        **fake_models(),
+    )
+    progress = scheduler.run()
+
+    assert [(job["id"], job["status"], job["chapters_done"]) for job in progress] == [
+        (first, "done", 2),
+        (second, "done", 2),
+    ]
+    assert len(updates) == 12  # a book, two metadata, two chunk units and a write unit for each
+    first_summary = Path(queue.job(first)["output_path"]).read_text()
+    assert first_summary.count("## A Chapter") == 2
+    assert "second chapter" in first_summary
+    assert "other book" in Path(queue.job(second)["output_path"]).read_text()
+
+
+def test_thin_client_waits_for_workers(sample_epub_path: Path, tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    client = BookSummarizer(str(sample_epub_path))
+    worker = threading.Thread(target=BookScheduler(JobQueue(queue.path), poll_interval=0.05, **fake_models()).run)
+    output_path = tmp_path / "summary.md"
+    job_id = client.submit_book(queue, str(output_path))
+    worker.start()
+    job = queue.wait(job_id, poll_interval=0.05, timeout=30)
+    worker.join()
+    assert client._chapters is None  # the client never read the book
+    assert job["status"] == "done"
+    assert "first chapter" in output_path.read_text()
+
+
+def test_worker_processes_share_a_queue(sample_epub_path: Path, tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_ids = []
+    for number in range(3):
+        epub_path = tmp_path / f"book_{number}.epub"
+        shutil.copy(sample_epub_path, epub_path)
+        job_ids.append(queue.submit(str(epub_path)))
+
+    progress = run_worker_processes(queue.path, processes=2, max_workers=2, poll_interval=0.05, **fake_models())
+    assert [job["status"] for job in progress] == ["done"] * 3
+    for job_id in job_ids:
+        assert Path(queue.job(job_id)["output_path"]).read_text().count("## A Chapter") == 2
+
+
+def test_error_responses_fail_units_and_can_be_retried(sample_epub_path: Path, tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit(str(sample_epub_path), str(tmp_path / "summary.md"))
+    failing = FakeLLMClient(model_name="gpt-3.5-turbo", responder=lambda system_prompt, instruction: "Error: 500")
+    scheduler = BookScheduler(queue, **fake_models(summarizer_model=failing))
+    scheduler.run()
+    assert not scheduler._summarizers  # the parsed book is dropped once its job has failed
+    job = queue.job(job_id)
+    assert (job["status"], job["error"]) == ("failed", "2 units failed")
+    assert not (tmp_path / "summary.md").exists()
+
+    assert queue.retry_failed(job_id) == 2
+    BookScheduler(queue, **fake_models()).run()
+    assert queue.job(job_id)["status"] == "done"
+    assert "first chapter" in (tmp_path / "summary.md").read_text()
+
+
+def test_jobs_whose_output_cannot_be_written_fail(sample_epub_path: Path, tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit(str(sample_epub_path), str(tmp_path / "missing" / "summary.md"))
+    BookScheduler(queue, **fake_models()).run()
+    job = queue.job(job_id)
+    assert job["status"] == "failed"
+    assert job["error"].startswith("Error: could not write the summary")
+
+    (tmp_path / "missing").mkdir()
+    assert queue.retry_failed(job_id) == 1
+    BookScheduler(queue, **fake_models()).run()
+    assert queue.job(job_id)["status"] == "done"
+    assert "first chapter" in (tmp_path / "missing" / "summary.md").read_text()
+
+
+def test_a_writer_that_dies_is_replaced(tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("book.epub")
+    complete_book(queue, 1)
+    queue.complete(queue.claim(), {"title": "One", "worthiness": False, "chunks": []})
+    assert queue.job(job_id)["status"] == "writing"
+    queue.claim(worker_id="dead", lease_seconds=-1)
+    write = queue.claim(worker_id="alive")
+    assert (write["kind"], write["attempts"]) == ("write", 2)
+    assert queue.complete(write, {"output_path": "book_summary.md"}) == "done"
+
+
+def test_leases_are_renewed_while_a_unit_runs(sample_epub_path: Path, tmp_path: Path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit(str(sample_epub_path), str(tmp_path / "summary.md"))
+    # Each chunk takes longer than a lease, while the other scheduler keeps looking for expired leases
+    schedulers = [
+        BookScheduler(
+            JobQueue(queue.path),
+            max_workers=2,
+            lease_seconds=0.3,
+            poll_interval=0.02,
+            **fake_models(summarizer_model=FakeLLMClient(model_name="gpt-3.5-turbo", latency=0.8)),
+        )
+        for _ in range(2)
+    ]
+    threads = [threading.Thread(target=scheduler.run) for scheduler in schedulers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert queue.job(job_id)["status"] == "done"
+    assert queue._connection.execute("SELECT MAX(attempts) FROM units").fetchone()[0] == 1
+
+
+def test_network_filesystem_queues_do_not_use_the_write_ahead_log(tmp_path: Path):
+    assert JobQueue(str(tmp_path / "local.sqlite3"))._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    queue = JobQueue(str(tmp_path / "shared.sqlite3"), network_filesystem=True)
+    assert queue._connection.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    job_id = queue.submit("book.epub")
+    assert queue.claim()["job_id"] == job_id
@@ -1,4 +1,7 @@
-from book_summarizer.llm_core import GPT4O, GPT35Turbo
+from unittest.mock import MagicMock, patch
+
+from book_summarizer.deadlines import Deadline
+from book_summarizer.llm_core import CLIENT, GPT4O, GPT4oMini, GPT35Turbo, OpenAICompatibleClient
 
 
 # I'd probably like to test more stuff, like whether the call method works...
@@ -16,3 +19,48 @@ def test_gpt4o_properties():
     assert gpt.model_name == "gpt-4o"
     assert gpt.max_tokens == 128000
     assert gpt.cost_per_token == 5 / 1000000
+
+
+def test_gpt_client_records_rate_limit_headers():
+    """Validates that the remaining rate limit reported by the endpoint is kept for load balancing."""
+    gpt = GPT4oMini(api_key="sk-other", max_retries=1)
+    assert gpt.client is not CLIENT
+    raw_response = MagicMock()
+    raw_response.headers = {"x-ratelimit-limit-requests": "500", "x-ratelimit-remaining-requests": "499"}
+    raw_response.parse.return_value.choices[0].message.content = "A summary."
+    with patch.object(gpt.client.chat.completions.with_raw_response, "create", return_value=raw_response):
+        assert gpt.call("system", "instruction") == "A summary."
+    assert gpt.rate_limits == {"limit_requests": 500, "remaining_requests": 499}
+
+
+def test_gpt_client_limits_requests_to_the_deadline():
+    gpt = GPT4oMini(api_key="sk-other", max_retries=1, timeout=30)
+    raw_response = MagicMock()
+    raw_response.headers = {}
+    raw_response.parse.return_value.choices[0].message.content = "A summary."
+    with patch.object(gpt.client.chat.completions.with_raw_response, "create", return_value=raw_response) as create:
+        gpt.call("system", "instruction")
+        assert create.call_args.kwargs["timeout"] == 30
+        with Deadline(5).scope():
+            gpt.call("system", "instruction")
+        assert create.call_args.kwargs["timeout"] <= 5
+
+
+def test_gpt_client_reports_a_stream_that_breaks_off_as_an_error():
+    gpt = GPT4oMini(api_key="sk-other", max_retries=1)
+
+    def chunks():
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = "The miners "
+        yield chunk
+        raise ConnectionError("Connection reset by peer.")
+
+    with patch.object(gpt.client.chat.completions, "create", return_value=chunks()):
+        assert list(gpt.stream("system", "instruction")) == ["The miners ", "Error: Connection reset by peer."]
+
+
+def test_openai_compatible_client_uses_its_own_endpoint():
+    local = OpenAICompatibleClient("llama-3-8b", base_url="http://localhost:8000/v1", max_tokens=8192)
+    assert local.model_name == "llama-3-8b"
+    assert str(local.client.base_url).startswith("http://localhost:8000")
+    assert local.cost_per_token == 0.0
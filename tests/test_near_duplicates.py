@@ -0,0 +1,65 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from book_summarizer.near_duplicates import MAX_HASH, MERSENNE_PRIME, MinHasher, NearDuplicateIndex
+
+WORDS = "coal miners pit dawn wages housing dole family street lodging kitchen tripe shop landlady north".split()
+
+
+def text(seed: int, words: int = 600) -> str:
+    generator = random.Random(seed)
+    return " ".join(generator.choice(WORDS) + generator.choice(["", "s", "ed"]) for _ in range(words))
+
+
+def edited(original: str) -> str:
+    """Another edition: curly quotes, different line breaks and a few corrected words."""
+    words = original.split()
+    for position in (50, 300, 550):
+        words[position] = "corrected"
+    return "“" + "\n".join(" ".join(words[i : i + 12]) for i in range(0, len(words), 12)) + ".”"
+
+
+def test_signatures_estimate_shingle_overlap():
+    hasher = MinHasher()
+    original = hasher.signature(text(1))
+    assert hasher.similarity(original, hasher.signature(text(1).upper())) == 1.0
+    assert hasher.similarity(original, hasher.signature(edited(text(1)))) > 0.9
+    assert hasher.similarity(original, hasher.signature(text(2))) < 0.2
+    assert hasher.signature("Too short.") is None
+
+
+def test_signatures_do_not_depend_on_the_block_size():
+    """Validates that permuting the shingles a block at a time gives the same minimum as permuting them all at once."""
+    hasher = MinHasher()
+    hashes = hasher.shingle_hashes(text(3))
+    expected = ((np.outer(hasher._a, hashes) + hasher._b[:, None]) % MERSENNE_PRIME & MAX_HASH).min(axis=1)
+    assert np.array_equal(hasher.signature(text(3)), expected)
+    hasher.BLOCK_SIZE = 7
+    assert len(hashes) % hasher.BLOCK_SIZE
+    assert np.array_equal(hasher.signature(text(3)), expected)
+
+
+def test_index_finds_near_duplicates_with_the_same_settings(tmp_path: Path):
+    index = NearDuplicateIndex(str(tmp_path / "chapters.sqlite3"))
+    hasher = index.hasher
+    index.add(hasher.signature(text(1)), "settings", "first.epub#0", {"summary": "One."})
+    index.add(hasher.signature(text(2)), "settings", "first.epub#1", {"summary": "Two."})
+
+    match = index.find(hasher.signature(edited(text(1))), "settings")
+    assert (match["source"], match["result"]) == ("first.epub#0", {"summary": "One."})
+    assert match["similarity"] > 0.9
+    assert index.find(hasher.signature(edited(text(1))), "other settings") is None
+    assert index.find(hasher.signature(text(3)), "settings") is None
+    index.close()
+
+    reopened = NearDuplicateIndex(str(tmp_path / "chapters.sqlite3"))
+    assert len(reopened) == 2
+    assert reopened.find(hasher.signature(text(2)), "settings")["result"] == {"summary": "Two."}
+
+
+def test_bands_must_divide_the_signature(tmp_path: Path):
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(str(tmp_path / "chapters.sqlite3"), bands=10)
@@ -0,0 +1,97 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from book_summarizer.quote_index import QuoteIndex, tokenize_with_offsets
+
+CHAPTERS = [
+    "The coal miner goes down the pit. Coal is the basis of industrial life.",
+    "Socialism, Orwell argues, must be about justice and liberty. “Justice and liberty!” he says again.",
+    "A chapter about housing, the slums and the wages of the unemployed, with no coal at all.",
+]
+
+
+@pytest.fixture
+def index() -> QuoteIndex:
+    return QuoteIndex.build(iter(CHAPTERS))
+
+
+def test_tokenize_with_offsets():
+    """Validates that words are lowercased and their offsets point back into the original text."""
+    text = "Orwell’s Wigan, 1937."
+    tokens = tokenize_with_offsets(text)
+    assert [word for word, _, _ in tokens] == ["orwell's", "wigan", "1937"]
+    assert all(text[start:end].lower().replace("’", "'") == word for word, start, end in tokens)
+
+
+def test_phrase_returns_citations(index: QuoteIndex):
+    """Validates that phrase matches ignore case and punctuation and cite the exact span."""
+    citations = index.phrase("justice and LIBERTY")
+    assert [citation["chapter"] for citation in citations] == [1, 1]
+    first = citations[0]
+    assert CHAPTERS[1][first["start"] : first["end"]] == "justice and liberty"
+    assert index.phrase("liberty and justice") == []
+    assert index.phrase("unknownword") == []
+
+
+def test_near_finds_terms_within_window(index: QuoteIndex):
+    citations = index.near(["coal", "industrial"], window=5)
+    assert len(citations) == 1
+    assert CHAPTERS[0][citations[0]["start"] : citations[0]["end"]] == "Coal is the basis of industrial"
+    assert index.near(["coal", "industrial"], window=2) == []
+
+
+def test_search_ranks_with_bm25(index: QuoteIndex):
+    """Validates that the chapter with more occurrences of a query word ranks first and phrases filter."""
+    results = index.search("coal")
+    assert [result["chapter"] for result in results] == [0, 2]
+    assert results[0]["score"] > results[1]["score"]
+
+    results = index.search('coal "the pit"')
+    assert [result["chapter"] for result in results] == [0]
+    assert CHAPTERS[0][results[0]["start"] : results[0]["end"]] == "the pit"
+
+
+def test_save_and_load_round_trip(index: QuoteIndex, tmp_path: Path):
+    path = index.save(str(tmp_path / "book_index.json.gz"))
+    loaded = QuoteIndex.load(path)
+    assert loaded.chapter_lengths == index.chapter_lengths
+    assert loaded.phrase("justice and liberty") == index.phrase("justice and liberty")
+    assert loaded.search("coal") == index.search("coal")
+
+
+def test_for_book_persists_next_to_epub(sample_epub_path: Path):
+    index = QuoteIndex.for_book(str(sample_epub_path))
+    assert Path(QuoteIndex.default_path(str(sample_epub_path))).exists()
+    assert index.phrase("this is the second chapter")[0]["chapter"] == 1
+    assert QuoteIndex.for_book(str(sample_epub_path)).chapter_lengths == index.chapter_lengths
+
+
+def test_for_book_rebuilds_an_index_of_other_chapters(tmp_path: Path):
+    """Validates that a saved index is not reused for chapters extracted differently from the ones it was built on."""
+    epub_path = str(tmp_path / "book.epub")
+    Path(epub_path).touch()
+    first = QuoteIndex.for_book(epub_path, chapters=iter(CHAPTERS))
+    assert QuoteIndex.for_book(epub_path, chapters=CHAPTERS).chapters_key == first.chapters_key
+
+    cleaned = ["Front matter removed. " + CHAPTERS[0]] + CHAPTERS[1:]
+    rebuilt = QuoteIndex.for_book(epub_path, chapters=cleaned)
+    assert rebuilt.chapters_key != first.chapters_key
+    citation = rebuilt.phrase("coal miner")[0]
+    assert cleaned[0][citation["start"] : citation["end"]] == "coal miner"
+    assert QuoteIndex.load(QuoteIndex.default_path(epub_path)).chapters_key == rebuilt.chapters_key
+
+
+def test_for_book_rebuilds_an_index_from_an_older_version(index: QuoteIndex, tmp_path: Path):
+    epub_path = str(tmp_path / "book.epub")
+    Path(epub_path).touch()
+    index_path = QuoteIndex.default_path(epub_path)
+    with gzip.open(index_path, "wt", encoding="utf-8") as file:
+        json.dump({"version": 1, "chapter_lengths": [], "offsets": [], "postings": {}}, file)
+    assert QuoteIndex.for_book(epub_path, chapters=CHAPTERS).chapter_lengths == index.chapter_lengths
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,83 @@
+import random
+
+import numpy as np
+import pytest
+
+from book_summarizer.quote_verifier import MERSENNE_61, QuoteVerifier, banded_alignment, extract_quotes, mulmod61
+
+CHAPTERS = [
+    "Introductory remarks about the book and its author.",
+    "The coal miner is a sort of grimy caryatid upon whose shoulders nearly everything that is not grimy is "
+    "supported. Our civilisation is founded on coal, more completely than one realises until one stops to think.",
+]
+
+
+@pytest.fixture
+def verifier() -> QuoteVerifier:
+    return QuoteVerifier(CHAPTERS)
+
+
+def test_extract_quotes_skips_scare_quotes():
+    """Validates that straight and curly quotes are found, and short scare quotes are skipped."""
+    summary = 'He calls the "working class" heroes: “Our civilisation is founded on coal,” and "it is so".'
+    quotes = extract_quotes(summary)
+    assert [quote["quote"] for quote in quotes] == ["Our civilisation is founded on coal,"]
+    assert summary[quotes[0]["start"] : quotes[0]["end"]] == quotes[0]["quote"]
+
+
+def test_banded_alignment_finds_best_span():
+    target = "a b c the coal miner is grimy d e".split()
+    distance, first, last = banded_alignment("the coal miner was grimy".split(), target, band=3)
+    assert distance == 1
+    assert target[first:last] == ["the", "coal", "miner", "is", "grimy"]
+
+
+def test_verify_exact_quote(verifier: QuoteVerifier):
+    result = verifier.verify_quote("Our civilisation is founded on coal")
+    assert result["status"] == "exact"
+    assert result["chapter"] == 1
+    assert CHAPTERS[1][result["start"] : result["end"]] == "Our civilisation is founded on coal"
+
+
+def test_verify_paraphrased_quote_returns_corrected_text(verifier: QuoteVerifier):
+    result = verifier.verify_quote("the coal miner is a kind of grimy caryatid upon whose shoulders everything")
+    assert result["status"] == "close"
+    assert 0.7 <= result["score"] < 1
+    assert result["source_text"] == "The coal miner is a sort of grimy caryatid upon whose shoulders nearly everything"
+
+
+def test_verify_invented_quote(verifier: QuoteVerifier):
+    assert verifier.verify_quote("the miners demanded higher wages from the owners")["status"] == "not_found"
+
+
+def test_verify_respects_chapter(verifier: QuoteVerifier):
+    assert verifier.verify_quote("Our civilisation is founded on coal", chapter=0)["status"] == "not_found"
+
+
+def test_annotate(verifier: QuoteVerifier):
+    summary = 'He writes "Our civilisation is founded on coal" and "a kind of grimy caryatid upon whose shoulders".'
+    annotated = verifier.annotate(summary, correct=True)
+    assert '"Our civilisation is founded on coal" [verified: section 2, offset' in annotated
+    assert '"a sort of grimy caryatid upon whose shoulders" [close match' in annotated
+
+
+def test_mulmod61_matches_exact_arithmetic():
+    rng = random.Random(0)
+    values = [rng.randrange(MERSENNE_61) for _ in range(1000)] + [0, 1, MERSENNE_61 - 1]
+    for factor in [rng.randrange(MERSENNE_61) for _ in range(5)] + [MERSENNE_61 - 1]:
+        products = mulmod61(np.array(values, dtype=np.uint64), factor)
+        assert [int(product) for product in products] == [value * factor % MERSENNE_61 for value in values]
+
+
+def test_long_ngrams_over_a_large_vocabulary_are_hashed():
+    # 40-odd words to the 13th power no longer fit in int64, so the seeds are hashed instead of numbered
+    verifier = QuoteVerifier(CHAPTERS, ngram=13)
+    assert len(verifier._vocabulary) ** 13 >= 2**63
+    assert len(set(verifier._seed_keys.tolist())) == len(verifier._seed_keys)
+    assert (verifier._seed_keys >= 0).all()
+    result = verifier.verify_quote("The coal miner is a sort of grimy caryatid upon whose shoulders nearly everything")
+    assert (result["status"], result["chapter"]) == ("exact", 1)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,54 @@
+import threading
+
+from book_summarizer.fake_llm import FakeLLMClient
+from book_summarizer.rate_limit import RateLimitedClient, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_requests_are_spread_out_after_the_initial_burst():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, clock=clock, sleep=clock.sleep)
+    for _ in range(60):
+        assert limiter.acquire() == 0
+    assert limiter.acquire() == 1.0
+    assert clock.now == 1.0
+
+
+def test_token_limit_waits_for_enough_tokens():
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+    limiter.acquire(500)
+    assert limiter.acquire(200) == 10.0
+    # Oversized requests wait for a full bucket instead of forever
+    assert limiter.acquire(10000) == 60.0
+
+
+def test_rate_limited_client_shares_a_limiter_across_threads():
+    clock = FakeClock()
+    lock = threading.Lock()
+
+    def sleep(seconds: float) -> None:
+        with lock:
+            clock.sleep(seconds)
+
+    limiter = RateLimiter(requests_per_minute=6, clock=clock, sleep=sleep)
+    fake = FakeLLMClient()
+    client = RateLimitedClient(fake, limiter)
+    assert client.model_name == fake.model_name
+    threads = [threading.Thread(target=client.call, args=("system", "instruction")) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fake.usage()["calls"] == 8
+    assert clock.now >= 20.0  # two calls beyond the burst of six, ten seconds apart
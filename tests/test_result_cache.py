@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from book_summarizer.result_cache import ResultCache
+
+
+def test_key_depends_on_every_part():
+    assert ResultCache.key("call", "gpt-4o", "prompt") == ResultCache.key("call", "gpt-4o", "prompt")
+    assert ResultCache.key("call", "gpt-4o", "prompt") != ResultCache.key("call", "gpt-4o-mini", "prompt")
+    assert ResultCache.key("call", "ab", "c") != ResultCache.key("call", "a", "bc")
+    assert ResultCache.key("call", "x").startswith("call:")
+
+
+def test_results_persist_across_connections(tmp_path: Path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache(path)
+    key = ResultCache.key("call", "model", "prompt")
+    assert cache.get(key) is None
+    cache.set(key, "summary")
+    cache.set_json(ResultCache.key("chunk_plan", "text"), ["one", "two"])
+    cache.close()
+
+    reopened = ResultCache(path)
+    assert reopened.get(key) == "summary"
+    assert reopened.get_json(ResultCache.key("chunk_plan", "text")) == ["one", "two"]
+    stats = reopened.stats()
+    assert stats["hits"] == 2
+    assert stats["stored"] == {"call": 1, "chunk_plan": 1}
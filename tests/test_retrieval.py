@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from book_summarizer.llm_core import GPT35Turbo
+from book_summarizer.retrieval import HashingEmbedding, VectorIndex
+from book_summarizer.text_processing import TextProcessor
+
+CHAPTERS = [
+    "The miners work in the pit all day. Coal dust fills their lungs. The wages are low.",
+    "Housing in the industrial north is terrible. Families share a single room. Rents are high.",
+    "Socialism should appeal to ordinary decent people. Orwell thinks the movement alienates them.",
+]
+
+
+class CountingEmbedding(HashingEmbedding):
+    def __init__(self):
+        super().__init__(dimensions=256)
+        self.embedded = 0
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        self.embedded += len(texts)
+        return super().embed(texts)
+
+
+@pytest.fixture
+def processor() -> TextProcessor:
+    return TextProcessor(GPT35Turbo())
+
+
+def test_hashing_embedding_is_deterministic():
+    """Validates that the offline embedding gives identical vectors for identical text and differs otherwise."""
+    embedder = HashingEmbedding(dimensions=64)
+    vectors = embedder.embed(["coal miners", "coal miners", "housing rents"])
+    assert vectors.shape == (3, 64)
+    assert np.array_equal(vectors[0], vectors[1])
+    assert not np.array_equal(vectors[0], vectors[2])
+
+
+def test_build_and_search(tmp_path: Path, processor: TextProcessor):
+    index = VectorIndex.build(CHAPTERS, HashingEmbedding(), str(tmp_path / "vectors"), processor, chunk_size=12)
+    assert isinstance(index.vectors, np.memmap)
+    assert np.allclose(np.linalg.norm(index.vectors, axis=1), 1)
+
+    results = index.search("How much are rents for housing?", k=2)
+    assert len(results) == 2
+    assert results[0]["chapter"] == 1
+    assert results[0]["score"] >= results[1]["score"]
+
+
+def test_rebuild_only_embeds_new_chunks(tmp_path: Path, processor: TextProcessor):
+    """Validates that vectors for unchanged chunks are reused from the previous index."""
+    path = str(tmp_path / "vectors")
+    embedder = CountingEmbedding()
+    first = VectorIndex.build(CHAPTERS, embedder, path, processor, chunk_size=12)
+    embedded_first = embedder.embedded
+    first_vector = np.array(first.vectors[0])
+
+    edited = CHAPTERS[:2] + ["Socialism should appeal to ordinary decent people. This sentence is new."]
+    second = VectorIndex.build(edited, embedder, path, processor, chunk_size=12, previous=first)
+    assert embedder.embedded - embedded_first < embedded_first
+    assert np.array_equal(second.vectors[0], first_vector)
+
+
+def test_load_rejects_other_models(tmp_path: Path, processor: TextProcessor):
+    path = str(tmp_path / "vectors")
+    VectorIndex.build(CHAPTERS, HashingEmbedding(), path, processor)
+    with pytest.raises(ValueError):
+        VectorIndex.load(path, HashingEmbedding(dimensions=128))
+
+
+def test_search_caches_query_embeddings(tmp_path: Path, processor: TextProcessor):
+    embedder = CountingEmbedding()
+    index = VectorIndex.build(CHAPTERS, embedder, str(tmp_path / "vectors"), processor)
+    before = embedder.embedded
+    index.search("coal", k=1)
+    index.search("coal", k=1)
+    assert embedder.embedded == before + 1
+
+
+def test_for_book_rebuilds_an_index_of_other_chapters(tmp_path: Path, processor: TextProcessor):
+    """Validates that a saved index is only reused for the chapter texts it was built from."""
+    epub_path = str(tmp_path / "book.epub")
+    Path(epub_path).touch()
+    embedder = CountingEmbedding()
+    first = VectorIndex.for_book(epub_path, embedder, chapters=iter(CHAPTERS), processor=processor)
+    embedded_first = embedder.embedded
+    assert VectorIndex.for_book(epub_path, embedder, chapters=CHAPTERS, processor=processor).chapters_key == (
+        first.chapters_key
+    )
+    assert embedder.embedded == embedded_first
+
+    cleaned = ["Contents. Copyright page."] + CHAPTERS
+    rebuilt = VectorIndex.for_book(epub_path, embedder, chapters=cleaned, processor=processor)
+    assert rebuilt.chapters_key != first.chapters_key
+    assert [chunk["chapter"] for chunk in rebuilt.chunks][-1] == 3
+    assert embedder.embedded - embedded_first < embedded_first
+
+
+if __name__ == "__main__":
+    pytest.main()
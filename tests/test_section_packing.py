@@ -0,0 +1,30 @@
+from book_summarizer.section_packing import bin_sections, format_packed_sections, parse_packed_response
+
+
+def test_bin_sections_respects_budget_and_count():
+    assert bin_sections({0: 100, 1: 300, 2: 200, 5: 50}, budget=400, max_sections=10) == [[0, 1], [2, 5]]
+    assert bin_sections({0: 1, 1: 1, 2: 1}, budget=400, max_sections=2) == [[0, 1], [2]]
+    assert bin_sections({}, budget=400, max_sections=2) == []
+
+
+def test_format_packed_sections_marks_ids():
+    text = format_packed_sections({3: "Epigraph.", 4: "Part One"})
+    assert text == '<section id="3">\nEpigraph.\n</section>\n\n<section id="4">\nPart One\n</section>'
+
+
+def test_parse_packed_response_keeps_only_complete_results():
+    response = """```json
+    [
+        {"id": 3, "title": "Epigraph", "worthy": false, "summary": ""},
+        {"id": "4", "title": "Preface", "worthy": "True", "summary": "- The author explains the book."},
+        {"id": 5, "title": "Chapter 1", "worthy": true, "summary": ""},
+        {"id": 9, "title": "Not sent", "worthy": true, "summary": "- Invented."},
+        "stray text"
+    ]
+    ```"""
+    assert parse_packed_response(response, [3, 4, 5]) == {
+        3: {"title": "Epigraph", "worthiness": False, "summary": ""},
+        4: {"title": "Preface", "worthiness": True, "summary": "- The author explains the book."},
+    }
+    assert parse_packed_response("Sure! Here are the sections.", [3, 4]) == {}
+    assert parse_packed_response('{"id": 3}', [3]) == {}
@@ -0,0 +1,67 @@
+import pytest
+
+from book_summarizer.streaming import HeadOfLineTokenRelay, OrderedCompletionBuffer, TokenGate
+
+
+def test_buffer_releases_in_order():
+    """Validates that out-of-order completions are held until every earlier index has arrived."""
+    buffer = OrderedCompletionBuffer()
+    assert buffer.add(2, "c") == []
+    assert buffer.add(1, "b") == []
+    assert len(buffer) == 2
+    assert buffer.add(0, "a") == ["a", "b", "c"]
+    assert buffer.add(3, "d") == ["d"]
+    assert buffer.next_index == 4
+    assert len(buffer) == 0
+
+
+def test_relay_holds_tokens_until_head_of_line():
+    """Validates that tokens are only forwarded while their item is the one being read."""
+    buffer = OrderedCompletionBuffer()
+    received = []
+    relay = HeadOfLineTokenRelay(1, buffer, lambda index, token: received.append((index, token)))
+
+    relay("Hello ")
+    relay("there ")
+    assert received == []
+
+    buffer.add(0, "done")
+    assert received == [(1, "Hello there ")]
+    relay("world")
+    assert received[-1] == (1, "world")
+
+
+def test_relay_flushes_items_that_finished_before_reaching_the_head():
+    buffer = OrderedCompletionBuffer()
+    received = []
+    relays = [HeadOfLineTokenRelay(i, buffer, lambda index, token: received.append((index, token))) for i in range(3)]
+    relays[2]("Third.")
+    relays[1]("Second.")
+    assert buffer.add(2, "c") == [] and buffer.add(1, "b") == []
+    assert received == []
+
+    relays[0]("First.")
+    assert buffer.add(0, "a") == ["a", "b", "c"]
+    assert received == [(0, "First."), (1, "Second."), (2, "Third.")]
+
+
+def test_token_gate_forwards_or_drops_held_tokens():
+    received = []
+    gate = TokenGate(received.append)
+    gate("Hello ")
+    gate("there ")
+    assert received == []
+    gate.open()
+    gate("world")
+    assert received == ["Hello there ", "world"]
+
+    dropped = []
+    gate = TokenGate(dropped.append)
+    gate("Index")
+    gate.discard()
+    gate("more")
+    assert dropped == []
+
+
+if __name__ == "__main__":
+    pytest.main()
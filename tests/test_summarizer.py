@@ -1,3 +1,5 @@
+import json
+import time
 from pathlib import Path
 from typing import Any
 from unittest.mock import MagicMock, patch
@@ -6,6 +8,12 @@ import pytest
 from dotenv import load_dotenv
 
 from book_summarizer import BookSummarizer
+from book_summarizer.chunk_planner import ChunkPlanner
+from book_summarizer.compression import ExtractiveCompressor
+from book_summarizer.default_prompts import DEFAULT_PROMPTS
+from book_summarizer.fake_llm import FakeLLMClient
+from book_summarizer.near_duplicates import NearDuplicateIndex
+from book_summarizer.tracing import InMemoryExporter, Tracer, WeaveExporter
 
 # Load the API key which OpenAI will read from the environment
 load_dotenv()
@@ -47,5 +55,413 @@ def test_summarize_book(summarizer: BookSummarizer, tmp_path: Path) -> None:
     assert "error" not in content.lower(), "Error string found in summary"
 
 
+def test_summarize_book_with_fake_client(summarizer: BookSummarizer, tmp_path: Path) -> None:
+    output_path = tmp_path / "book_summary.md"
+    fake = FakeLLMClient(model_name="gpt-3.5-turbo")
+    summarizer.summarize_book(
+        output_filename=str(output_path),
+        summarizer_model=fake,
+        combiner_model=fake,
+        title_model=FakeLLMClient(responder=lambda system_prompt, instruction: "Chapter 1"),
+        worthiness_model=fake,
+    )
+    content = output_path.read_text()
+    assert content.count("## Chapter 1") == 2
+    assert "This is the second chapter." in content
+
+
+def test_iter_book_summaries_yields_in_chapter_order(summarizer: BookSummarizer) -> None:
+    """Validates that a slow first chapter does not change the order in which chapters are yielded."""
+
+    def respond(system_prompt: str, instruction: str) -> str:
+        if "first chapter" in instruction:
+            time.sleep(0.2)
+            return "slow"
+        return "fast"
+
+    slow_first = FakeLLMClient(model_name="gpt-3.5-turbo", responder=respond)
+    results = list(
+        summarizer.iter_book_summaries(
+            summarizer_model=slow_first,
+            combiner_model=slow_first,
+            title_model=FakeLLMClient(),
+            worthiness_model=FakeLLMClient(),
+        )
+    )
+    assert [result["index"] for result in results] == [0, 1]
+    assert [result["summary"].strip() for result in results] == ["slow", "fast"]
+
+
+def test_summarize_book_streams_chapters_and_tokens(summarizer: BookSummarizer, tmp_path: Path) -> None:
+    output_path = tmp_path / "book_summary.md"
+    fake = FakeLLMClient(model_name="gpt-3.5-turbo")
+    written_so_far = []
+    tokens = []
+    summarizer.summarize_book(
+        output_filename=str(output_path),
+        summarizer_model=fake,
+        combiner_model=fake,
+        title_model=fake,
+        worthiness_model=fake,
+        on_chapter=lambda result: written_so_far.append(output_path.read_text()),
+        on_token=lambda index, token: tokens.append((index, token)),
+    )
+    # The file already holds each chapter by the time its callback fires
+    assert "first chapter" in written_so_far[0]
+    assert "second chapter" not in written_so_far[0]
+    assert "second chapter" in written_so_far[1]
+    assert "".join(token for index, token in tokens if index == 0) in output_path.read_text()
+
+
+def test_streams_that_break_off_return_the_error(summarizer: BookSummarizer) -> None:
+    class BrokenStreamClient(FakeLLMClient):
+        def stream(self, system_prompt: str, instruction: str, max_retries: int = 5):
+            yield "The miners "
+            yield "Error: Connection reset by peer."
+
+    tokens = []
+    response = summarizer.summarize_text("Some text.", model=BrokenStreamClient(), on_token=tokens.append)
+    assert response == "Error: Connection reset by peer."
+    assert tokens[0] == "The miners "
+
+
+def test_summarize_book_verifies_quotes(summarizer: BookSummarizer, tmp_path: Path) -> None:
+    output_path = tmp_path / "book_summary.md"
+    quoting = FakeLLMClient(
+        model_name="gpt-3.5-turbo",
+        responder=lambda system_prompt, instruction: '- The author writes "This is the first chapter."',
+    )
+    summarizer.summarize_book(
+        output_filename=str(output_path),
+        summarizer_model=quoting,
+        combiner_model=quoting,
+        title_model=FakeLLMClient(),
+        worthiness_model=FakeLLMClient(),
+        verify_quotes=True,
+    )
+    content = output_path.read_text()
+    assert '"This is the first chapter." [verified: section 1, offset' in content
+    assert '"This is the first chapter." [close match 80%: section 2, offset' in content
+
+
+def test_summarize_book_reruns_only_invalidated_stages(
+    sample_epub_path: Path, mock_extractor: MagicMock, tmp_path: Path
+) -> None:
+    """Validates that with a cache, changing only the combiner prompt repeats only the combine calls."""
+    with patch("book_summarizer.EpubExtractor._validate_file_path"):
+        summarizer = BookSummarizer(sample_epub_path, cache_path=str(tmp_path / "cache.sqlite3"))
+    summarizer.chapters = [f"Chapter {number}. " + "The miners walked to the pit. " * 60 for number in (1, 2)]
+    # 100-token chunks, so each chapter is summarized in several chunks and then combined
+    summarizer.chunk_planner = ChunkPlanner(max_chunk_tokens=100)
+    chunk_model = FakeLLMClient(model_name="gpt-3.5-turbo")
+    combiner = FakeLLMClient(model_name="gpt-3.5-turbo")
+    title_model = FakeLLMClient(responder=lambda system_prompt, instruction: "A Chapter")
+    worthiness_model = FakeLLMClient(responder=lambda system_prompt, instruction: "True")
+    models = [chunk_model, combiner, title_model, worthiness_model]
+
+    def run(combiner_prompt: str) -> str:
+        output_path = tmp_path / "book_summary.md"
+        for model in models:
+            model.reset_usage()
+        summarizer.summarize_book(
+            output_filename=str(output_path),
+            summarizer_model=chunk_model,
+            combiner_model=combiner,
+            combiner_prompt=combiner_prompt,
+            title_model=title_model,
+            worthiness_model=worthiness_model,
+        )
+        return output_path.read_text()
+
+    first = run("Combine these summaries.")
+    assert chunk_model.usage()["calls"] > 2
+    assert combiner.usage()["calls"] == 2
+
+    assert run("Combine these summaries.") == first
+    assert [model.usage()["calls"] for model in models] == [0, 0, 0, 0]
+
+    run("Combine these summaries into one page.")
+    assert [model.usage()["calls"] for model in models] == [0, 2, 0, 0]
+
+
+def test_content_defined_chunks_reuse_cached_summaries_after_an_edit(
+    sample_epub_path: Path, mock_extractor: MagicMock, tmp_path: Path
+) -> None:
+    with patch("book_summarizer.EpubExtractor._validate_file_path"):
+        summarizer = BookSummarizer(sample_epub_path, cache_path=str(tmp_path / "cache.sqlite3"))
+    summarizer.content_defined_chunks = True
+    summarizer.chunk_planner = ChunkPlanner(objective="cost", max_chunk_tokens=200, min_chunk_tokens=10)
+    text = "".join(f"Sentence {i} tells of the mine at shaft {i * 7}. " for i in range(300))
+    chunk_model = FakeLLMClient(model_name="gpt-3.5-turbo")
+    combiner = FakeLLMClient(model_name="gpt-3.5-turbo")
+
+    summarizer.summarize_text_with_chunking(text, summarizer_model=chunk_model, combiner_model=combiner)
+    chunks = chunk_model.usage()["calls"]
+    assert chunks > 5
+
+    chunk_model.reset_usage()
+    edited = text.replace("Sentence 3 tells", "Sentence three, as it happens, tells")
+    summarizer.summarize_text_with_chunking(edited, summarizer_model=chunk_model, combiner_model=combiner)
+    # Only the edited chunk, and whichever chunk a shifted boundary touches, are summarized again
+    assert chunk_model.usage()["calls"] <= 2
+
+
+def test_speculative_summaries_are_cancelled_for_unworthy_chapters(summarizer: BookSummarizer) -> None:
+    """Validates that long chapters summarize during the worthiness call and stop once it comes back False."""
+    summarizer.SPECULATION_MIN_CHARS = 1000
+    summarizer.chapters = ["Index. " + "Coal, 12; miners, 40. " * 400, "Chapter 2. " + "The miners walked. " * 400]
+    # 100-token chunks, so each chapter needs many summarizer calls
+    summarizer.chunk_planner = ChunkPlanner(max_chunk_tokens=100)
+    chunk_model = FakeLLMClient(model_name="gpt-3.5-turbo", latency=0.01)
+    combiner = FakeLLMClient(model_name="gpt-3.5-turbo")
+
+    def judge(system_prompt: str, instruction: str) -> str:
+        time.sleep(0.05)
+        return "False" if "Index." in instruction else "True"
+
+    tokens = []
+    results = list(
+        summarizer.iter_book_summaries(
+            summarizer_model=chunk_model,
+            combiner_model=combiner,
+            title_model=FakeLLMClient(responder=lambda system_prompt, instruction: "A Chapter"),
+            worthiness_model=FakeLLMClient(responder=judge),
+            on_token=lambda index, token: tokens.append((index, token)),
+            speculate=True,
+        )
+    )
+    assert results[0]["summary"] == BookSummarizer.NOT_WORTHY_SUMMARY
+    assert results[1]["worthiness"] and results[1]["summary"].strip()
+    # The unworthy chapter was cut short, and only the worthy one was combined and streamed
+    chunks_per_chapter = len(summarizer.plan_chunks(summarizer.chapters[1], chunk_model))
+    assert chunk_model.usage()["calls"] < 2 * chunks_per_chapter
+    assert combiner.usage()["calls"] == 1
+    assert {index for index, token in tokens} == {1}
+
+
+def test_pack_sections_shares_one_request_and_falls_back(summarizer: BookSummarizer) -> None:
+    """Validates that short sections share a request, and a section missing from the response runs alone."""
+    summarizer.chapters = ["Epigraph. To the miners.", "Preface. Why I wrote this.", "Part One"]
+    packed_response = json.dumps(
+        [
+            {"id": 0, "title": "Epigraph", "worthy": False, "summary": ""},
+            {"id": 1, "title": "Preface", "worthy": True, "summary": "- The author explains the book."},
+        ]
+    )
+    fake = FakeLLMClient(
+        model_name="gpt-3.5-turbo",
+        responder=lambda system_prompt, instruction: packed_response if "<section" in instruction else "- A summary.",
+    )
+    title_model = FakeLLMClient(responder=lambda system_prompt, instruction: "Part One")
+    worthiness_model = FakeLLMClient(responder=lambda system_prompt, instruction: "True")
+    results = list(
+        summarizer.iter_book_summaries(
+            summarizer_model=fake,
+            combiner_model=fake,
+            title_model=title_model,
+            worthiness_model=worthiness_model,
+            pack_sections=True,
+        )
+    )
+    assert [result["title"] for result in results] == ["Epigraph", "Preface", "Part One"]
+    assert results[0]["summary"] == BookSummarizer.NOT_WORTHY_SUMMARY
+    assert results[1]["summary"] == "- The author explains the book."
+    assert results[2]["summary"].strip() == "- A summary."
+    # One packed call, then one summary call for the section the response left out
+    assert fake.usage()["calls"] == 2
+    assert title_model.usage()["calls"] == worthiness_model.usage()["calls"] == 1
+
+
+def test_compressor_shortens_chapters_and_reports_savings(summarizer: BookSummarizer) -> None:
+    summarizer.compressor = ExtractiveCompressor(ratio=0.5)
+    summarizer.chapters = [
+        "Chapter 1. " + " ".join(f"The miners cut {number} tons of coal at the face." for number in range(20))
+    ]
+    instructions = []
+    fake = FakeLLMClient(
+        model_name="gpt-3.5-turbo",
+        responder=lambda system_prompt, instruction: instructions.append(instruction) or "- A summary.",
+    )
+    (result,) = summarizer.iter_book_summaries(
+        summarizer_model=fake,
+        combiner_model=fake,
+        title_model=FakeLLMClient(),
+        worthiness_model=FakeLLMClient(responder=lambda system_prompt, instruction: "True"),
+    )
+    assert len(instructions[0]) < len(summarizer.chapters[0])
+    stats = result["compression"]
+    assert stats["compressed_tokens"] < stats["original_tokens"]
+    assert 0.3 < stats["saved"] < 0.7
+
+
+def test_time_budget_stops_calls_once_spent(summarizer: BookSummarizer) -> None:
+    """Validates that no model call starts after the book's time budget has run out."""
+    slow_title = FakeLLMClient(latency=0.2, responder=lambda system_prompt, instruction: "A Chapter")
+    fake = FakeLLMClient(model_name="gpt-3.5-turbo")
+    summarizer.MAX_WORKERS = 1
+    results = list(
+        summarizer.iter_book_summaries(
+            summarizer_model=fake,
+            combiner_model=fake,
+            title_model=slow_title,
+            worthiness_model=fake,
+            time_budget=0.1,
+        )
+    )
+    assert results[0]["title"] == "Error: Request timed out."
+    assert results[1]["title"] == "Error: Deadline exceeded before the call was made."
+    assert slow_title.usage()["calls"] == 0
+
+
+def test_analyze_reads_each_chunk_once_for_summary_quotes_and_facts(summarizer: BookSummarizer, tmp_path: Path) -> None:
+    summarizer.chunk_planner = ChunkPlanner(max_chunk_tokens=150, min_chunk_tokens=10)
+    summarizer.chapters = ["Chapter 1. " + "The miner is a sort of grimy caryatid. He works below ground. " * 20]
+
+    def respond(system_prompt: str, instruction: str) -> str:
+        if "JSON" in system_prompt:
+            return json.dumps(
+                {
+                    "summary": ["Miners hold up the world above them."],
+                    "quotes": ["“The miner is a sort of grimy caryatid.”", "Miners never sleep at all."],
+                    "facts": ["Miners work below ground."],
+                }
+            )
+        return "- Combined point."
+
+    fake = FakeLLMClient(model_name="gpt-3.5-turbo", responder=respond)
+    chunks = summarizer.plan_chunks(
+        summarizer.chapters[0],
+        fake,
+        DEFAULT_PROMPTS["analysis_prompt"],
+        f"{DEFAULT_PROMPTS['analysis_instruction']}\nFor the summary: {DEFAULT_PROMPTS['summarizer_instruction']}",
+        fake,
+    )
+    assert len(chunks) > 1
+    output = tmp_path / "summary.md"
+    results = []
+    summarizer.summarize_book(
+        str(output),
+        summarizer_model=fake,
+        combiner_model=fake,
+        title_model=FakeLLMClient(responder=lambda system_prompt, instruction: "Chapter 1"),
+        worthiness_model=FakeLLMClient(responder=lambda system_prompt, instruction: "True"),
+        on_chapter=results.append,
+        analyze=True,
+    )
+    # One call per chunk plus the combine, however many outputs each chunk gives
+    assert fake.usage()["calls"] == len(chunks) + 1
+
+    (result,) = results
+    assert result["summary"] == "- Combined point."
+    assert result["facts"] == ["Miners work below ground."]
+    assert [(quote["quote"], quote["status"]) for quote in result["quotes"]] == [
+        ("The miner is a sort of grimy caryatid.", "exact"),
+        ("Miners never sleep at all.", "not_found"),
+    ]
+    assert result["quotes"][0]["chapter"] == 0
+    quotes = (tmp_path / "summary_quotes.md").read_text()
+    assert quotes.startswith("## Chapter 1\n- “The miner is a sort of grimy caryatid.” [verified: section 1, offset")
+    assert "[quote not found in source]" in quotes
+    assert (tmp_path / "summary_facts.md").read_text() == "## Chapter 1\n- Miners work below ground.\n\n"
+
+
+def test_cascade_escalates_only_failing_chapters(summarizer: BookSummarizer) -> None:
+    summarizer.chapters = [f"Chapter {number}. " + "The miners walked to the pit at dawn. " * 60 for number in (1, 2)]
+    good = "- The miners walk to the pit.\n  - They leave at dawn, every day, whatever the weather.\n" * 4
+
+    def cheap_respond(system_prompt: str, instruction: str) -> str:
+        return "I cannot summarize this." if "Chapter 2" in instruction else good
+
+    cheap = FakeLLMClient(model_name="gpt-3.5-turbo", responder=cheap_respond)
+    strong = FakeLLMClient(model_name="gpt-3.5-turbo", responder=lambda system_prompt, instruction: good)
+    combiner = FakeLLMClient(model_name="gpt-3.5-turbo")
+    streamed: dict[int, str] = {}
+    results = list(
+        summarizer.iter_book_summaries(
+            summarizer_model=cheap,
+            combiner_model=combiner,
+            title_model=FakeLLMClient(responder=lambda system_prompt, instruction: "A Chapter"),
+            worthiness_model=FakeLLMClient(responder=lambda system_prompt, instruction: "True"),
+            on_token=lambda index, token: streamed.update({index: streamed.get(index, "") + token}),
+            escalation_model=strong,
+        )
+    )
+    assert [result["cascade"] for result in results] == [
+        {"escalated": False, "failures": []},
+        {"escalated": True, "failures": ["too_short", "no_list"]},
+    ]
+    assert [result["summary"].strip() for result in results] == [good.strip(), good.strip()]
+    assert strong.usage()["calls"] == 1
+    assert combiner.usage()["calls"] == 0
+    # The rejected summary is never streamed
+    assert streamed[0] == good
+    assert "cannot" not in streamed.get(1, "")
+
+
+def test_tracer_nests_book_chapter_chunk_and_call_spans(summarizer: BookSummarizer) -> None:
+    exporter = InMemoryExporter()
+    summarizer.tracer = Tracer([exporter])
+    summarizer.chunk_planner = ChunkPlanner(max_chunk_tokens=100, min_chunk_tokens=10)
+    summarizer.chapters = ["Chapter 1. " + "The miners cut coal at the face. " * 40, "Chapter 2. A short one."]
+    fake = FakeLLMClient(model_name="gpt-3.5-turbo", responder=lambda system_prompt, instruction: "True")
+    list(summarizer.iter_book_summaries(fake, combiner_model=fake, title_model=fake, worthiness_model=fake))
+
+    spans = {span.span_id: span for span in exporter.spans}
+    (book,) = [span for span in spans.values() if span.name == "book"]
+    assert book.parent_id is None and book.attributes["chapters"] == 2
+    chapters = [span for span in spans.values() if span.name == "chapter"]
+    assert sorted(span.attributes["index"] for span in chapters) == [0, 1]
+    assert all(span.parent_id == book.span_id for span in chapters)
+
+    chunks = [span for span in spans.values() if span.name == "chunk"]
+    assert len(chunks) > 2
+    assert {spans[span.parent_id].name for span in chunks} == {"chapter"}
+    calls = [span for span in spans.values() if span.name == "llm_call"]
+    assert {spans[span.parent_id].name for span in calls} == {"chunk", "combine", "metadata"}
+    assert all(span.attributes["input_tokens"] > 0 and span.attributes["output_tokens"] == 1 for span in calls)
+    assert exporter.summary()["llm_call"]["count"] == len(calls)
+    assert not any("instruction" in span.attributes for span in calls)  # prompts are only kept for Weave
+
+
+def test_weave_logs_prompts_and_responses_of_model_calls(summarizer: BookSummarizer) -> None:
+    weave_client = MagicMock()
+    summarizer.tracer = Tracer()
+    summarizer.tracer.add_exporter(WeaveExporter(client=weave_client))
+    fake = FakeLLMClient(model_name="gpt-3.5-turbo", responder=lambda system_prompt, instruction: "A summary.")
+    summarizer.summarize_text("The miners cut coal.", model=fake, system_prompt="Be brief.", instruction="Summarize:")
+
+    (call,) = weave_client.create_call.call_args_list
+    assert call.args[0] == "llm_call"
+    assert call.args[1] == {
+        "model": "gpt-3.5-turbo",
+        "system_prompt": "Be brief.",
+        "instruction": "Summarize:\nThe miners cut coal.",
+    }
+    output = weave_client.finish_call.call_args.kwargs["output"]
+    assert output["response"] == "A summary."
+    assert "instruction" not in output
+
+
 if __name__ == "__main__":
     pytest.main()
+
+
+def test_near_duplicate_chapters_reuse_earlier_results(summarizer: BookSummarizer, tmp_path: Path) -> None:
+    summarizer.duplicate_index = NearDuplicateIndex(str(tmp_path / "chapters.sqlite3"))
+    first = "Chapter 1. " + " ".join(f"The miners of pit {number} walked to work at dawn." for number in range(80))
+    summarizer.chapters = [first, "Chapter 2. " + "Mrs Brooker kept a tripe shop in the north. " * 40]
+    fake = FakeLLMClient(model_name="gpt-3.5-turbo", responder=lambda system_prompt, instruction: "True")
+    options = {"combiner_model": fake, "title_model": fake, "worthiness_model": fake}
+    earlier = list(summarizer.iter_book_summaries(fake, **options))
+
+    fake.reset_usage()
+    reprint = first.replace("pit 7 ", "pit seven ").replace("Chapter 1.", "CHAPTER I.")
+    summarizer.chapters = [reprint, "Chapter 2. " + "Orwell stayed in a lodging house over the shop. " * 40]
+    results = list(summarizer.iter_book_summaries(fake, **options))
+
+    assert results[0]["reused"]["source"].endswith("#0")
+    assert results[0]["reused"]["similarity"] > 0.9
+    assert results[0]["summary"] == earlier[0]["summary"]
+    assert "reused" not in results[1]
+    assert fake.usage()["calls"] == 3  # title, worthiness and summary of the new second chapter
+    assert len(summarizer.duplicate_index) == 3
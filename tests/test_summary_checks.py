@@ -0,0 +1,29 @@
+from book_summarizer.quote_verifier import QuoteVerifier
+from book_summarizer.summary_checks import SummaryChecker
+
+CHAPTER = (
+    "The miner is a sort of grimy caryatid upon whose shoulders nearly everything that is not grimy is supported. " * 30
+)
+GOOD = "- Coal holds up modern life.\n  - Everything above ground depends on the work below it.\n" * 5
+
+
+def test_a_well_formed_summary_passes():
+    verifier = QuoteVerifier([CHAPTER])
+    quoted = GOOD + '- Orwell calls the miner "a sort of grimy caryatid".\n'
+    assert SummaryChecker().check(quoted, CHAPTER, verifier, chapter_index=0) == []
+
+
+def test_each_check_reports_its_failure():
+    checker = SummaryChecker()
+    assert checker.check("Error: Request timed out.", CHAPTER) == ["error"]
+    assert checker.check("- Coal.\n- Mines.", CHAPTER) == ["too_short"]
+    assert checker.check(CHAPTER, CHAPTER) == ["too_long", "no_list"]
+    assert checker.check(GOOD.replace("- ", ""), CHAPTER) == ["no_list"]
+    invented = GOOD + '- He says "the miners demanded far higher wages".\n'
+    assert checker.check(invented, CHAPTER, QuoteVerifier([CHAPTER]), chapter_index=0) == ["invented_quotes"]
+
+
+def test_short_chapters_need_only_short_summaries():
+    chapter = "A short preface about the journey north to Wigan. " * 4
+    assert SummaryChecker().check("- The author travels north.\n- He goes to Wigan.", chapter) == []
+    assert SummaryChecker(min_points=0).check("The author travels north to Wigan.", chapter) == []
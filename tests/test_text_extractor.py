@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import pytest
+
+from book_summarizer import BookSummarizer, TextExtractor
+from book_summarizer.fake_llm import FakeLLMClient
+from book_summarizer.text_extractor import TextChapters
+
+
+def write(tmp_path: Path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+class TestTextExtractor:
+
+    def test_markdown_headings_start_chapters(self, tmp_path: Path):
+        path = write(
+            tmp_path,
+            "book.md",
+            "Published 1937.\n\n# Chapter One\n\nThe miners.\n\n\n## The Pit\n\nDown the shaft.\n### A note\nStill here.\n",
+        )
+        extractor = TextExtractor(path)
+        assert isinstance(extractor.chapters, TextChapters)
+        assert list(extractor.chapters) == [
+            "Published 1937.",
+            "# Chapter One\nThe miners.",
+            "## The Pit\nDown the shaft.\n### A note\nStill here.",
+        ]
+        assert extractor.chapters[-1] == extractor.chapters[2]
+        assert extractor.chapters[1:] == list(extractor.iter_chapters())[1:]
+
+    def test_plain_text_headings_start_chapters(self, tmp_path: Path):
+        path = write(
+            tmp_path, "book.txt", "CHAPTER I\r\nIt was cold.\r\n\r\nCHAPTER II\r\nIt was colder.\r\nPart Two\r\nSpain."
+        )
+        extractor = TextExtractor(path)
+        assert list(extractor.chapters) == ["CHAPTER I\nIt was cold.", "CHAPTER II\nIt was colder.", "Part Two\nSpain."]
+        assert [start for start, _ in extractor.spans] == [0, 27, 55]
+
+    def test_prose_lines_are_not_headings(self, tmp_path: Path):
+        path = write(
+            tmp_path,
+            "book.txt",
+            "Chapter Twenty-One: The Club\nBook Club meets on Tuesdays.\nPart Two of the plan was to leave.\n"
+            "Part 2 of the plan was simple.\nPART III\nSpain.",
+        )
+        assert [chapter.split("\n")[0] for chapter in TextExtractor(path).chapters] == [
+            "Chapter Twenty-One: The Club",
+            "PART III",
+        ]
+
+    def test_long_chapters_are_split_at_paragraph_breaks(self, tmp_path: Path):
+        line = "A transcript line that goes on for a while."
+        path = write(tmp_path, "transcript.txt", f"{line}\n\n" * 10 + "Ünïcödé " * 40)
+        extractor = TextExtractor(path, max_chapter_bytes=len(line) * 3 + 10)
+        parts = list(extractor.chapters)
+        assert parts[:3] == ["\n".join([line] * 3)] * 3
+        assert "".join(parts).count("Ünïcödé") == 40
+        assert all(end - start <= extractor.max_chapter_bytes for start, end in extractor.spans)
+
+    def test_empty_and_missing_files(self, tmp_path: Path):
+        assert list(TextExtractor(write(tmp_path, "empty.txt", "")).chapters) == []
+        with pytest.raises(FileNotFoundError):
+            TextExtractor(str(tmp_path / "missing.txt"))
+
+
+def test_summarizer_reads_text_files(tmp_path: Path):
+    path = write(tmp_path, "book.md", "# One\n\nThe first chapter.\n\n# Two\n\nThe second chapter.\n")
+    summarizer = BookSummarizer(path)
+    assert isinstance(summarizer.extractor, TextExtractor)
+    fake = FakeLLMClient(model_name="gpt-3.5-turbo", responder=lambda system_prompt, instruction: "True")
+    results = list(summarizer.iter_book_summaries(fake, combiner_model=fake, title_model=fake, worthiness_model=fake))
+    assert [result["index"] for result in results] == [0, 1]
+    assert summarizer._default_save_path() == str(tmp_path / "book_summary.md")
@@ -1,7 +1,7 @@
 import pytest
 
 from book_summarizer.llm_core import GPT4O, GPT4oMini, GPT35Turbo
-from book_summarizer.text_processing import TextProcessor
+from book_summarizer.text_processing import TextProcessor, split_sentences
 
 # Mock text and token data for testing
 mock_text = "This is a test text for tokenization and chunking."
@@ -106,3 +106,53 @@ def test_special_characters(processor_35turbo):
     assert isinstance(chunks, list)
     assert all(isinstance(token, int) for token in tokens)
     assert all(isinstance(chunk, str) for chunk in chunks)
+
+
+def test_split_sentences():
+    """Validates that sentences keep their trailing whitespace so they rejoin into the original text."""
+    text = "First sentence. “A quoted one!” Then a question?\nA new line"
+    sentences = split_sentences(text)
+    assert sentences == ["First sentence. ", "“A quoted one!” ", "Then a question?\n", "A new line"]
+    assert "".join(sentences) == text
+
+
+def test_chunk_sentences(processor_35turbo):
+    """Validates that chunks end on sentence boundaries, respect the size limit and overlap by whole sentences."""
+    text = " ".join(f"Sentence number {i} is here." for i in range(40))
+    chunks = processor_35turbo.chunk_sentences(text, chunk_size=30, overlap=8)
+    assert len(chunks) > 1
+    assert all(chunk.rstrip().endswith(".") for chunk in chunks)
+    assert all(len(processor_35turbo.tokenize_text(chunk)) <= 30 for chunk in chunks)
+    assert all(chunk in text for chunk in chunks)
+    assert split_sentences(chunks[0])[-1] == split_sentences(chunks[1])[0]
+
+
+def test_chunk_sentences_splits_long_sentences(processor_35turbo):
+    """Validates that a single sentence longer than the chunk size is split on token boundaries."""
+    text = "word " * 100
+    chunks = processor_35turbo.chunk_sentences(text, chunk_size=20, overlap=5)
+    assert len(chunks) > 1
+    assert all(len(processor_35turbo.tokenize_text(chunk)) <= 20 for chunk in chunks)
+    assert "".join(chunks) == text
+
+
+def test_chunk_content_defined_survives_edits(processor_35turbo):
+    """Validates that an edit early in the text leaves the later content-defined chunks unchanged."""
+    sentences = [f"Sentence {i} tells of the mine at shaft {i * 7}. " for i in range(300)]
+    text = "".join(sentences)
+    chunks = processor_35turbo.chunk_content_defined(text, target_tokens=120, max_tokens=200)
+    assert len(chunks) > 5
+    assert "".join(chunks) == text
+    assert all(chunk.endswith(". ") for chunk in chunks)
+    assert all(len(processor_35turbo.tokenize_text(chunk)) <= 200 for chunk in chunks[:-1])
+    assert all(len(processor_35turbo.tokenize_text(chunk)) >= 60 for chunk in chunks[:-1])
+
+    edited = text.replace("Sentence 3 tells", "Sentence three, as it happens, tells")
+    edited_chunks = processor_35turbo.chunk_content_defined(edited, target_tokens=120, max_tokens=200)
+    assert edited_chunks[0] != chunks[0]
+    assert edited_chunks[1:] == chunks[1:]
+
+    # Fixed-size chunks all shift after the same edit
+    fixed = processor_35turbo.chunk_text(text, chunk_size=120, overlap=0)
+    edited_fixed = processor_35turbo.chunk_text(edited, chunk_size=120, overlap=0)
+    assert not set(fixed[1:]) & set(edited_fixed[1:])
@@ -0,0 +1,153 @@
+import json
+import threading
+from pathlib import Path
+
+from book_summarizer import tracing
+from book_summarizer.tracing import NULL_SPAN, ChromeTraceExporter, InMemoryExporter, Tracer, WeaveExporter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_spans_record_nothing_without_a_tracer():
+    with tracing.span("chapter", index=0) as span:
+        assert span is NULL_SPAN
+        assert not span.recording
+        span.set(tokens=10)
+        assert tracing.current_span() is None
+
+
+def test_spans_nest_and_time_their_blocks():
+    clock = FakeClock()
+    exporter = InMemoryExporter()
+    tracer = Tracer([exporter], clock=clock)
+    with tracing.span("book", tracer=tracer) as book:
+        assert tracing.current_span() is book
+        with tracing.span("chapter", index=0) as chapter:
+            clock.now = 2
+            chapter.set(input_tokens=100)
+        with tracing.span("chapter", index=1) as chapter:
+            clock.now = 5
+            chapter.set(input_tokens=50)
+    assert tracing.current_span() is None
+
+    assert [span.name for span in exporter.spans] == ["chapter", "chapter", "book"]
+    assert all(span.parent_id == book.span_id for span in exporter.spans[:2])
+    assert [span.duration for span in exporter.spans] == [2, 3, 5]
+    assert exporter.summary()["chapter"] == {"count": 2, "seconds": 5, "input_tokens": 150}
+
+
+def test_span_context_carries_the_parent_into_other_threads():
+    exporter = InMemoryExporter()
+    book = tracing.span("book", tracer=Tracer([exporter]))
+    assert tracing.current_span() is None
+
+    def work():
+        with tracing.span("chapter"):
+            pass
+
+    thread = threading.Thread(target=book.context().run, args=(work,))
+    thread.start()
+    thread.join()
+    book.end()
+    chapter, ended_book = exporter.spans
+    assert chapter.parent_id == book.span_id
+    assert chapter.thread_id != book.thread_id
+    assert ended_book is book
+
+
+def test_exceptions_are_recorded_on_the_span():
+    exporter = InMemoryExporter()
+    try:
+        with tracing.span("llm_call", tracer=Tracer([exporter])):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert exporter.spans[0].attributes["error"] == "ValueError('boom')"
+
+
+def test_chrome_trace_exporter_writes_complete_events(tmp_path: Path):
+    path = tmp_path / "trace.json"
+    tracer = Tracer([ChromeTraceExporter(str(path))])
+    with tracing.span("book", tracer=tracer):
+        with tracing.span("chapter", index=3):
+            pass
+    tracer.close()
+
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["chapter", "book"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    assert events[0]["args"]["index"] == 3
+    assert events[0]["args"]["parent_id"] == events[1]["args"]["span_id"]
+
+
+class FakeWeaveClient:
+    def __init__(self):
+        self.created = []
+        self.finished = []
+
+    def create_call(self, op, inputs, parent=None, use_stack=True):
+        call = {"op": op, "inputs": inputs, "parent": parent}
+        self.created.append(call)
+        return call
+
+    def finish_call(self, call, output=None):
+        self.finished.append((call, output))
+
+
+class SlowWeaveClient(FakeWeaveClient):
+    def __init__(self, concurrent: int):
+        super().__init__()
+        self.barrier = threading.Barrier(concurrent, timeout=2)
+
+    def finish_call(self, call, output=None):
+        # Only returns once every span has reached the network call at the same time
+        self.barrier.wait()
+        super().finish_call(call, output)
+
+
+def test_exporters_are_called_outside_the_tracer_lock():
+    """Validates that spans ending on several threads reach a slow exporter together rather than one at a time."""
+    client = SlowWeaveClient(concurrent=4)
+    exporter = InMemoryExporter()
+    tracer = Tracer([WeaveExporter(client=client), exporter])
+
+    def work(index: int):
+        with tracing.span("chapter", tracer=tracer, index=index):
+            pass
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not client.barrier.broken
+    assert len(client.finished) == 4
+    assert exporter.summary()["chapter"]["count"] == 4
+
+
+def test_weave_exporter_logs_nested_calls():
+    client = FakeWeaveClient()
+    with tracing.span("book", tracer=Tracer([WeaveExporter(client=client)])):
+        with tracing.span("chapter", index=0):
+            pass
+    book, chapter = client.created
+    assert chapter["parent"] is book and book["parent"] is None
+    assert [call["op"] for call, _ in client.finished] == ["chapter", "book"]
+    assert client.finished[0][1]["index"] == 0
+
+
+def test_prompts_are_recorded_only_for_exporters_that_want_them():
+    tracer = Tracer([InMemoryExporter()])
+    with tracing.span("book", tracer=tracer):
+        assert not tracing.recording_prompts()
+    tracer.add_exporter(WeaveExporter(client=FakeWeaveClient()))
+    with tracing.span("book", tracer=tracer):
+        assert tracing.recording_prompts()
+    assert not tracing.recording_prompts()  # no span is current and no tracer was given
+    assert Tracer([WeaveExporter(client=FakeWeaveClient())]).record_prompts